@@ -5,4 +5,5 @@ from .aanalytics14 import *
 from .configs import *
 from .projects import *
 from .requestCreator import *
+from .analyticsStore import AnalyticsStore
 from .workspaceManager import WorkspaceManager, TextBuilder
@@ -1,16 +1,17 @@
 # Created by julien piccini
 # email : piccini.julien@gmail.com
-import json, os, re, io, time
+import json, os, re, io, time, tempfile, weakref
 import time, datetime
 from concurrent import futures
 from copy import deepcopy
 from pathlib import Path
-from typing import IO, Union, List
+from typing import IO, Union, List, Iterable
 from collections import defaultdict
-from itertools import tee
+from itertools import tee, chain
 import logging
 
 # Non standard libraries
+import numpy as np
 import pandas as pd
 from urllib import parse
 
@@ -19,6 +20,15 @@ from aanalytics2.projects import *
 from aanalytics2.configs import ConfigObj
 from aanalytics2.requestCreator import RequestCreator
 from aanalytics2.workspace import Workspace, TargetWorkspace
+from aanalytics2.rateController import RateController
+from aanalytics2.componentCatalog import ComponentCatalog
+from aanalytics2.reportBatch import ReportBatch
+from aanalytics2.arrowExport import ArrowPageWriter
+from aanalytics2.reportStore import ReportStore, ReportCheckpoint, DATE_DIMENSIONS, requestFingerprint, periodStart
+from aanalytics2.pageDecoder import getDecodePool, decodeReportPage, concatColumnar
+from aanalytics2.requestPlanner import MAX_METRICS_PER_REQUEST, planMergedRequests, splitMergedResponse, \
+    isMergeable, splitMetricContainer, joinSplitResponses, searchPartitions, totalsRequest, planTotalsRequests, \
+    missingItems, itemsRequest, addBreakdownFilters
 
 JsonOrDataFrameType = Union[pd.DataFrame, dict]
 JsonListOrDataFrameType = Union[pd.DataFrame, List[dict]]
@@ -218,6 +228,8 @@ class Analytics:
         self.projectsDetails = {}
         self.segments = []
         self.calculatedMetrics = []
+        self.catalog = ComponentCatalog(self)
+        self._reportSuiteTimezones = {}  ## rsid -> timezoneZoneinfo, see _reportSuiteNow
         try:
             import importlib.resources as pkg_resources
             pathLOGS = pkg_resources.path(
@@ -869,7 +881,7 @@ class Analytics:
         if sidFilter is not None:
             if type(sidFilter) == list:
                 sidFilter = ','.join(sidFilter)
-            params.update({'rsids': sidFilter})
+            params.update({'segmentFilter': sidFilter})
         data = []
         lastPage = False
         page_nb = 0
@@ -1046,6 +1058,7 @@ class Analytics:
             extended_info: bool = False,
             save=False,
             format: str = 'df',
+            cmFilter: list = None,
             **kwargs
     ) -> pd.DataFrame:
         """
@@ -1062,6 +1075,7 @@ class Analytics:
                 additional infos: reportSuiteName,definition, ownerFullName, modified, tags, compatibility
             save : OPTIONAL : If set to True, it will save the info in a csv file (Default False)
             format : OPTIONAL : format of the output. 2 values "df" for dataframe and "raw" for raw json.
+            cmFilter : OPTIONAL : Filter list to only include calculated metrics in the specified list (list)
         Possible kwargs:
             limit : number of segments retrieved by request. default 500: Limited to 1000 by the AnalyticsAPI.(int)
         """
@@ -1081,6 +1095,10 @@ class Analytics:
             if type(rsids_list) == list:
                 rsids_list = ','.join(rsids_list)
             params.update({'rsids': rsids_list})
+        if cmFilter is not None:
+            if type(cmFilter) == list:
+                cmFilter = ','.join(cmFilter)
+            params.update({'calculatedMetricFilter': cmFilter})
         if extended_info:
             params.update(
                 {'expansion': 'reportSuiteName,definition,ownerFullName,modified,tags,categories,compatibility,shares,lastRecordedAccess'})
@@ -4306,29 +4324,30 @@ class Analytics:
             self.logger.debug(f"starting _readData")
         if cols is None:
             raise ValueError("list of columns must be specified")
-        data_rows = deepcopy(data_rows)
-        dict_data = {row.get('value', 'missing_value'): row['data'] for row in data_rows}
+        ## new lists per row: the rows received are not modified, without copying them entirely
+        dict_data = {row.get('value', 'missing_value'): list(row['data']) for row in data_rows}
         if cols is not None:
             n_metrics = len(cols) - 1
         if item_id:  # adding the itemId in the data returned
             cols.append('item_id')
             for row in data_rows:
                 dict_data[row.get('value', 'missing_value')].append(row['itemId'])
-        if anomaly:
-            # set full columns
-            cols = cols + [f'{metric}-{suffix}' for metric in cols[1:] for suffix in
-                           ['expected', 'UpperBound', 'LowerBound']]
-            # add data to the dictionary
-            for row in data_rows:
-                for item in range(n_metrics):
-                    dict_data[row['value']].append(
-                        row.get('dataExpected', [0 for i in range(n_metrics)])[item])
-                    dict_data[row['value']].append(
-                        row.get('dataUpperBound', [0 for i in range(n_metrics)])[item])
-                    dict_data[row['value']].append(
-                        row.get('dataLowerBound', [0 for i in range(n_metrics)])[item])
         df = pd.DataFrame(dict_data).T  # require to transform the data
         df.reset_index(inplace=True, )
+        if anomaly:
+            # set full columns: expected, UpperBound & LowerBound after each other for each metric
+            cols = cols + [f'{metric}-{suffix}' for metric in cols[1:n_metrics + 1] for suffix in
+                           ['expected', 'UpperBound', 'LowerBound']]
+            # rows kept in the dictionary (the last one for a repeated value), in the order of the dictionary
+            positions = {row.get('value', 'missing_value'): index for index, row in enumerate(data_rows)}
+            bandRows = [data_rows[index] for index in positions.values()]
+            zeros = [0] * n_metrics
+            # bands as a (rows, 3, metrics) array, interleaved to (rows, metrics x 3) columns
+            bands = np.array([[row.get('dataExpected', zeros), row.get('dataUpperBound', zeros),
+                               row.get('dataLowerBound', zeros)] for row in bandRows],
+                             dtype='float64').reshape(len(bandRows), 3, n_metrics)
+            bands = bands.transpose(0, 2, 1).reshape(len(bandRows), n_metrics * 3)
+            df = pd.concat([df, pd.DataFrame(bands, index=df.index)], axis=1)
         df.columns = cols
         return df
 
@@ -4342,6 +4361,7 @@ class Analytics:
             unsafe: bool = False,
             verbose: bool = False,
             debug=False,
+            checkpoint: Union[str, ReportCheckpoint] = None,
             **kwargs,
     ) -> object:
         """
@@ -4361,6 +4381,8 @@ class Analytics:
                 This may break the script or return incomplete data. (default False).
             save : OPTIONAL : If you would like to save the data within a CSV file. (default False)
             verbose : OPTIONAL : If you want to have comments displayed (default False)
+            checkpoint : OPTIONAL : folder (or ReportCheckpoint instance) where each page is saved as soon as it is received.
+                If the report fails, requesting it again with the same checkpoint resumes from the first missing page.
 
         """
         if unsafe and verbose:
@@ -4401,15 +4423,21 @@ class Analytics:
         data_list = []
         last_page = False
         page_nb, count_elements, total_elements = 0, 0, 0
+        if isinstance(checkpoint, (str, Path)):
+            checkpoint = ReportCheckpoint(checkpoint)
+        fingerprint = requestFingerprint(request) if checkpoint is not None else None
         if verbose:
             print('Starting to fetch the data...')
         while not last_page:
             timestamp = round(time.time())
             request['settings']['page'] = page_nb
-            report = self.connector.postData(self.endpoint_company +
-                                             self._getReport, data=request, headers=self.header)
+            report = checkpoint.loadPage(fingerprint, page_nb) if checkpoint is not None else None
+            fromCheckpoint = report is not None
+            if report is None:
+                report = self.connector.postData(self.endpoint_company +
+                                                 self._getReport, data=request, headers=self.header)
             if verbose:
-                print('Data received.')
+                print('Data received.' if not fromCheckpoint else f'Page {page_nb} read from the checkpoint.')
             # Recursion to take care of throttling limit
             while report.get('status_code', 200) == 429 or report.get('error_code', None) == "429050":
                 if verbose:
@@ -4464,11 +4492,14 @@ class Analytics:
             if last_page == False and n_results != float('inf'):
                 if count_elements >= n_results:
                     last_page = True
-            data = report['rows']
-            data_list += deepcopy(data)  # do a deepcopy
+            data_list += report['rows']  # the rows are moved to the list, the report is not used anymore
+            if checkpoint is not None and not fromCheckpoint:
+                checkpoint.savePage(fingerprint, page_nb, report)
             page_nb += 1
             if verbose:
                 print(f'# of requests : {page_nb}')
+        if checkpoint is not None:
+            checkpoint.clear(fingerprint)
         # return report
         df = self._readData(data_list, anomaly=anomaly,
                             cols=columns, item_id=item_id)
@@ -4497,14 +4528,13 @@ class Analytics:
         """
         if dataRows is None:
             raise ValueError("Require dataRows")
-        data_rows = deepcopy(dataRows)
         expanded_rows = {}
         if reportType == "normal":
-            for row in data_rows:
-                expanded_rows[row["itemId"]] = [row["value"]]
-                expanded_rows[row["itemId"]] += row["data"]
+            ## new lists per row, the rows received are not modified
+            for row in dataRows:
+                expanded_rows[row["itemId"]] = [row["value"], *row["data"]]
         elif reportType == "static":
-            expanded_rows = data_rows
+            expanded_rows = dataRows
         return expanded_rows
 
     def _decrypteStaticData(
@@ -4549,45 +4579,33 @@ class Analytics:
             obj["columnId"]: obj["filters"][0]
             for obj in dataRequest["metricContainer"]["metrics"]
         }
-        ### create relations for metrics with Filter on top
+        ### create relations for metrics with Filter on top (per column, the other metrics of the row are not filtered)
         filterRelations = {
-            obj["filters"][0]: obj["filters"][1:]
+            obj["columnId"]: obj["filters"][1:]
             for obj in dataRequest["metricContainer"]["metrics"]
             if len(obj["filters"]) > 1
         }
-        staticRows = set(val for val in tableSegmentsRows.values())
+        ## static rows in the order of the request (segment ids or date ranges)
+        staticRows = list(dict.fromkeys(tableSegmentsRows.values()))
         nb_rows = len(staticRows)  ## define  how many segment used as rows
         nb_columns = int(
             len(dataRequest["metricContainer"]["metrics"]) / nb_rows
         )  ## use to detect rows
-        staticRows = set(val for val in tableSegmentsRows.values())
-        staticRowsNames = []
-        for row in staticRows:
-            if row.startswith("s") in row and row[1].isdigit():
-                filter = self.Segment(row)
-                staticRowsNames.append(filter["name"])
-            else:
-                staticRowsNames.append(row)
-        if resolveColumns:
+        ### names of the rows, the segments being resolved in one batch
+        segmentRows = [row for row in staticRows if row.startswith("s") and row[1:2].isdigit()]
+        if resolveColumns and len(segmentRows) > 0:
+            self.catalog.prefetch(segments=segmentRows)
             staticRowDict = {
-                row: self.getSegment(rowName).get('name', rowName) for row, rowName in zip(staticRows, staticRowsNames)
+                row: self.catalog.segmentName(row) if row in segmentRows else row for row in staticRows
             }
         else:
-            staticRowDict = {
-                row: rowName for row, rowName in zip(staticRows, staticRowsNames)
-            }
-        ### metrics
-        dataRows = defaultdict(list)
-        for row in staticRowDict:  ## iter on the different static rows
-            for column, data in zip(
-                    response["columns"]["columnIds"], response["summaryData"]["totals"]
-            ):
-                if tableSegmentsRows[tableColumnIds[column]] == row:
-                    ## check translation of metricId with Static Row ID
-                    if row not in dataRows[staticRowDict[row]]:
-                        dataRows[staticRowDict[row]].append(row)
-                    dataRows[staticRowDict[row]].append(data)
-                ## should ends like : {'segmentName' : ['STATIC',123,456]}
+            staticRowDict = {row: row for row in staticRows}
+        ### metrics: columnId -> static row, then one pass over the columns of the response
+        columnRows = {column: tableSegmentsRows[staticRowId] for column, staticRowId in tableColumnIds.items()}
+        dataRows = {staticRowDict[row]: [row] for row in staticRows}  ## rows in the order of the request
+        for column, data in zip(response["columns"]["columnIds"], response["summaryData"]["totals"]):
+            dataRows[staticRowDict[columnRows[column]]].append(data)
+        ## should ends like : {'segmentName' : ['STATIC',123,456]}
         return nb_columns, tableColumnIds, segmentApplied, filterRelations, dataRows
 
     def getReport2(
@@ -4609,7 +4627,15 @@ class Analytics:
             returnClass: bool = True,
             workspaceClass: type = None,
             workspaceKwargs: dict = None,
-    ) -> Union[Workspace, dict]:
+            rateController: RateController = None,
+            maxMetrics: int = MAX_METRICS_PER_REQUEST,
+            compact: bool = False,
+            spillThreshold: int = None,
+            checkpoint: Union[str, ReportCheckpoint] = None,
+            decodeProcesses: int = None,
+            fastDecode: bool = False,
+            totalsOnly: bool = False,
+    ) -> Union[Workspace, dict, pd.Series]:
         """
         Return an instance of Workspace that contains the data requested.
         Argumnents:
@@ -4631,24 +4657,98 @@ class Analytics:
         kwargs:
         * workspaceClass : OPTIONAL : class to instantiate instead of Workspace (e.g. TargetWorkspace). Must share the same __init__ signature.
         * workspaceKwargs : OPTIONAL : additional keyword arguments forwarded to workspaceClass.__init__ beyond the standard Workspace parameters.
-        """
+        * rateController : OPTIONAL : RateController instance to share a concurrency and rate budget between several reports.
+        * maxMetrics : OPTIONAL : maximum number of metrics per API call (default MAX_METRICS_PER_REQUEST).
+            Requests with more metrics are split into several requests, executed concurrently and joined on the itemId.
+        * compact : OPTIONAL : reduce the memory used by the dataframe: categorical dimension values and itemIds,
+            metrics downcast to the narrowest integer type or float32 when it is lossless.
+            The memory used before and after is available in the memoryUsage attribute of the Workspace (default False).
+        * spillThreshold : OPTIONAL : maximum number of rows kept in memory while the pages are received (default None).
+            Beyond it, the rows are written in a temporary Arrow IPC file (spillFile attribute of the Workspace)
+            and the dataframe is built on the memory-mapped file, with Arrow-backed columns.
+            Used for the reports with a dimension returned as a Workspace (without workspaceClass). Requires pyarrow.
+        * checkpoint : OPTIONAL : folder (or ReportCheckpoint instance) where each page is saved as soon as it is received.
+            If the report fails, requesting it again with the same checkpoint resumes from the first missing page.
+            The pages are deleted once the report is complete (default None).
+        * decodeProcesses : OPTIONAL : number of processes decoding the pages (default None, decoded in the thread).
+            The raw pages are decoded and shaped into column arrays in a process pool shared by all the reports,
+            so the reports requested in parallel (getReports) are decoded on several cores.
+            The dataframe is then built directly from the arrays. Used when the Workspace is returned, without checkpoint.
+            The processes are started with "spawn": a script using this option needs the if __name__ == "__main__": guard.
+        * fastDecode : OPTIONAL : decode the pages in the thread directly into column arrays, with orjson or msgspec
+            when installed (json module otherwise), instead of building the rows as dictionaries (default False).
+            Used when the Workspace is returned, without checkpoint.
+        * totalsOnly : OPTIONAL : only request the totals of the metrics (default False).
+            The minimal request is sent (no dimension, limit of 1 row) and a pandas Series of the totals is returned,
+            indexed by metric followed by its segments, global segments included (see getTotals to request many totals concurrently).
+        """
+        if isinstance(checkpoint, (str, Path)):
+            checkpoint = ReportCheckpoint(checkpoint)
         if self.loggingEnabled:
             self.logger.debug(f"Start getReport")
-        path = "/reports"
-        params = {
+        params = self._reportParams(allowRemoteLoad=allowRemoteLoad, useCache=useCache,
+                                    useResultsCache=useResultsCache, includeOberonXml=includeOberonXml,
+                                    includePredictiveObjects=includePredictiveObjects)
+        dataRequest = self._prepareReportRequest(request, limit=limit, returnsNone=returnsNone,
+                                                 countRepeatInstances=countRepeatInstances, rsid=rsid,
+                                                 ignoreZeroes=ignoreZeroes)
+        if totalsOnly:
+            dataRequest = totalsRequest(dataRequest)
+            res = self._fetchReport(dataRequest, params=params, rateController=rateController)
+            return self._totalsSeries(dataRequest, res)
+        if spillThreshold is not None and returnClass and workspaceClass is None and "dimension" in dataRequest \
+                and (maxMetrics is None or len(dataRequest["metricContainer"]["metrics"]) <= maxMetrics):
+            return self._fetchSpilledReport(dataRequest, params=params, n_results=n_results,
+                                            rateController=rateController, spillThreshold=spillThreshold,
+                                            resolveColumns=resolveColumns, save=save, checkpoint=checkpoint)
+        decodePool = getDecodePool(decodeProcesses) if decodeProcesses is not None and returnClass else None
+        res = self._fetchSplitReport(dataRequest, params=params, n_results=n_results,
+                                     rateController=rateController, maxMetrics=maxMetrics, checkpoint=checkpoint,
+                                     decodePool=decodePool, columnar=fastDecode and returnClass)
+        if returnClass == False:
+            return res.get("rows") if "rows" in res.keys() else res
+        ## the request is the copy made by _prepareReportRequest, given to the Workspace as it is
+        return self._buildReport(dataRequest, res, resolveColumns=resolveColumns, save=save,
+                                 workspaceClass=workspaceClass, workspaceKwargs=workspaceKwargs, compact=compact,
+                                 copyRequest=False)
+
+    def _reportParams(self,
+                      allowRemoteLoad: str = "default",
+                      useCache: bool = True,
+                      useResultsCache: bool = False,
+                      includeOberonXml: bool = False,
+                      includePredictiveObjects: bool = False,
+                      ) -> dict:
+        """
+        Return the query parameters sent with the report requests.
+        """
+        return {
             "allowRemoteLoad": allowRemoteLoad,
             "useCache": useCache,
             "useResultsCache": useResultsCache,
             "includeOberonXml": includeOberonXml,
             "includePlatformPredictiveObjects": includePredictiveObjects,
         }
-        workspaceClass = workspaceClass if workspaceClass is not None else Workspace
-        workspaceKwargs = workspaceKwargs if workspaceKwargs is not None else {}
+
+    def _prepareReportRequest(self,
+                              request: Union[dict, IO, RequestCreator] = None,
+                              limit: int = 20000,
+                              returnsNone: bool = None,
+                              countRepeatInstances: bool = None,
+                              rsid: str = None,
+                              ignoreZeroes: bool = None,
+                              ) -> dict:
+        """
+        Return a copy of the report request with the settings used by getReport2 applied.
+        Arguments:
+            request : REQUIRED : dictionary, JSON file path or RequestCreator instance.
+            see getReport2 for the other arguments.
+        """
         if type(request) == dict:
             dataRequest = request
         elif isinstance(request, RequestCreator):
             dataRequest = request.to_dict()
-        elif ".json" in request:
+        elif type(request) == str and ".json" in request:
             with open(request, "r") as f:
                 dataRequest = json.load(f)
         else:
@@ -4674,51 +4774,301 @@ class Analytics:
             dataRequest["rsid"] = rsid
         if ignoreZeroes:
             dataRequest.setdefault("statistics", {})["ignoreZeroes"] = True
-        deepCopyRequest = deepcopy(dataRequest)
+        return dataRequest
+
+    def _postReport(self, dataRequest: dict, params: dict = None, rateController: RateController = None,
+                    retry: int = 3, raw: bool = False) -> Union[dict, bytes]:
+        """
+        Send one page request to the reports endpoint.
+        When a rateController is passed, the request is sent within its budget and a 429 answer pauses the controller and is retried.
+        The 429 answers are then not retried by the HTTP adapter of the connector, so every retry goes through the controller.
+        Arguments:
+            dataRequest : REQUIRED : request sent
+            params : OPTIONAL : query parameters
+            rateController : OPTIONAL : RateController instance shared between requests
+            retry : OPTIONAL : number of retries on 429 answers when a rateController is used (default 3)
+            raw : OPTIONAL : return the raw content of the response (bytes) instead of the decoded response (default False)
+        """
+        postArgs = {"format": "content"} if raw else {}
+        if rateController is None:
+            return self.connector.postData(self.endpoint_company + self._getReport, data=dataRequest, params=params,
+                                           **postArgs)
+        for attempt in range(retry + 1):
+            with rateController:
+                res = self.connector.postData(self.endpoint_company + self._getReport, data=dataRequest,
+                                              params=params, rateControlled=True, **postArgs)
+            if not isinstance(res, dict) or res.get("status_code", 200) != 429 or attempt == retry:
+                return res
+            if self.loggingEnabled:
+                self.logger.warning(f"429 received for the report request, retrying ({attempt + 1}/{retry})")
+            self.connector.countRetry()
+            rateController.pause(2 ** (attempt + 1))
+        return res
+
+    def _iterReportPages(self, dataRequest: dict, params: dict = None, n_results: Union[int, str] = "inf",
+                         rateController: RateController = None, checkpoint: ReportCheckpoint = None,
+                         decodePool: futures.ProcessPoolExecutor = None, columnar: bool = False) -> Iterable:
+        """
+        Request the report and yield the response of each page, the first one included, as soon as it is received.
+        Raises a RuntimeError when the API returns an error.
+        Arguments:
+            dataRequest : REQUIRED : request prepared by _prepareReportRequest. Its "page" setting is updated.
+            params : OPTIONAL : query parameters returned by _reportParams
+            n_results : OPTIONAL : total number of results returns. Use "inf" to return everything (default "inf")
+            rateController : OPTIONAL : RateController instance shared between requests
+            checkpoint : OPTIONAL : ReportCheckpoint instance. The pages already saved for the request are read
+                from it instead of being requested, the new ones are saved, and all are deleted once the report is complete.
+            decodePool : OPTIONAL : process pool where the raw pages are decoded by decodeReportPage.
+                The rows of the pages are then returned as column arrays, in a "columnar" key. Not used with a checkpoint.
+            columnar : OPTIONAL : decode the raw pages with decodeReportPage in the thread (orjson or msgspec when installed),
+                the rows of the pages being returned as column arrays in a "columnar" key. Not used with a checkpoint.
+        """
+        params = params if params is not None else self._reportParams()
+        if checkpoint is not None:
+            decodePool, columnar = None, False  ## the checkpoint saves the pages as JSON
+        fingerprint = requestFingerprint(dataRequest) if checkpoint is not None else None
+        if checkpoint is not None and self.loggingEnabled:
+            self.logger.debug(f"checkpoint {fingerprint}: pages {checkpoint.pages(fingerprint)} already saved")
+
+        def fetchPage() -> tuple:
+            pageNumber = dataRequest["settings"]["page"]
+            if checkpoint is not None:
+                saved = checkpoint.loadPage(fingerprint, pageNumber)
+                if saved is not None:
+                    return saved, True
+            if decodePool is not None or columnar:
+                content = self._postReport(dataRequest, params=params, rateController=rateController, raw=True)
+                if not isinstance(content, bytes):  ## 429 answer
+                    return content, False
+                if decodePool is not None:
+                    return decodePool.submit(decodeReportPage, content).result(), False
+                return decodeReportPage(content), False
+            return self._postReport(dataRequest, params=params, rateController=rateController), False
+
+        def pageRows(page: dict) -> list:
+            return page["columnar"]["itemId"] if "columnar" in page else page.get("rows")
+
         ### Request data
         if self.loggingEnabled:
             self.logger.debug(f"getReport request: {json.dumps(dataRequest, indent=4)}")
-        res = self.connector.postData(
-            self.endpoint_company + path, data=dataRequest, params=params
-        )
+        res, fromCheckpoint = fetchPage()
         if "errorCode" in res or "error" in res:
             error_code = res.get("errorCode", res.get("error", "unknown"))
             error_msg = res.get("errorDescription", res.get("message", ""))
             raise RuntimeError(f"Analytics API returned an error: {error_code} — {error_msg}")
-        if "rows" in res.keys():
+        if checkpoint is not None and not fromCheckpoint:
+            checkpoint.savePage(fingerprint, dataRequest["settings"]["page"], res)
+        yield res
+        if pageRows(res) is None:  ## static report, no pagination
+            if checkpoint is not None:
+                checkpoint.clear(fingerprint)
+            return
+        nbRows = len(pageRows(res))
+        lastPage = res.get("lastPage", True)
+        if float(nbRows) >= float(n_results):
+            ## force end of loop when a limit is set on n_results
+            lastPage = True
+        while lastPage != True:
+            dataRequest["settings"]["page"] += 1
+            page, fromCheckpoint = fetchPage()
+            if "errorCode" in page or "error" in page:
+                error_code = page.get("errorCode", page.get("error", "unknown"))
+                error_msg = page.get("errorDescription", page.get("message", ""))
+                raise RuntimeError(f"Analytics API returned an error on page {dataRequest['settings']['page']}: {error_code} — {error_msg}")
+            page_rows = pageRows(page)
+            if page_rows is None:
+                raise RuntimeError(f"Analytics API returned no rows on page {dataRequest['settings']['page']}. Full response: {page}")
+            if checkpoint is not None and not fromCheckpoint:
+                checkpoint.savePage(fingerprint, dataRequest["settings"]["page"], page)
+            yield page
+            nbRows += len(page_rows)
+            lastPage = page.get("lastPage", True)
+            if float(nbRows) >= float(n_results):
+                ## force end of loop when a limit is set on n_results
+                lastPage = True
+        if checkpoint is not None:
+            checkpoint.clear(fingerprint)
+
+    def _fetchReport(self, dataRequest: dict, params: dict = None, n_results: Union[int, str] = "inf",
+                     rateController: RateController = None, checkpoint: ReportCheckpoint = None,
+                     decodePool: futures.ProcessPoolExecutor = None, columnar: bool = False) -> dict:
+        """
+        Request the report and loop over the pages. Returns the response of the first page, with the rows of all pages
+        (or their column arrays in the "columnar" key when a decodePool or columnar is used).
+        Raises a RuntimeError when the API returns an error.
+        Arguments:
+            see _iterReportPages
+        """
+        pages = self._iterReportPages(dataRequest, params=params, n_results=n_results, rateController=rateController,
+                                      checkpoint=checkpoint, decodePool=decodePool, columnar=columnar)
+        res = next(pages)
+        if "columnar" in res:
+            parts = [res["columnar"]]
+            totalElements = res.get("numberOfElements", 0)
+            for page in pages:
+                parts.append(page["columnar"])
+                totalElements += page.get("numberOfElements", 0)
+            res["columnar"] = concatColumnar(parts)
+            res["numberOfElements"] = totalElements
+            if self.loggingEnabled:
+                self.logger.debug(f"loop for report over: {len(res['columnar']['itemId'])} results")
+            return res
+        if "rows" not in res.keys():  ## static report, no pagination
+            next(pages, None)  ## completing the generator, to delete the checkpoint
+            return res
+        dataRows = res.get("rows", [])
+        totalElements = res.get("numberOfElements", 0)
+        for page in pages:
+            dataRows += page["rows"]
+            totalElements += page.get("numberOfElements", 0)
+        if self.loggingEnabled:
+            self.logger.debug(f"loop for report over: {len(dataRows)} results")
+        res["rows"] = dataRows
+        res["numberOfElements"] = totalElements
+        return res
+
+    def _firstRowReport(self, dataRequest: dict, firstPage: dict, resolveColumns: bool = True) -> Workspace:
+        """
+        Build the Workspace of the first row of the first page only, to resolve the column names once
+        when the pages are written in a file.
+        Arguments:
+            dataRequest : REQUIRED : request prepared by _prepareReportRequest.
+            firstPage : REQUIRED : response of the first page.
+            resolveColumns : OPTIONAL : resolve the metric names (default True)
+        """
+        sample = {key: value for key, value in firstPage.items() if key != "rows"}
+        sample["rows"] = firstPage.get("rows", [])[:1]
+        return self._buildReport(deepcopy(dataRequest), sample, resolveColumns=resolveColumns, copyRequest=False)
+
+    def _fetchSpilledReport(self, dataRequest: dict, params: dict = None, n_results: Union[int, str] = "inf",
+                            rateController: RateController = None, spillThreshold: int = 100000,
+                            resolveColumns: bool = True, save: bool = False,
+                            checkpoint: ReportCheckpoint = None) -> Workspace:
+        """
+        Request the report and return its Workspace, writing the rows in a temporary Arrow IPC file as soon as
+        more than spillThreshold rows are waiting in memory. When the file is used, the dataframe is built on
+        the memory-mapped file (Arrow-backed columns), so the rows are never all in memory as python objects.
+        Arguments:
+            dataRequest : REQUIRED : request prepared by _prepareReportRequest, with a dimension.
+            spillThreshold : OPTIONAL : maximum number of rows kept in memory (default 100000)
+            see _fetchReport and getReport2 for the other arguments.
+        """
+        import pyarrow as pa
+        pages = self._iterReportPages(dataRequest, params=params, n_results=n_results, rateController=rateController,
+                                      checkpoint=checkpoint)
+        firstPage = next(pages)
+        dataRows = list(firstPage.get("rows", []))
+        totalElements = firstPage.get("numberOfElements", 0)
+        writer, workspace = None, None
+        try:
+            for page in pages:
+                dataRows += page["rows"]
+                totalElements += page.get("numberOfElements", 0)
+                if len(dataRows) > spillThreshold:
+                    if writer is None:
+                        workspace = self._firstRowReport(dataRequest, firstPage, resolveColumns=resolveColumns)
+                        spillFile = tempfile.NamedTemporaryFile(prefix="aanalytics2_", suffix=".arrow", delete=False)
+                        spillFile.close()
+                        writer = ArrowPageWriter(spillFile.name, workspace.columns, fileFormat="feather")
+                        if self.loggingEnabled:
+                            self.logger.debug(f"spilling the report rows to {spillFile.name}")
+                    writer.write(dataRows)
+                    dataRows = []
+            if writer is None:
+                res = {key: value for key, value in firstPage.items() if key != "rows"}
+                res["rows"] = dataRows
+                res["numberOfElements"] = totalElements
+                return self._buildReport(dataRequest, res, resolveColumns=resolveColumns, save=save,
+                                         copyRequest=False)
+            writer.write(dataRows)
+        finally:
+            if writer is not None:
+                writer.close()
+        table = pa.ipc.open_file(pa.memory_map(writer.filename, "r")).read_all()
+        df = table.to_pandas(types_mapper=pd.ArrowDtype)
+        df.columns = workspace.columns
+        workspace.dataframe = df
+        workspace.row_numbers = len(df)
+        workspace.spillFile = writer.filename
+        ## the file is removed with the Workspace, the mapping stays readable where the system allows it
+        weakref.finalize(workspace, self._removeSpillFile, writer.filename)
+        if save:
+            workspace.to_csv()
+        return workspace
+
+    @staticmethod
+    def _removeSpillFile(filename: str) -> None:
+        try:
+            os.remove(filename)
+        except OSError:
+            pass  ## still mapped (Windows), left in the temporary folder
+
+    def _fetchSplitReport(self, dataRequest: dict, params: dict = None, n_results: Union[int, str] = "inf",
+                          rateController: RateController = None,
+                          maxMetrics: int = MAX_METRICS_PER_REQUEST, checkpoint: ReportCheckpoint = None,
+                          decodePool: futures.ProcessPoolExecutor = None, columnar: bool = False) -> dict:
+        """
+        Split the request into requests of maxMetrics metrics, fetch them concurrently and join them on the itemId.
+        Returns a response covering all the metrics of the request, in the original column order,
+        with the items of the first sub-request. The items another sub-request did not return are requested
+        again with an itemIds search, the ones still missing get None for its metrics.
+        Requests that do not need to be split (or cannot be) are fetched with _fetchReport.
+        Arguments:
+            dataRequest : REQUIRED : request prepared by _prepareReportRequest.
+            maxMetrics : OPTIONAL : maximum number of metrics per request. None to never split.
+            decodePool : OPTIONAL : process pool decoding the pages, used for the requests that are not split.
+            columnar : OPTIONAL : decode the pages in column arrays, used for the requests that are not split.
+            see _fetchReport for the other arguments.
+        """
+        if maxMetrics is None or not isMergeable(dataRequest) \
+                or len(dataRequest["metricContainer"]["metrics"]) <= maxMetrics:
+            return self._fetchReport(dataRequest, params=params, n_results=n_results, rateController=rateController,
+                                     checkpoint=checkpoint, decodePool=decodePool, columnar=columnar)
+        subRequests = splitMetricContainer(dataRequest, maxMetrics=maxMetrics)
+        if self.loggingEnabled:
+            self.logger.debug(f"Request with {len(dataRequest['metricContainer']['metrics'])} metrics split into {len(subRequests)} requests")
+        with futures.ThreadPoolExecutor(min(len(subRequests), 5)) as executor:
+            responses = list(executor.map(
+                lambda subRequest: self._fetchReport(subRequest, params=params, n_results=n_results,
+                                                     rateController=rateController, checkpoint=checkpoint),
+                subRequests))
+        ## items of the first response that another sub-request did not return (ties, truncation) are requested by id
+        for subRequest, response, itemIds in zip(subRequests, responses, missingItems(responses)):
+            for start in range(0, len(itemIds), 1000):
+                itemsRes = self._fetchReport(itemsRequest(subRequest, itemIds[start:start + 1000]), params=params,
+                                             rateController=rateController)
+                response["rows"] = response.get("rows", []) + itemsRes.get("rows", [])
+        columnIds = [metric["columnId"] for metric in dataRequest["metricContainer"]["metrics"]]
+        return joinSplitResponses(responses, columnIds)
+
+    def _buildReport(self,
+                     dataRequest: dict,
+                     res: dict,
+                     resolveColumns: bool = True,
+                     save: bool = False,
+                     workspaceClass: type = None,
+                     workspaceKwargs: dict = None,
+                     compact: bool = False,
+                     copyRequest: bool = True,
+                     ) -> Workspace:
+        """
+        Build the Workspace instance from the request and the response returned by _fetchReport.
+        Arguments:
+            dataRequest : REQUIRED : request used for the report.
+            res : REQUIRED : response returned by _fetchReport.
+            copyRequest : OPTIONAL : give a copy of the request to the Workspace (default True).
+                False when the request is not used by the caller anymore.
+            see getReport2 for the other arguments.
+        """
+        deepCopyRequest = deepcopy(dataRequest) if copyRequest else dataRequest
+        deepCopyRequest["settings"]["page"] = 0  ## request as sent for the first page
+        if "rows" in res.keys() or "columnar" in res.keys():
             reportType = "normal"
             if self.loggingEnabled:
                 self.logger.debug(f"reportType: {reportType}")
             dataRows = res.get("rows", [])
             columns = res.get("columns")
             summaryData = res.get("summaryData")
-            totalElements = res.get("numberOfElements", 0)
-            lastPage = res.get("lastPage", True)
-            if float(len(dataRows)) >= float(n_results):
-                ## force end of loop when a limit is set on n_results
-                lastPage = True
-            while lastPage != True:
-                dataRequest["settings"]["page"] += 1
-                res = self.connector.postData(
-                    self.endpoint_company + path, data=dataRequest, params=params
-                )
-                if "errorCode" in res or "error" in res:
-                    error_code = res.get("errorCode", res.get("error", "unknown"))
-                    error_msg = res.get("errorDescription", res.get("message", ""))
-                    raise RuntimeError(f"Analytics API returned an error on page {dataRequest['settings']['page']}: {error_code} — {error_msg}")
-                page_rows = res.get("rows")
-                if page_rows is None:
-                    raise RuntimeError(f"Analytics API returned no rows on page {dataRequest['settings']['page']}. Full response: {res}")
-                dataRows += page_rows
-                lastPage = res.get("lastPage", True)
-                totalElements += res.get("numberOfElements", 0)
-                if float(len(dataRows)) >= float(n_results):
-                    ## force end of loop when a limit is set on n_results
-                    lastPage = True
-            if self.loggingEnabled:
-                self.logger.debug(f"loop for report over: {len(dataRows)} results")
-            if returnClass == False:
-                return dataRows
             ### create relation between metrics and filters applied
             columnIdRelations = {
                 obj["columnId"]: obj["id"]
@@ -4731,6 +5081,12 @@ class Analytics:
             }
             metricFilters = {}
             metricFilterTranslation = {}
+            if resolveColumns:  ## segment names retrieved in one batch, only when they are displayed
+                self.catalog.prefetch(segments=[
+                    filter["segmentId"]
+                    for filter in dataRequest["metricContainer"].get("metricFilters", []) + dataRequest["globalFilters"]
+                    if filter["type"] == "segment" and filter.get("segmentId", "").startswith("s")
+                ])
             for filter in dataRequest["metricContainer"].get("metricFilters", []):
                 filterId = filter["id"]
                 if filter["type"] == "breakdown":
@@ -4742,8 +5098,7 @@ class Analytics:
                 elif filter["type"] == "segment":
                     filterValue = f"{filter['segmentId']}"
                     if filterValue.startswith("s") and filterValue[1].isdigit():
-                        seg = self.getSegment(filterValue)
-                        metricFilters[filterValue] = seg["name"]
+                        metricFilters[filterValue] = self.catalog.segmentName(filterValue) if resolveColumns else filterValue
                 else:
                     filterValue = filterId  ## fallback: use the filter id itself
                 metricFilterTranslation[filterId] = filterValue
@@ -4753,8 +5108,6 @@ class Analytics:
                 for element in filterRelations.get(colId, []):
                     metricColumns[colId] += f":::{metricFilterTranslation[element]}"
         else:
-            if returnClass == False:
-                return res
             reportType = "static"
             if self.loggingEnabled:
                 self.logger.debug(f"reportType: {reportType}")
@@ -4770,50 +5123,658 @@ class Analytics:
             ### Findings metrics
             metricFilters = {}
             metricColumns = []
+            ## segments and calculated metrics of the columns resolved in one batch
+            columnIds = res["columns"]["columnIds"][:nb_columns]
+            self.catalog.prefetch(
+                segments=[segmentApplied[element] for column in columnIds
+                          for element in filterRelations.get(column, [])
+                          if segmentApplied[element].startswith("s") and segmentApplied[element][1:2].isdigit()],
+                calculatedMetrics=[column.split(":::")[0] for column in columnIds
+                                   if column.split(":::")[0].startswith("cm")],
+            )
             for i in range(nb_columns):
                 metric: str = res["columns"]["columnIds"][i]
                 metricName = metric.split(":::")[0]
                 if metricName.startswith("cm"):
-                    calcMetric = self.getCalculatedMetric(metricName)
-                    metricName = calcMetric["name"]
-                correspondingStatic = tableColumnIds[metric]
-                ## if the static row has a filter
-                if correspondingStatic in list(filterRelations.keys()):
+                    metricName = self.catalog.calculatedMetricName(metricName)
+                ## if the metric has a filter on top of its static row
+                if metric in filterRelations:
                     ## finding segment applied to metrics
-                    for element in filterRelations[correspondingStatic]:
+                    for element in filterRelations[metric]:
                         segId: str = segmentApplied[element]
                         metricName += f":::{segId}"
                         metricFilters[segId] = segId
-                        if segId.startswith("s") and segId[1].isdigit():
-                            seg = self.getSegment(segId)
-                            metricFilters[segId] = seg["name"]
+                        if segId.startswith("s") and segId[1:2].isdigit():
+                            metricFilters[segId] = self.catalog.segmentName(segId)
                 metricColumns.append(metricName)
                 ### ending with ['metric1','metric2 + segId',...]
         ### preparing data points
         if self.loggingEnabled:
             self.logger.debug(f"preparing data")
-        preparedData = self._prepareData(dataRows, reportType=reportType)
-        if returnClass:
+        if "columnar" in res.keys():  ## pages decoded in column arrays, the dataframe is built directly
+            columnar = res["columnar"]
+            preparedData = pd.DataFrame({"itemId": columnar["itemId"], "value": columnar["value"]})
+            for index in range(columnar["data"].shape[1]):
+                preparedData[index] = columnar["data"][:, index]
+        else:
+            preparedData = self._prepareData(dataRows, reportType=reportType)
+        if self.loggingEnabled:
+            self.logger.debug(f"returning Workspace class")
+        ## Using the class
+        klass = workspaceClass if workspaceClass is not None else Workspace
+        data = klass(
+            responseData=preparedData,
+            dataRequest=deepCopyRequest,
+            columns=columns,
+            summaryData=summaryData,
+            analyticsConnector=self,
+            reportType=reportType,
+            metrics=metricColumns,  ## for normal type   ## for staticReport
+            metricFilters=metricFilters,
+            resolveColumns=resolveColumns,
+            compact=compact,
+            **(workspaceKwargs or {}),
+        )
+        if save:
+            data.to_csv()
+        return data
+
+    def exportReport(
+            self,
+            request: Union[dict, IO, RequestCreator] = None,
+            filename: str = None,
+            fileFormat: str = "parquet",
+            n_results: Union[int, str] = "inf",
+            rateController: RateController = None,
+            **kwargs,
+    ) -> str:
+        """
+        Request a report and write it in a parquet or feather (Arrow IPC) file page by page (one row group per page),
+        so the complete report is never in memory. The columns are the same as the Workspace dataframe:
+        itemId, the dimension (dictionary encoded) and the metrics (float64). Returns the filename.
+        Requires the pyarrow module.
+        Arguments:
+            request : REQUIRED : dictionary, JSON file path or RequestCreator instance, with a dimension.
+            filename : OPTIONAL : name of the file (default "report_<timestamp>.<fileFormat>")
+            fileFormat : OPTIONAL : "parquet" or "feather" (default "parquet")
+            n_results : OPTIONAL : total number of results returns. Use "inf" to return everything (default "inf")
+            rateController : OPTIONAL : RateController instance to share a rate budget with other reports.
+        kwargs:
+            limit, resolveColumns and the other arguments of getReport2 used to prepare and send the request.
+        """
+        if fileFormat not in ("parquet", "feather"):
+            raise ValueError("fileFormat should be 'parquet' or 'feather'")
+        prepareArgs, paramsArgs, buildArgs = self._splitReportKwargs(kwargs)
+        dataRequest = self._prepareReportRequest(request, **prepareArgs)
+        if "dimension" not in dataRequest:
+            raise ValueError("The request requires a dimension to be exported page by page")
+        if filename is None:
+            filename = f"report_{int(time.time())}.{fileFormat}"
+        pages = self._iterReportPages(dataRequest, params=self._reportParams(**paramsArgs), n_results=n_results,
+                                      rateController=rateController)
+        firstPage = next(pages)
+        columns = [metric["columnId"] for metric in dataRequest["metricContainer"]["metrics"]]
+        columns = ["itemId", dataRequest["dimension"]] + columns
+        if len(firstPage.get("rows", [])) > 0:
+            columns = self._firstRowReport(dataRequest, firstPage,
+                                           resolveColumns=buildArgs.get("resolveColumns", True)).columns
+        nbRows = 0
+        with ArrowPageWriter(filename, columns, fileFormat=fileFormat) as writer:
+            for page in chain([firstPage], pages):
+                rows = page.get("rows", [])
+                if float(nbRows + len(rows)) > float(n_results):
+                    rows = rows[:int(n_results) - nbRows]
+                writer.write(rows)
+                nbRows += len(rows)
+        if self.loggingEnabled:
+            self.logger.debug(f"{nbRows} rows exported in {filename}")
+        return filename
+
+    def getReports(
+            self,
+            requests: Union[list, Iterable] = None,
+            max_concurrency: int = 5,
+            maxRequestsPerSecond: float = 2,
+            burst: int = 12,
+            merge: bool = False,
+            maxMetrics: int = MAX_METRICS_PER_REQUEST,
+            **kwargs,
+    ) -> ReportBatch:
+        """
+        Execute a list or an iterator of requests concurrently, under one shared concurrency and rate budget.
+        Returns a ReportBatch instance. Iterating over it yields (request, Workspace or exception) as each request finishes.
+        A failing request does not stop the others, the exception raised is returned as its result.
+        After the iteration, the "summary" attribute of the ReportBatch gives the wall time, number of API calls and retries.
+        Arguments:
+            requests : REQUIRED : list or iterator of requests (dictionary, JSON file path or RequestCreator instance).
+            max_concurrency : OPTIONAL : number of reports requested at the same time (default 5).
+                Adobe Analytics usually processes 5 reports at the same time for an organization.
+            maxRequestsPerSecond : OPTIONAL : average number of report calls per second for the whole batch (default 2).
+                The API allows 12 requests per 6 seconds and 120 requests per minute.
+            burst : OPTIONAL : number of report calls that can be sent at once before the rate applies (default 12).
+            merge : OPTIONAL : merge the requests that only differ in their metrics into one API call (default False).
+                Same report suite, dimension, dateRange and global filters, search, settings and sorting metric.
+                The columns are split back so each request still gets its own Workspace.
+                The requests are all read before the first report is requested.
+            maxMetrics : OPTIONAL : maximum number of metrics in one merged request (default MAX_METRICS_PER_REQUEST).
+        kwargs:
+            Any argument of the getReport2 method (limit, n_results, resolveColumns, returnClass, ...)
+        Example:
+            batch = mycompany.getReports(myRequests, max_concurrency=5)
+            for request, report in batch:
+                if isinstance(report, Exception):
+                    ...
+            batch.summary
+        """
+        if requests is None:
+            raise ValueError("Require a list or an iterator of requests")
+        if self.loggingEnabled:
+            self.logger.debug(f"Starting getReports")
+        rateController = kwargs.pop("rateController", None) or RateController(
+            maxRequestsPerSecond=maxRequestsPerSecond, burst=burst, maxConcurrency=max_concurrency)
+
+        if merge:
+            return self._getMergedReports(requests, rateController, max_concurrency=max_concurrency,
+                                          maxMetrics=maxMetrics, **kwargs)
+
+        def runner(request):
+            return self.getReport2(request, rateController=rateController, **kwargs)
+
+        return ReportBatch(requests, runner, max_concurrency=max_concurrency, connector=self.connector)
+
+    def getTotals(
+            self,
+            requests: Union[list, Iterable] = None,
+            max_concurrency: int = 5,
+            maxRequestsPerSecond: float = 2,
+            burst: int = 12,
+            merge: bool = True,
+            maxMetrics: int = MAX_METRICS_PER_REQUEST,
+            **kwargs,
+    ) -> ReportBatch:
+        """
+        Request only the totals of the metrics of a list of requests (e.g. the KPI tiles of a dashboard), concurrently.
+        Each request is reduced to its minimal form (no dimension, limit of 1 row) and, with merge, the requests sharing
+        the same report suite, dateRange and settings are sent in one API call, their global segments being applied
+        as metric filters. Returns a ReportBatch instance: iterating over it yields (request, pandas Series of the totals
+        indexed by metric) tuples, or (request, exception) for a failing request.
+        Arguments:
+            requests : REQUIRED : list or iterator of requests (dictionary, JSON file path or RequestCreator instance).
+            max_concurrency : OPTIONAL : number of API calls at the same time (default 5).
+            maxRequestsPerSecond : OPTIONAL : average number of report calls per second (default 2).
+            burst : OPTIONAL : number of report calls that can be sent at once before the rate applies (default 12).
+            merge : OPTIONAL : merge the totals requests in as few API calls as possible (default True).
+                The requests are all read before the first call.
+            maxMetrics : OPTIONAL : maximum number of metrics in one merged request (default MAX_METRICS_PER_REQUEST).
+        kwargs:
+            rsid, returnsNone, countRepeatInstances, ignoreZeroes and the query parameters of getReport2.
+        Example:
+            for request, totals in mycompany.getTotals(myTiles):
+                totals["metrics/visits"]
+        """
+        if requests is None:
+            raise ValueError("Require a list or an iterator of requests")
+        rateController = kwargs.pop("rateController", None) or RateController(
+            maxRequestsPerSecond=maxRequestsPerSecond, burst=burst, maxConcurrency=max_concurrency)
+        prepareArgs, paramsArgs, _ = self._splitReportKwargs(kwargs)
+        params = self._reportParams(**paramsArgs)
+        if not merge:
+            def runner(request):
+                dataRequest = totalsRequest(self._prepareReportRequest(request, **prepareArgs))
+                res = self._fetchReport(dataRequest, params=params, rateController=rateController)
+                return self._totalsSeries(dataRequest, res)
+
+            return ReportBatch(requests, runner, max_concurrency=max_concurrency, connector=self.connector)
+        originals, prepared, items = [], [], []
+        for request in requests:
+            try:
+                prepared.append(self._prepareReportRequest(request, **prepareArgs))
+                originals.append(request)
+            except Exception as error:
+                items.append((request, error))  ## reported as the result of that request
+        plans = planTotalsRequests(prepared, maxMetrics=maxMetrics, originals=originals)
+        if self.loggingEnabled:
+            self.logger.debug(f"getTotals merged {len(prepared)} requests into {len(plans)} requests")
+        items = plans + items
+
+        def membersOf(item):
+            if type(item) == tuple:
+                return [item[0]]
+            return [member[0] for member in item.members]
+
+        def mergedRunner(item):
+            if type(item) == tuple:
+                raise item[1]
+            res = self._fetchReport(item.request, params=params, rateController=rateController)
+            return [self._totalsSeries(dataRequest, splitMergedResponse(res, columnMap))
+                    for _, dataRequest, columnMap in item.members]
+
+        return ReportBatch(items, mergedRunner, max_concurrency=max_concurrency, connector=self.connector,
+                           membersOf=membersOf)
+
+    @staticmethod
+    def _totalsSeries(dataRequest: dict, res: dict) -> pd.Series:
+        """
+        Return the totals of a response as a Series indexed by metric: the metric id, followed by its filters
+        (segment id, dateRange or dimension:itemId) separated by ":::", as in the Workspace columns.
+        Arguments:
+            dataRequest : REQUIRED : totals request (see totalsRequest) whose metrics are in the response,
+                the global segments of the original request being metric filters.
+            res : REQUIRED : response with the summaryData of the metrics.
+        """
+        filterNames = {}
+        for metricFilter in dataRequest["metricContainer"].get("metricFilters", []):
+            if metricFilter["type"] == "segment":
+                filterNames[metricFilter["id"]] = metricFilter.get("segmentId", metricFilter["id"])
+            elif metricFilter["type"] == "dateRange":
+                filterNames[metricFilter["id"]] = metricFilter["dateRange"]
+            elif metricFilter["type"] == "breakdown":
+                filterNames[metricFilter["id"]] = f"{metricFilter['dimension']}:{metricFilter['itemId']}"
+            else:
+                filterNames[metricFilter["id"]] = metricFilter["id"]
+        names = {
+            metric["columnId"]: ":::".join([metric["id"]] + [filterNames[filterId]
+                                                             for filterId in metric.get("filters", [])])
+            for metric in dataRequest["metricContainer"]["metrics"]
+        }
+        columnIds = res.get("columns", {}).get("columnIds", [])
+        totals = res.get("summaryData", {}).get("totals", [])
+        return pd.Series(totals, index=[names.get(columnId, columnId) for columnId in columnIds], dtype="float64")
+
+    def _splitReportKwargs(self, kwargs: dict) -> tuple:
+        """
+        Split getReport2 keyword arguments into the arguments of _prepareReportRequest, _reportParams and _buildReport.
+        """
+        prepareArgs = {key: kwargs[key] for key in
+                       ("limit", "returnsNone", "countRepeatInstances", "rsid", "ignoreZeroes") if key in kwargs}
+        paramsArgs = {key: kwargs[key] for key in
+                      ("allowRemoteLoad", "useCache", "useResultsCache", "includeOberonXml",
+                       "includePredictiveObjects") if key in kwargs}
+        buildArgs = {key: kwargs[key] for key in
+                     ("resolveColumns", "save", "workspaceClass", "workspaceKwargs", "compact") if key in kwargs}
+        return prepareArgs, paramsArgs, buildArgs
+
+    def _getMergedReports(self, requests: Union[list, Iterable], rateController: RateController,
+                          max_concurrency: int = 5, maxMetrics: int = MAX_METRICS_PER_REQUEST,
+                          **kwargs) -> ReportBatch:
+        """
+        Plan the requests with planMergedRequests and return a ReportBatch executing one API call per merged request.
+        Arguments:
+            requests : REQUIRED : list or iterator of requests.
+            rateController : REQUIRED : RateController instance shared between the merged requests.
+            see getReports and getReport2 for the other arguments.
+        """
+        prepareArgs, paramsArgs, buildArgs = self._splitReportKwargs(kwargs)
+        n_results = kwargs.get("n_results", "inf")
+        returnClass = kwargs.get("returnClass", True)
+        params = self._reportParams(**paramsArgs)
+        originals, prepared, items = [], [], []
+        for request in requests:
+            try:
+                prepared.append(self._prepareReportRequest(request, **prepareArgs))
+                originals.append(request)
+            except Exception as error:
+                items.append((request, error))  ## reported as the result of that request
+        plans = planMergedRequests(prepared, maxMetrics=maxMetrics, originals=originals)
+        if self.loggingEnabled:
+            self.logger.debug(f"getReports merged {len(prepared)} requests into {len(plans)} requests")
+        items = plans + items
+
+        def membersOf(item):
+            if type(item) == tuple:
+                return [item[0]]
+            return [member[0] for member in item.members]
+
+        def runner(item):
+            if type(item) == tuple:
+                raise item[1]
+            res = self._fetchSplitReport(item.request, params=params, n_results=n_results,
+                                         rateController=rateController, maxMetrics=maxMetrics)
+            results = []
+            for _, dataRequest, columnMap in item.members:
+                ## a member failing to build is reported as its own result, the other members are kept
+                try:
+                    memberRes = splitMergedResponse(res, columnMap) if "rows" in res.keys() else res
+                    if returnClass == False:
+                        results.append(memberRes.get("rows") if "rows" in memberRes.keys() else memberRes)
+                    else:
+                        results.append(self._buildReport(dataRequest, memberRes, **buildArgs))
+                except Exception as error:
+                    results.append(error)
+            return results
+
+        return ReportBatch(items, runner, max_concurrency=max_concurrency, connector=self.connector,
+                           membersOf=membersOf)
+
+    def getReportPartitioned(
+            self,
+            request: Union[dict, IO, RequestCreator] = None,
+            prefixes: list = None,
+            max_concurrency: int = 5,
+            maxRequestsPerSecond: float = 2,
+            burst: int = 12,
+            checkCompleteness: bool = True,
+            **kwargs,
+    ) -> Union[Workspace, list]:
+        """
+        Retrieve all the items of a dimension by splitting the request into disjoint search clauses on the leading
+        characters of the items, executed concurrently and put back together in one Workspace.
+        Useful for dimensions with a very large number of items (page URLs, tracking codes, ...).
+        An additional request (1 row) is made without partition to get the totals and the total number of items,
+        used to check that the partitions returned all the items.
+        Arguments:
+            request : REQUIRED : dictionary, JSON file path or RequestCreator instance. It should not contain a search.
+            prefixes : OPTIONAL : list of leading characters used for the partitions (default a-z and 0-9).
+                The items starting with none of them are requested in an additional partition.
+            max_concurrency : OPTIONAL : number of partitions requested at the same time (default 5).
+            maxRequestsPerSecond : OPTIONAL : average number of report calls per second (default 2).
+            burst : OPTIONAL : number of report calls that can be sent at once before the rate applies (default 12).
+            checkCompleteness : OPTIONAL : raise a RuntimeError when the number of items retrieved differs from
+                the totalElements of the request without partition (default True). Otherwise it is only logged.
+        kwargs:
+            Any argument of the getReport2 method (limit, resolveColumns, returnClass, maxMetrics, ...), except n_results.
+        """
+        if request is None:
+            raise ValueError("Require a JSON or Dictionary to request data")
+        if self.loggingEnabled:
+            self.logger.debug(f"Starting getReportPartitioned")
+        prepareArgs, paramsArgs, buildArgs = self._splitReportKwargs(kwargs)
+        params = self._reportParams(**paramsArgs)
+        maxMetrics = kwargs.get("maxMetrics", MAX_METRICS_PER_REQUEST)
+        rateController = kwargs.get("rateController", None) or RateController(
+            maxRequestsPerSecond=maxRequestsPerSecond, burst=burst, maxConcurrency=max_concurrency)
+        dataRequest = self._prepareReportRequest(request, **prepareArgs)
+        if "dimension" not in dataRequest:
+            raise ValueError("The request requires a dimension to be partitioned")
+        if "search" in dataRequest:
+            raise ValueError("The request already contains a search, it cannot be partitioned")
+        ### totals and number of items without partition
+        overview = deepcopy(dataRequest)
+        overview["settings"]["limit"] = 1
+        overviewRes = self._fetchSplitReport(overview, params=params, n_results=1,
+                                             rateController=rateController, maxMetrics=maxMetrics)
+        partitions = []
+        for clause in searchPartitions(prefixes):
+            partition = deepcopy(dataRequest)
+            partition["search"] = {"clause": clause}
+            partitions.append(partition)
+        with futures.ThreadPoolExecutor(max(1, min(len(partitions), max_concurrency))) as executor:
+            responses = list(executor.map(
+                lambda partition: self._fetchSplitReport(partition, params=params, n_results="inf",
+                                                         rateController=rateController, maxMetrics=maxMetrics),
+                partitions))
+        dataRows = [row for response in responses for row in response.get("rows", [])]
+        totalElements = overviewRes.get("totalElements")
+        nbItems = len({row["itemId"] for row in dataRows})
+        if nbItems != len(dataRows) or (totalElements is not None and nbItems != totalElements):
+            message = f"Partitions returned {len(dataRows)} rows ({nbItems} unique items) for {totalElements} items expected"
             if self.loggingEnabled:
-                self.logger.debug(f"returning Workspace class")
-            ## Using the class
-            klass = workspaceClass if workspaceClass is not None else Workspace
-            data = klass(
-                responseData=preparedData,
-                dataRequest=deepCopyRequest,
-                columns=columns,
-                summaryData=summaryData,
-                analyticsConnector=self,
-                reportType=reportType,
-                metrics=metricColumns,  ## for normal type   ## for staticReport
-                metricFilters=metricFilters,
-                resolveColumns=resolveColumns,
-                **(workspaceKwargs or {}),
-            )
-            if save:
-                data.to_csv()
-            return data
+                self.logger.warning(message)
+            if checkCompleteness:
+                raise RuntimeError(message)
+        ### same order as the request without partition: settings.dimensionSort, else the sort of the metrics
+        dimensionSort = dataRequest["settings"].get("dimensionSort")
+        if dimensionSort is not None:
+            ## the itemIds of the date dimensions are in chronological order, the other items sorted on their value
+            sortKey = "itemId" if dataRequest["dimension"] in DATE_DIMENSIONS else "value"
+            dataRows.sort(key=lambda row: row.get(sortKey, ""), reverse=dimensionSort == "desc")
+        else:
+            metrics = dataRequest["metricContainer"]["metrics"]
+            sortIndex = next((index for index, metric in enumerate(metrics) if "sort" in metric), 0)
+            dataRows.sort(key=lambda row: row["data"][sortIndex],
+                          reverse=metrics[sortIndex].get("sort", "desc") == "desc")
+        res = {key: value for key, value in overviewRes.items() if key != "rows"}
+        res["rows"] = dataRows
+        res["numberOfElements"] = len(dataRows)
+        if kwargs.get("returnClass", True) == False:
+            return dataRows
+        return self._buildReport(dataRequest, res, **buildArgs)
+
+    def getReportIncremental(
+            self,
+            request: Union[dict, IO, RequestCreator] = None,
+            store: ReportStore = None,
+            lookback: int = 3,
+            **kwargs,
+    ) -> Union[Workspace, list]:
+        """
+        Retrieve a report on a date dimension (variables/daterangeday, variables/daterangemonth, ...) by requesting
+        only the periods that were not closed when the report was last saved in the store.
+        The new rows are merged with the stored ones, the store is updated and the complete report is returned.
+        The first call (or a call with a date range starting earlier or ending earlier than the stored one)
+        requests the whole date range.
+        The stored rows from the start of the new window are dropped, the boundaries being found with requests of 1 row
+        sorted on the date dimension (last period with data before the window, and before the new start of the date range).
+        The rows are returned in chronological order. The totals (summaryData) are requested for the whole date range
+        with one extra request without dimension, so they are correct for the metrics that do not add up across periods
+        (unique visitors, rates, averages, ...).
+        The periods closed are computed in the timezone of the report suite.
+        Arguments:
+            request : REQUIRED : dictionary, JSON file path or RequestCreator instance, with a date dimension
+                and one dateRange global filter.
+            store : REQUIRED : ReportStore instance where the report is saved.
+            lookback : OPTIONAL : number of closed periods requested again, for data arriving late (default 3).
+        kwargs:
+            Any argument of the getReport2 method (limit, resolveColumns, returnClass, maxMetrics, ...), except n_results.
+        """
+        if request is None:
+            raise ValueError("Require a JSON or Dictionary to request data")
+        if store is None:
+            raise ValueError("Require a ReportStore instance")
+        if lookback < 0:
+            raise ValueError("lookback should be a positive number of periods")
+        if self.loggingEnabled:
+            self.logger.debug(f"Starting getReportIncremental")
+        prepareArgs, paramsArgs, buildArgs = self._splitReportKwargs(kwargs)
+        params = self._reportParams(**paramsArgs)
+        maxMetrics = kwargs.get("maxMetrics", MAX_METRICS_PER_REQUEST)
+        dataRequest = self._prepareReportRequest(request, **prepareArgs)
+        freq = DATE_DIMENSIONS.get(dataRequest.get("dimension"))
+        if freq is None:
+            raise ValueError(f"The request requires one of these dimensions: {list(DATE_DIMENSIONS)}")
+        dateFilters = [gFilter for gFilter in dataRequest.get("globalFilters", []) if gFilter["type"] == "dateRange"]
+        if len(dateFilters) != 1:
+            raise ValueError("The request requires one dateRange global filter")
+        start, end = [pd.Timestamp(date) for date in dateFilters[0]["dateRange"].split("/")]
+        key = requestFingerprint(dataRequest, excludeDateRange=True)
+        record = store.load(key)
+
+        def fetchWindow(windowStart: pd.Timestamp, windowEnd: pd.Timestamp = end, limit: int = None,
+                        sort: str = "asc") -> dict:
+            windowRequest = deepcopy(dataRequest)
+            for gFilter in windowRequest["globalFilters"]:
+                if gFilter["type"] == "dateRange":
+                    gFilter["dateRange"] = f"{windowStart.strftime('%Y-%m-%dT%H:%M:%S.000')}/{windowEnd.strftime('%Y-%m-%dT%H:%M:%S.000')}"
+            if limit is not None:
+                windowRequest["settings"]["limit"] = limit
+                windowRequest["settings"]["dimensionSort"] = sort
+            return self._fetchSplitReport(windowRequest, params=params, n_results=limit or "inf",
+                                          maxMetrics=maxMetrics)
+
+        def lastItemBefore(windowStart: pd.Timestamp, windowEnd: pd.Timestamp) -> int:
+            ## last period with data before windowEnd, the date dimension items being in chronological order.
+            ## None when the window has no data.
+            lastRows = fetchWindow(windowStart, windowEnd, limit=1, sort="desc").get("rows", [])
+            return int(lastRows[0]["itemId"]) if len(lastRows) > 0 else None
+
+        storedRows, columns = [], None
+        windowStart = start
+        if record is not None:
+            metadata = record["metadata"]
+            storedStart, storedEnd = pd.Timestamp(metadata["start"]), pd.Timestamp(metadata["end"])
+            storedClosed = pd.Timestamp(metadata["closedUntil"])
+            if storedStart <= start < storedClosed and end >= storedEnd:
+                windowStart = max(start, periodStart(storedClosed, freq, -lookback))
+                storedRows = record["response"]["rows"]
+                columns = record["response"].get("columns")
+                if windowStart <= start:
+                    storedRows = []
+                else:
+                    ## the stored periods before start are dropped
+                    if start > storedStart:
+                        lastBefore = lastItemBefore(storedStart, start)
+                        if lastBefore is not None:
+                            storedRows = [row for row in storedRows if int(row["itemId"]) > lastBefore]
+                    ## the stored periods from windowStart are requested again: they are dropped, even when the
+                    ## new window returns no rows for them
+                    if windowStart < end:
+                        lastKept = lastItemBefore(start, windowStart)
+                        storedRows = [row for row in storedRows
+                                      if lastKept is not None and int(row["itemId"]) <= lastKept]
+        if self.loggingEnabled:
+            self.logger.debug(f"requesting {dataRequest['dimension']} from {windowStart} ({len(storedRows)} rows stored)")
+        newRows = []
+        if windowStart < end:
+            res = fetchWindow(windowStart)
+            newRows = res.get("rows", [])
+            columns = res.get("columns", columns)
+        dataRows = sorted(storedRows + newRows, key=lambda row: int(row["itemId"]))
+        ## totals of the whole date range, the rows of the periods cannot be added up for every metric
+        summaryData = self._fetchReport(totalsRequest(dataRequest), params=params).get("summaryData")
+        res = {
+            "totalPages": 1,
+            "firstPage": True,
+            "lastPage": True,
+            "numberOfElements": len(dataRows),
+            "number": 0,
+            "totalElements": len(dataRows),
+            "columns": columns,
+            "rows": dataRows,
+            "summaryData": summaryData,
+        }
+        now = self._reportSuiteNow(dataRequest.get("rsid"))
+        store.save(key, {
+            "metadata": {
+                "rsid": dataRequest.get("rsid"),
+                "dimension": dataRequest["dimension"],
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "closedUntil": min(end, periodStart(now, freq)).isoformat(),
+                "globalFilters": [gFilter for gFilter in dataRequest["globalFilters"] if gFilter["type"] != "dateRange"],
+                "fetchTime": now.isoformat(),
+            },
+            "response": res,
+        })
+        if kwargs.get("returnClass", True) == False:
+            return dataRows
+        return self._buildReport(dataRequest, res, **buildArgs)
 
+    def _reportSuiteNow(self, rsid: str = None) -> pd.Timestamp:
+        """
+        Return the current time in the timezone of the report suite (timezoneZoneinfo), without timezone information,
+        to compare it with the periods of the date dimensions. The local time is used when the timezone is unknown.
+        Arguments:
+            rsid : REQUIRED : report suite ID
+        """
+        timezones = self._reportSuiteTimezones
+        if rsid not in timezones:
+            try:
+                timezones[rsid] = self.getReportSuite(rsid).get("timezoneZoneinfo")
+            except Exception:
+                timezones[rsid] = None
+        try:
+            if timezones[rsid]:
+                return pd.Timestamp.now(tz=timezones[rsid]).tz_localize(None)
+        except Exception:
+            pass  ## timezone not known by pandas
+        if self.loggingEnabled:
+            self.logger.warning(f"timezone of {rsid} unknown, the local time is used")
+        return pd.Timestamp.now()
+
+    def getBreakdownTree(
+            self,
+            request: Union[dict, IO, RequestCreator] = None,
+            dimensions: list = None,
+            top: list = None,
+            max_concurrency: int = 5,
+            maxRequestsPerSecond: float = 2,
+            burst: int = 12,
+            includeParents: bool = False,
+            **kwargs,
+    ) -> pd.DataFrame:
+        """
+        Return a multi-level breakdown of the request as one flat dataframe, with a column per dimension level
+        followed by the metrics of the request.
+        Each item of a level is broken down by the next dimension (breakdown metricFilters on the whole path).
+        The breakdowns are requested concurrently, as soon as their parent item is known, under one rate budget.
+        Arguments:
+            request : REQUIRED : dictionary, JSON file path or RequestCreator instance providing the metrics,
+                the dateRange and the segments. Its dimension is replaced by the first dimension.
+            dimensions : REQUIRED : list of dimensions, one per level. ex: ["variables/page","variables/evar1"]
+            top : OPTIONAL : list of the number of items per level, same length as dimensions (default 10 per level).
+                "inf" can be used to return every item.
+            max_concurrency : OPTIONAL : number of reports requested at the same time (default 5).
+            maxRequestsPerSecond : OPTIONAL : average number of report calls per second (default 2).
+            burst : OPTIONAL : number of report calls that can be sent at once before the rate applies (default 12).
+            includeParents : OPTIONAL : also return the rows of the intermediate levels,
+                with empty values for the deeper levels (default False).
+        kwargs:
+            Any argument of the getReport2 method (limit, resolveColumns, maxMetrics, ...)
+        Example:
+            df = mycompany.getBreakdownTree(myRequest, dimensions=["variables/page","variables/evar1","variables/evar2"], top=[50,20,10])
+        """
+        if request is None:
+            raise ValueError("Require a JSON or Dictionary to request data")
+        if dimensions is None or len(dimensions) == 0:
+            raise ValueError("Require a list of dimensions")
+        if top is None:
+            top = [10] * len(dimensions)
+        if len(top) != len(dimensions):
+            raise ValueError("top should have the same length as dimensions")
+        if self.loggingEnabled:
+            self.logger.debug(f"Starting getBreakdownTree")
+        prepareArgs, paramsArgs, buildArgs = self._splitReportKwargs(kwargs)
+        params = self._reportParams(**paramsArgs)
+        maxMetrics = kwargs.get("maxMetrics", MAX_METRICS_PER_REQUEST)
+        rateController = kwargs.get("rateController", None) or RateController(
+            maxRequestsPerSecond=maxRequestsPerSecond, burst=burst, maxConcurrency=max_concurrency)
+        baseRequest = self._prepareReportRequest(request, **prepareArgs)
+
+        def levelRequest(path: tuple) -> dict:
+            level = len(path)
+            dataRequest = deepcopy(baseRequest)
+            dataRequest["dimension"] = dimensions[level]
+            if level > 0:
+                dataRequest.pop("search", None)  ## the search applies to the first dimension
+            if top[level] != "inf":
+                dataRequest["settings"]["limit"] = min(int(top[level]), dataRequest["settings"]["limit"])
+            addBreakdownFilters(dataRequest, [(dimensions[depth], itemId) for depth, (itemId, _) in enumerate(path)])
+            return dataRequest
+
+        results = {}  ## path of (itemId, value) -> response
+        with futures.ThreadPoolExecutor(max(1, max_concurrency)) as executor:
+            def submit(path: tuple) -> futures.Future:
+                return executor.submit(self._fetchSplitReport, levelRequest(path), params, top[len(path)],
+                                       rateController, maxMetrics)
+
+            pending = {submit(()): ()}
+            while len(pending) > 0:
+                done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    results[path] = future.result()
+                    if len(path) + 1 < len(dimensions):
+                        for row in results[path].get("rows", []):
+                            childPath = path + ((row["itemId"], row["value"]),)
+                            pending[submit(childPath)] = childPath
+        ### metric columns named once, from the first level
+        nbMetrics = len(baseRequest["metricContainer"]["metrics"])
+        topWorkspace = self._buildReport(levelRequest(()), results[()],
+                                         resolveColumns=buildArgs.get("resolveColumns", True))
+        metricNames = list(topWorkspace.dataframe.columns)[2:2 + nbMetrics]
+        records = []
+
+        def walk(path: tuple) -> None:
+            for row in results.get(path, {}).get("rows", []):
+                childPath = path + ((row["itemId"], row["value"]),)
+                if len(childPath) == len(dimensions) or includeParents:
+                    values = [value for _, value in childPath] + [None] * (len(dimensions) - len(childPath))
+                    records.append(values + list(row["data"][:nbMetrics]))
+                if len(childPath) < len(dimensions):
+                    walk(childPath)
+
+        walk(())
+        return pd.DataFrame(records, columns=list(dimensions) + metricNames)
 
     def getTargetReport(self,
                         activity:str=None,
@@ -4852,6 +5813,11 @@ class Analytics:
             method : OPTIONAL : Statistical test used to compute confidence.
                 "z-test" (default) : two-proportion Z-test with pooled variance. Reliable for large sample sizes.
                 "t-test" : Welch's t-test with unpooled variance. More robust when groups have different sizes or rates.
+        The activity is looked up on the timeframe and the segments with the metrics/occurrences metric,
+        so it runs at the same time as the resolution of the metric names. The metrics of the report are not used anymore
+        for that lookup: an activity without occurrences in that scope is not found.
+        The apiCalls attribute of the TargetWorkspace is the number of HTTP requests sent by the connector while
+        building the report (pages, split requests and retries included).
         """
         if activity is None:
             raise ValueError("Require an activity name")
@@ -4863,78 +5829,86 @@ class Analytics:
             raise ValueError("Require a report suite ID")
         if metrics is None:
             raise ValueError("Require a list of metrics")
-        api_call_count = 0
-        global_request = RequestCreator()
-        global_request.setRSID(rsid)
         if timeframe.count("/") == 1 and "T" not in timeframe:
             timeframe = timeframe.replace("/", "T00:00:00.000/") + "T00:00:00.000"
-        global_request.addGlobalFilter(timeframe)
-        global_request.setDimension('variables/targetraw.activity')
-        all_metrics = None
-        for metric in metrics:
-            if metric.startswith("metrics/") or metric.startswith("cm"):
-                global_request.addMetric(metric)
-            else:
-                if all_metrics is None:
-                    all_metrics = []
-                    all_metrics += self.getMetrics(rsid=rsid, format="raw")
-                    all_metrics += self.getCalculatedMetrics(format="raw")
-                    api_call_count += 2
-                my_metric = [met['id'] for met in all_metrics if met["name"] == metric]
-                if len(my_metric) == 0:
+        ## requests made by other threads on the same connector in the meantime are counted as well
+        calls_start = self.connector.apiCalls
+
+        def resolveMetrics() -> list:
+            metricIds = []
+            for metric in metrics:
+                if metric.startswith("metrics/") or metric.startswith("cm"):
+                    metricIds.append(metric)
+                    continue
+                metricId = self.catalog.metricIdFromName(metric, rsid)
+                if metricId is None:
                     raise ValueError(f"metric {metric} not found")
-                global_request.addMetric(my_metric[0])
-        all_segments = None
-        segmentIds_requests = []
-        for segment in segments or []:
-            if segment.startswith("s") and segment[1].isnumeric():
-                segmentIds_requests.append(segment)
-                global_request.addGlobalFilter(segment)
-            else:
-                if all_segments is None:
-                    all_segments = []
-                    all_segments += self.getSegments(format="raw")
-                    api_call_count += 1
-                my_segment = [seg['id'] for seg in all_segments if seg["name"] == segment]
-                if len(my_segment) == 0:
+                metricIds.append(metricId)
+            return metricIds
+
+        def resolveSegments() -> list:
+            segmentIds = []
+            for segment in segments or []:
+                if segment.startswith("s") and segment[1].isnumeric():
+                    segmentIds.append(segment)
+                    continue
+                segmentId = self.catalog.segmentIdFromName(segment)
+                if segmentId is None:
                     raise ValueError(f"segment {segment} not found")
-                segmentIds_requests.append(my_segment[0])
-                global_request.addGlobalFilter(my_segment[0])
-        reportActivities = self.getReport2(global_request, returnClass=True)
-        api_call_count += 1
-        df_activities = reportActivities.dataframe.copy()
-        itemId = df_activities.loc[df_activities["variables/targetraw.activity"] == activity, "itemId"].values[0]
-        ## ensuring which experiences exist for that activity
-        activty_breakdown = reportActivities.breakdown(index=activity, dimension='variables/targetraw.activityexperience')
-        api_call_count += 1
-        df_breakdown = activty_breakdown.dataframe.copy()
-        ### elements expected in the final result
-        list_items = [el.split('> ').pop() for el in df_breakdown['variables/targetraw.activityexperience'].to_list()]
-        report_activities = RequestCreator()
-        report_activities.setRSID(rsid)
-        report_activities.setDimension('variables/targetraw.experience')
-        for metric in metrics:
-            if metric.startswith("metrics/") or metric.startswith("cm_"):
-                report_activities.addMetric(metric)
-            else:
-                if all_metrics is None:
-                    all_metrics = []
-                    all_metrics += self.getMetrics(rsid=rsid, format="raw")
-                    all_metrics += self.getCalculatedMetrics(format="raw")
-                    api_call_count += 2
-                my_metric = [met['id'] for met in all_metrics if met["name"] == metric]
-                if len(my_metric) == 0:
-                    raise ValueError(f"metric {metric} not found")
-                report_activities.addMetric(my_metric[0])
-        report_activities.addGlobalFilter(timeframe)
-        for seg in segmentIds_requests:
-            report_activities.addGlobalFilter(seg)
+                segmentIds.append(segmentId)
+            return segmentIds
+
+        def findActivity() -> tuple:
+            ## returns the segment ids and the activity itemId
+            segmentIds = resolveSegments()
+            activity_request = RequestCreator()
+            activity_request.setRSID(rsid)
+            activity_request.addGlobalFilter(timeframe)
+            for segmentId in segmentIds:
+                activity_request.addGlobalFilter(segmentId)
+            activity_request.setDimension('variables/targetraw.activity')
+            activity_request.addMetric("metrics/occurrences")
+            rows = self.getReport2(activity_request, returnClass=False, resolveColumns=False)
+            itemIds = [row["itemId"] for row in rows if row["value"] == activity]
+            if len(itemIds) == 0:
+                raise ValueError(f"activity {activity} not found")
+            return segmentIds, itemIds[0]
+
+        def experienceRequest(dimension: str, metricIds: list, segmentIds: list, itemId: str) -> RequestCreator:
+            request = RequestCreator()
+            request.setRSID(rsid)
+            request.setDimension(dimension)
+            for metricId in metricIds:
+                request.addMetric(metricId)
+            request.addGlobalFilter(timeframe)
+            for segmentId in segmentIds:
+                request.addGlobalFilter(segmentId)
+            request.addMetricFilter(metricId="all", filterId=f"variables/targetraw.activity:::{itemId}")
+            return request
+
+        ## the metric names and the activity lookup (after the segment names) do not depend on each other
+        with futures.ThreadPoolExecutor(max_workers=2) as executor:
+            future_metrics = executor.submit(resolveMetrics)
+            future_activity = executor.submit(findActivity)
+            metricIds = future_metrics.result()
+            segmentIds, itemId = future_activity.result()
         activity_filter = f"variables/targetraw.activity:::{itemId}"
-        report_activities.addMetricFilter(metricId="all", filterId=f"variables/targetraw.activity:::{itemId}")
-        api_call_count += 1
-        return self.getReport2(
-            report_activities,
-            returnClass=True,
+        breakdown_request = experienceRequest('variables/targetraw.activityexperience', metricIds, segmentIds, itemId)
+        report_activities = experienceRequest('variables/targetraw.experience', metricIds, segmentIds, itemId)
+        dataRequest = self._prepareReportRequest(report_activities)
+        ## the experiences of the activity and the final report are both filtered on the activity only
+        with futures.ThreadPoolExecutor(max_workers=2) as executor:
+            future_breakdown = executor.submit(self.getReport2, breakdown_request,
+                                               returnClass=False, resolveColumns=False)
+            future_report = executor.submit(self._fetchSplitReport, dataRequest, self._reportParams())
+            breakdown_rows = future_breakdown.result()
+            res = future_report.result()
+        api_call_count = self.connector.apiCalls - calls_start
+        ### elements expected in the final result
+        list_items = [row["value"].split('> ').pop() for row in breakdown_rows]
+        return self._buildReport(
+            dataRequest,
+            res,
             workspaceClass=TargetWorkspace,
             workspaceKwargs={
                 'activityName': activity,
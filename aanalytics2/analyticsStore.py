@@ -0,0 +1,179 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Union
+
+import pandas as pd
+
+from .reportStore import requestFingerprint
+
+## table holding one row per report saved in the store
+METADATA_TABLE = "aa_reports"
+
+
+class AnalyticsStore:
+    """
+    Local database where the Workspace results are materialized, one table per request fingerprint,
+    so the reports already retrieved can be queried with SQL instead of being requested again.
+    It uses DuckDB when the duckdb module is installed (columnar, inserted from Arrow buffers), otherwise SQLite.
+    The metadata of the reports (rsid, dimension, dateRange, globalFilters, fetch time) are in the aa_reports table.
+    Usage:
+        with AnalyticsStore("reports.duckdb") as store:
+            tableName = store.save(myWorkspace)
+            df = store.query(f"SELECT * FROM {tableName} WHERE visits > 100")
+    """
+
+    def __init__(self, path: Union[str, Path] = "aanalytics2.duckdb", engine: str = None) -> None:
+        """
+        Open (or create) the database.
+        Arguments:
+            path : OPTIONAL : path of the database file (default "aanalytics2.duckdb"). ":memory:" for a database in memory.
+            engine : OPTIONAL : "duckdb" or "sqlite". By default duckdb when it is installed, otherwise sqlite.
+        """
+        if engine is None:
+            try:
+                import duckdb
+                engine = "duckdb"
+            except ImportError:
+                engine = "sqlite"
+        if engine not in ("duckdb", "sqlite"):
+            raise ValueError("engine should be 'duckdb' or 'sqlite'")
+        self.engine = engine
+        self.path = str(path)
+        if engine == "duckdb":
+            import duckdb
+            self.connection = duckdb.connect(self.path)
+        else:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {METADATA_TABLE} (tableName VARCHAR PRIMARY KEY, fingerprint VARCHAR, "
+            "rsid VARCHAR, dimension VARCHAR, dateRange VARCHAR, globalFilters VARCHAR, metrics VARCHAR, "
+            "request VARCHAR, nbRows BIGINT, fetchTime DOUBLE)"
+        )
+
+    def __repr__(self) -> str:
+        return f"AnalyticsStore(path={self.path!r}, engine={self.engine!r})"
+
+    def __enter__(self) -> "AnalyticsStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the connection to the database.
+        """
+        self.connection.close()
+
+    def _insertFrame(self, tableName: str, df: pd.DataFrame) -> None:
+        """
+        Replace the table with the content of the dataframe, in bulk.
+        """
+        if self.engine == "duckdb":
+            try:
+                import pyarrow as pa
+                data = pa.Table.from_pandas(df, preserve_index=False)
+            except ImportError:
+                data = df  ## duckdb reads the numpy buffers of the dataframe
+            self.connection.register("aa_insert_view", data)
+            try:
+                self.connection.execute(f'CREATE OR REPLACE TABLE "{tableName}" AS SELECT * FROM aa_insert_view')
+            finally:
+                self.connection.unregister("aa_insert_view")
+        else:
+            df.to_sql(tableName, self.connection, if_exists="replace", index=False)
+
+    def save(self, workspace: object = None, tableName: str = None) -> str:
+        """
+        Save the dataframe of the Workspace in its table and its metadata in the aa_reports table.
+        A report saved again with the same request replaces the previous one.
+        Returns the name of the table.
+        Arguments:
+            workspace : REQUIRED : Workspace instance returned by getReport2 (or getReports, ...)
+            tableName : OPTIONAL : name of the table (default "report_" + the 16 first characters of the fingerprint)
+        """
+        if workspace is None:
+            raise ValueError("Require a Workspace instance")
+        dataRequest = workspace.dataRequest.to_dict()
+        fingerprint = requestFingerprint(dataRequest)
+        if tableName is None:
+            tableName = f"report_{fingerprint[:16]}"
+        dateRanges = [gFilter["dateRange"] for gFilter in dataRequest.get("globalFilters", [])
+                      if gFilter.get("type") == "dateRange"]
+        metadata = (
+            tableName,
+            fingerprint,
+            dataRequest.get("rsid"),
+            dataRequest.get("dimension"),
+            dateRanges[0] if len(dateRanges) > 0 else None,
+            json.dumps([gFilter for gFilter in dataRequest.get("globalFilters", []) if gFilter.get("type") != "dateRange"]),
+            json.dumps([metric["id"] for metric in dataRequest.get("metricContainer", {}).get("metrics", [])]),
+            json.dumps(dataRequest),
+            len(workspace.dataframe),
+            time.time(),
+        )
+        with self._lock:
+            self._insertFrame(tableName, workspace.dataframe)
+            self.connection.execute(f"DELETE FROM {METADATA_TABLE} WHERE tableName = ?", [tableName])
+            self.connection.execute(f"INSERT INTO {METADATA_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", metadata)
+            self.connection.commit()
+        return tableName
+
+    def query(self, sql: str = None, parameters: list = None) -> pd.DataFrame:
+        """
+        Execute a SQL query on the database and return the result as a dataframe.
+        Arguments:
+            sql : REQUIRED : SQL query
+            parameters : OPTIONAL : list of values for the "?" placeholders of the query
+        """
+        if sql is None:
+            raise ValueError("Require a SQL query")
+        with self._lock:
+            if self.engine == "duckdb":
+                return self.connection.execute(sql, parameters or []).df()
+            return pd.read_sql_query(sql, self.connection, params=parameters)
+
+    def reports(self) -> pd.DataFrame:
+        """
+        Return the metadata of the reports saved in the store, the most recent first.
+        """
+        return self.query(f"SELECT * FROM {METADATA_TABLE} ORDER BY fetchTime DESC")
+
+    def tableName(self, request: dict = None) -> str:
+        """
+        Return the name of the table where the report of that request is saved, None if it is not in the store.
+        Arguments:
+            request : REQUIRED : report request (dictionary or RequestCreator), as returned by Workspace.dataRequest
+        """
+        if hasattr(request, "to_dict"):
+            request = request.to_dict()
+        result = self.query(f"SELECT tableName FROM {METADATA_TABLE} WHERE fingerprint = ? ORDER BY fetchTime DESC",
+                            [requestFingerprint(request)])
+        return result["tableName"].iloc[0] if len(result) > 0 else None
+
+    def load(self, tableName: str = None) -> pd.DataFrame:
+        """
+        Return the dataframe saved in that table.
+        Arguments:
+            tableName : REQUIRED : name of the table, as returned by save
+        """
+        if tableName is None:
+            raise ValueError("Require a table name")
+        return self.query(f'SELECT * FROM "{tableName}"')
+
+    def delete(self, tableName: str = None) -> None:
+        """
+        Delete the table and its metadata.
+        Arguments:
+            tableName : REQUIRED : name of the table, as returned by save
+        """
+        if tableName is None:
+            raise ValueError("Require a table name")
+        with self._lock:
+            self.connection.execute(f'DROP TABLE IF EXISTS "{tableName}"')
+            self.connection.execute(f"DELETE FROM {METADATA_TABLE} WHERE tableName = ?", [tableName])
+            self.connection.commit()
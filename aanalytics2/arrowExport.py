@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+FILE_FORMATS = ("parquet", "feather")
+
+
+def dataframeToArrow(df: pd.DataFrame = None, metricColumns: list = None) -> "pyarrow.Table":
+    """
+    Return the dataframe as a pyarrow Table with the metrics as float64 columns and the other columns
+    (dimension values, segment names, ...) dictionary encoded. The itemId column is kept as plain strings.
+    Arguments:
+        df : REQUIRED : dataframe of a Workspace
+        metricColumns : OPTIONAL : list of the metric columns. By default the numeric columns other than itemId.
+    """
+    import pyarrow as pa
+    if df is None:
+        raise ValueError("Require a dataframe")
+    if metricColumns is None:
+        metricColumns = [col for col in df.columns if col != "itemId" and pd.api.types.is_numeric_dtype(df[col])]
+    arrays, names = [], []
+    for col in df.columns:
+        if col in metricColumns:
+            values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            arrays.append(pa.array(values, type=pa.float64()))
+        elif col == "itemId":
+            arrays.append(pa.array(df[col].astype(str).tolist(), type=pa.string()))
+        else:
+            values = [None if pd.isna(value) else str(value) for value in df[col].tolist()]
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        names.append(str(col))
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+class ArrowPageWriter:
+    """
+    Write the pages of a report (rows returned by the API) in a parquet or feather (Arrow IPC) file,
+    one row group (parquet) or record batch (feather) per page, so the rows of the report are never all in memory.
+    The dimension values are dictionary encoded with a dictionary growing page after page,
+    written as dictionary deltas in the feather file.
+    Usage:
+        with ArrowPageWriter("report.parquet", columns) as writer:
+            writer.write(page["rows"])
+    """
+
+    def __init__(self, filename: str = None, columns: list = None, fileFormat: str = "parquet") -> None:
+        """
+        Open the file and write its schema.
+        Arguments:
+            filename : REQUIRED : path of the file
+            columns : REQUIRED : column names, as in the Workspace dataframe: [itemId, dimension, metric1, ...]
+            fileFormat : OPTIONAL : "parquet" or "feather" (default "parquet")
+        """
+        import pyarrow as pa
+        if filename is None or columns is None or len(columns) < 2:
+            raise ValueError("Require a filename and the list of columns (itemId, dimension and metrics)")
+        if fileFormat not in FILE_FORMATS:
+            raise ValueError(f"fileFormat should be one of {FILE_FORMATS}")
+        self.filename = filename
+        self.fileFormat = fileFormat
+        self.columns = [str(col) for col in columns]
+        self.rows = 0
+        self._dictionary = {}
+        self.schema = pa.schema(
+            [pa.field(self.columns[0], pa.string()), pa.field(self.columns[1], pa.dictionary(pa.int32(), pa.string()))]
+            + [pa.field(col, pa.float64()) for col in self.columns[2:]]
+        )
+        if fileFormat == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(filename, self.schema)
+        else:
+            self._writer = pa.ipc.new_file(filename, self.schema,
+                                           options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+    def __repr__(self) -> str:
+        return f"ArrowPageWriter(filename={self.filename!r}, fileFormat={self.fileFormat!r}, rows={self.rows})"
+
+    def __enter__(self) -> "ArrowPageWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def write(self, dataRows: list = None) -> None:
+        """
+        Write the rows of one page as a new row group / record batch.
+        Arguments:
+            dataRows : REQUIRED : list of rows ({"itemId", "value", "data"}) returned by the API
+        """
+        import pyarrow as pa
+        if not dataRows:
+            return
+        indices = np.fromiter((self._dictionary.setdefault(row["value"], len(self._dictionary)) for row in dataRows),
+                              dtype=np.int32, count=len(dataRows))
+        values = np.array([row["data"] for row in dataRows], dtype="float64").reshape(len(dataRows), -1)
+        arrays = [
+            pa.array([row["itemId"] for row in dataRows], type=pa.string()),
+            pa.DictionaryArray.from_arrays(pa.array(indices), pa.array(list(self._dictionary), type=pa.string())),
+        ] + [pa.array(values[:, index]) for index in range(len(self.columns) - 2)]
+        self._writer.write_batch(pa.record_batch(arrays, schema=self.schema))
+        self.rows += len(dataRows)
+
+    def close(self) -> None:
+        """
+        Write the end of the file.
+        """
+        self._writer.close()
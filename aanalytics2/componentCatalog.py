@@ -0,0 +1,292 @@
+import threading
+import time
+from typing import Union
+
+## number of ids sent in one segmentFilter or calculatedMetricFilter parameter
+BATCH_SIZE = 100
+
+
+class ComponentCatalog:
+    """
+    In-memory catalog of the component names (segments, calculated metrics, metrics and dimensions) of a company.
+    The components are loaded in batches and kept for a limited time (TTL in seconds), so that resolving the ids
+    of a report into names costs a few API calls instead of one call per id.
+    An instance is available on the catalog attribute of the Analytics instance.
+    """
+
+    DEFAULT_TTL = {"segments": 900, "calculatedMetrics": 900, "metrics": 3600, "dimensions": 3600}
+
+    def __init__(self, analytics: object = None, ttl: Union[int, dict] = None) -> None:
+        """
+        Instantiate the catalog.
+        Arguments:
+            analytics : REQUIRED : Analytics instance used to retrieve the components.
+            ttl : OPTIONAL : number of seconds the components are kept before being retrieved again.
+                Either a number for all components or a dictionary with "segments", "calculatedMetrics",
+                "metrics" and "dimensions" keys (default: 900 for segments and calculated metrics, 3600 otherwise)
+        """
+        if analytics is None:
+            raise ValueError("Require an Analytics instance")
+        self.analytics = analytics
+        self.ttl = dict(self.DEFAULT_TTL)
+        if type(ttl) == dict:
+            self.ttl.update(ttl)
+        elif ttl is not None:
+            self.ttl = {kind: ttl for kind in self.DEFAULT_TTL}
+        self._segments = {}  ## id -> (name, expiration)
+        self._calculatedMetrics = {}  ## id -> (name, expiration)
+        self._metrics = {}  ## rsid -> ({id: name}, expiration)
+        self._dimensions = {}  ## rsid -> ({id: name}, expiration)
+        self._lists = {}  ## "segments" or "calculatedMetrics" -> ([(id, name)] of the complete list, expiration)
+        ## one lock per kind of component, so different kinds can be loaded at the same time
+        self._locks = {kind: threading.RLock() for kind in self.DEFAULT_TTL}
+        self._callsLock = threading.Lock()
+        self.calls = 0
+        self._threadCalls = threading.local()
+
+    def __repr__(self) -> str:
+        return (f"ComponentCatalog(segments={len(self._segments)}, calculatedMetrics={len(self._calculatedMetrics)}, "
+                f"metrics={len(self._metrics)} rsids, dimensions={len(self._dimensions)} rsids)")
+
+    @staticmethod
+    def _valid(entry: tuple) -> bool:
+        return entry is not None and entry[1] > time.monotonic()
+
+    def _countCall(self) -> None:
+        with self._callsLock:
+            self.calls += 1
+        self._threadCalls.count = self.threadCalls() + 1
+
+    def threadCalls(self) -> int:
+        """
+        Return the number of API calls made by the catalog in the current thread.
+        The difference before and after a lookup gives the calls of that lookup, even when other threads use the catalog.
+        """
+        return getattr(self._threadCalls, "count", 0)
+
+    def _missing(self, cache: dict, ids: list) -> list:
+        return [componentId for componentId in dict.fromkeys(ids) if not self._valid(cache.get(componentId))]
+
+    def clear(self, kind: str = None) -> None:
+        """
+        Remove the components from the catalog so they are retrieved again on the next lookup.
+        Arguments:
+            kind : OPTIONAL : "segments", "calculatedMetrics", "metrics" or "dimensions". Default all.
+        """
+        for name in [kind] if kind is not None else list(self.DEFAULT_TTL):
+            with self._locks[name]:
+                getattr(self, f"_{name}").clear()
+                self._lists.pop(name, None)
+
+    def loadSegments(self, segmentIds: list = None) -> None:
+        """
+        Load the segments names in the catalog.
+        Arguments:
+            segmentIds : OPTIONAL : list of segment ids to load. Default all segments accessible.
+        """
+        with self._locks["segments"]:
+            expiration = time.monotonic() + self.ttl["segments"]
+            if segmentIds is None:
+                segments = self.analytics.getSegments(format="raw")
+                self._countCall()
+            else:
+                segmentIds = self._missing(self._segments, segmentIds)
+                segments = []
+                for start in range(0, len(segmentIds), BATCH_SIZE):
+                    segments += self.analytics.getSegments(sidFilter=segmentIds[start:start + BATCH_SIZE],
+                                                           format="raw")
+                    self._countCall()
+            for segment in segments:
+                self._segments[segment["id"]] = (segment.get("name", segment["id"]), expiration)
+            if segmentIds is None:
+                self._lists["segments"] = ([(segment["id"], segment.get("name")) for segment in segments], expiration)
+            ## ids not returned by the list (ex: not shared): requested one by one
+            for segmentId in segmentIds or []:
+                if segmentId not in self._segments:
+                    segment = self.analytics.getSegment(segmentId)
+                    self._countCall()
+                    self._segments[segmentId] = (segment.get("name", segmentId), expiration)
+
+    def loadCalculatedMetrics(self, calculatedMetricIds: list = None) -> None:
+        """
+        Load the calculated metrics names in the catalog.
+        Arguments:
+            calculatedMetricIds : OPTIONAL : list of calculated metric ids to load. Default all calculated metrics accessible.
+        """
+        with self._locks["calculatedMetrics"]:
+            expiration = time.monotonic() + self.ttl["calculatedMetrics"]
+            if calculatedMetricIds is None:
+                calculatedMetrics = self.analytics.getCalculatedMetrics(format="raw")
+                self._countCall()
+            else:
+                calculatedMetricIds = self._missing(self._calculatedMetrics, calculatedMetricIds)
+                calculatedMetrics = []
+                for start in range(0, len(calculatedMetricIds), BATCH_SIZE):
+                    calculatedMetrics += self.analytics.getCalculatedMetrics(
+                        cmFilter=calculatedMetricIds[start:start + BATCH_SIZE], format="raw")
+                    self._countCall()
+            for calculatedMetric in calculatedMetrics:
+                self._calculatedMetrics[calculatedMetric["id"]] = (
+                    calculatedMetric.get("name", calculatedMetric["id"]), expiration)
+            if calculatedMetricIds is None:
+                self._lists["calculatedMetrics"] = (
+                    [(calculatedMetric["id"], calculatedMetric.get("name")) for calculatedMetric in calculatedMetrics],
+                    expiration)
+            for calculatedMetricId in calculatedMetricIds or []:
+                if calculatedMetricId not in self._calculatedMetrics:
+                    calculatedMetric = self.analytics.getCalculatedMetric(calculatedMetricId, full=False)
+                    self._countCall()
+                    self._calculatedMetrics[calculatedMetricId] = (
+                        calculatedMetric.get("name", calculatedMetricId), expiration)
+
+    def loadMetrics(self, rsid: str = None) -> None:
+        """
+        Load the metrics names of a report suite in the catalog.
+        Arguments:
+            rsid : REQUIRED : report suite ID
+        """
+        with self._locks["metrics"]:
+            metrics = self.analytics.getMetrics(rsid=rsid, format="raw")
+            self._countCall()
+            self._metrics[rsid] = ({metric["id"]: metric.get("name", metric["id"]) for metric in metrics},
+                                   time.monotonic() + self.ttl["metrics"])
+
+    def loadDimensions(self, rsid: str = None) -> None:
+        """
+        Load the dimensions names of a report suite in the catalog.
+        Arguments:
+            rsid : REQUIRED : report suite ID
+        """
+        with self._locks["dimensions"]:
+            dimensions = self.analytics.getDimensions(rsid=rsid)
+            self._countCall()
+            self._dimensions[rsid] = (dict(zip(dimensions["id"], dimensions["name"])),
+                                      time.monotonic() + self.ttl["dimensions"])
+
+    def prefetch(self, segments: list = None, calculatedMetrics: list = None, rsid: str = None,
+                 metrics: bool = False, dimensions: bool = False) -> None:
+        """
+        Load in batch the components that are not in the catalog yet (or expired).
+        Arguments:
+            segments : OPTIONAL : list of segment ids
+            calculatedMetrics : OPTIONAL : list of calculated metric ids
+            rsid : OPTIONAL : report suite ID for the metrics and dimensions
+            metrics : OPTIONAL : load the metrics of the report suite (default False)
+            dimensions : OPTIONAL : load the dimensions of the report suite (default False)
+        """
+        if segments and self._missing(self._segments, segments):
+            self.loadSegments(segments)
+        if calculatedMetrics and self._missing(self._calculatedMetrics, calculatedMetrics):
+            self.loadCalculatedMetrics(calculatedMetrics)
+        with self._locks["metrics"]:
+            if metrics and not self._valid(self._metrics.get(rsid)):
+                self.loadMetrics(rsid)
+        with self._locks["dimensions"]:
+            if dimensions and not self._valid(self._dimensions.get(rsid)):
+                self.loadDimensions(rsid)
+
+    def segmentName(self, segmentId: str = None) -> str:
+        """
+        Return the name of the segment, or its id when it cannot be found.
+        Arguments:
+            segmentId : REQUIRED : segment id
+        """
+        with self._locks["segments"]:
+            if not self._valid(self._segments.get(segmentId)):
+                self.loadSegments([segmentId])
+            return self._segments[segmentId][0]
+
+    def calculatedMetricName(self, calculatedMetricId: str = None) -> str:
+        """
+        Return the name of the calculated metric, or its id when it cannot be found.
+        Arguments:
+            calculatedMetricId : REQUIRED : calculated metric id
+        """
+        with self._locks["calculatedMetrics"]:
+            if not self._valid(self._calculatedMetrics.get(calculatedMetricId)):
+                self.loadCalculatedMetrics([calculatedMetricId])
+            return self._calculatedMetrics[calculatedMetricId][0]
+
+    def metricName(self, metricId: str = None, rsid: str = None) -> str:
+        """
+        Return the name of the metric in the report suite, or its id when it cannot be found.
+        Arguments:
+            metricId : REQUIRED : metric id (ex: "metrics/visits")
+            rsid : REQUIRED : report suite ID
+        """
+        with self._locks["metrics"]:
+            if not self._valid(self._metrics.get(rsid)):
+                self.loadMetrics(rsid)
+            return self._metrics[rsid][0].get(metricId, metricId)
+
+    def dimensionName(self, dimensionId: str = None, rsid: str = None) -> str:
+        """
+        Return the name of the dimension in the report suite, or its id when it cannot be found.
+        Arguments:
+            dimensionId : REQUIRED : dimension id (ex: "variables/page")
+            rsid : REQUIRED : report suite ID
+        """
+        with self._locks["dimensions"]:
+            if not self._valid(self._dimensions.get(rsid)):
+                self.loadDimensions(rsid)
+            return self._dimensions[rsid][0].get(dimensionId, dimensionId)
+
+    def segmentList(self) -> list:
+        """
+        Return the complete list of segments as [{"id": ..., "name": ...}]. It is loaded once (and kept for the TTL).
+        """
+        with self._locks["segments"]:
+            if not self._valid(self._lists.get("segments")):
+                self.loadSegments()
+            return [{"id": segmentId, "name": name} for segmentId, name in self._lists["segments"][0]]
+
+    def segmentIdFromName(self, name: str = None) -> str:
+        """
+        Return the id of the first segment with that name, None if there is none.
+        The complete list of segments is loaded once (and kept for the TTL).
+        Arguments:
+            name : REQUIRED : name of the segment
+        """
+        with self._locks["segments"]:
+            if not self._valid(self._lists.get("segments")):
+                self.loadSegments()
+            return next((segmentId for segmentId, segmentName in self._lists["segments"][0]
+                         if segmentName == name), None)
+
+    def metricIdFromName(self, name: str = None, rsid: str = None) -> str:
+        """
+        Return the id of the first metric of the report suite, or else calculated metric, with that name.
+        Returns None if there is none. The complete lists are loaded once (and kept for the TTL).
+        Arguments:
+            name : REQUIRED : name of the metric or calculated metric
+            rsid : REQUIRED : report suite ID
+        """
+        with self._locks["metrics"]:
+            if not self._valid(self._metrics.get(rsid)):
+                self.loadMetrics(rsid)
+            metricId = next((metricId for metricId, metricName in self._metrics[rsid][0].items()
+                             if metricName == name), None)
+        if metricId is not None:
+            return metricId
+        with self._locks["calculatedMetrics"]:
+            if not self._valid(self._lists.get("calculatedMetrics")):
+                self.loadCalculatedMetrics()
+            return next((calculatedMetricId for calculatedMetricId, calculatedMetricName
+                         in self._lists["calculatedMetrics"][0] if calculatedMetricName == name), None)
+
+    def name(self, componentId: str = None, rsid: str = None) -> str:
+        """
+        Return the name of any component id, based on its format. Returns the id itself when it is not a component.
+        Arguments:
+            componentId : REQUIRED : component id (segment, calculated metric, metric or dimension)
+            rsid : OPTIONAL : report suite ID, required for metrics and dimensions
+        """
+        if componentId.startswith("cm"):
+            return self.calculatedMetricName(componentId)
+        if componentId.startswith("s") and len(componentId) > 1 and componentId[1].isdigit():
+            return self.segmentName(componentId)
+        if componentId.startswith("metrics/") and rsid is not None:
+            return self.metricName(componentId, rsid)
+        if componentId.startswith("variables/") and rsid is not None:
+            return self.dimensionName(componentId, rsid)
+        return componentId
@@ -1,4 +1,5 @@
 import json
+import threading
 import time
 from copy import deepcopy
 
@@ -82,6 +83,9 @@ class AdobeRequest:
         self.loggingEnabled = loggingEnabled
         self.logger = logger
         self.retry = retry
+        self.apiCalls = 0  # number of HTTP requests sent by this connector
+        self.retries = 0  # number of retries (transport retries and retries triggered by callers)
+        self._countersLock = threading.Lock()
         if self.config['token'] == '' or time.time() > self.config['date_limit']:
             token_and_expiry = get_oauth_token_and_expiry_for_config(
                 config=self.config, verbose=verbose)
@@ -98,23 +102,28 @@ class AdobeRequest:
                 self.logger.info("OAuth token retrieved")
 
         self.session = self._build_session(retry)
+        ## session used when the rate is handled by a RateController: the 429 answers are returned to the caller
+        self.rateSession = self._build_session(retry, retryStatus=[500, 502, 503, 504])
 
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
 
-    def _build_session(self, max_retries: int) -> requests.Session:
+    def _build_session(self, max_retries: int, retryStatus: list = None) -> requests.Session:
         """
         Build a requests.Session with an HTTPAdapter configured for retrying
         on 429 and common 5xx server errors with exponential back-off.
 
         The adapter honours the ``Retry-After`` response header so the wait
         time advertised by the server is respected automatically.
+        Arguments:
+            max_retries : REQUIRED : minimum number of retries (floor is 3).
+            retryStatus : OPTIONAL : status codes retried by the adapter (default 429 and 5xx).
         """
         session = requests.Session()
         retry_strategy = Retry(
             total=max(max_retries, 3),
-            status_forcelist=[429, 500, 502, 503, 504],
+            status_forcelist=retryStatus if retryStatus is not None else [429, 500, 502, 503, 504],
             # Include POST and PATCH so retries apply to all HTTP methods used here
             allowed_methods={"DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "POST", "PUT", "TRACE"},
             backoff_factor=1,               # waits 0 s, 2 s, 4 s, 8 s … between attempts
@@ -127,6 +136,28 @@ class AdobeRequest:
         session.headers.update(self.header)
         return session
 
+    def _recordCall(self, res: requests.Response) -> None:
+        """
+        Update the apiCalls and retries counters from a response.
+        The retries done by the HTTPAdapter are read from the urllib3 retry history.
+        """
+        try:
+            transportRetries = len(res.raw.retries.history)
+        except Exception:
+            transportRetries = 0
+        with self._countersLock:
+            self.apiCalls += 1 + transportRetries
+            self.retries += transportRetries
+
+    def countRetry(self, n: int = 1) -> None:
+        """
+        Increment the retries counter, for retries that are handled outside of the connector.
+        Arguments:
+            n : OPTIONAL : number of retries to add (default 1)
+        """
+        with self._countersLock:
+            self.retries += n
+
     def _checkingDate(self) -> None:
         """
         Verify the OAuth v2 token is still valid; refresh it if it has expired.
@@ -144,6 +175,7 @@ class AdobeRequest:
             updated_auth = {'Authorization': f'Bearer {token}'}
             self.header.update(updated_auth)
             self.session.headers.update(updated_auth)
+            self.rateSession.headers.update(updated_auth)
             if self.loggingEnabled:
                 self.logger.info("New OAuth token applied")
 
@@ -161,6 +193,7 @@ class AdobeRequest:
             self.logger.info(f"params: {params}")
         request_headers = headers if headers is not None else self.header
         res = self.session.get(endpoint, headers=request_headers, params=params, data=data)
+        self._recordCall(res)
         if kwargs.get("verbose", False):
             print(f"request URL : {res.request.url}")
             print(f"status_code : {res.status_code}")
@@ -198,19 +231,30 @@ class AdobeRequest:
     def postData(self, endpoint: str, params: dict = None, data: dict = None, headers: dict = None, files: dict = None, *args, **kwargs):
         """
         Abstraction for POST requests.
+        kwargs:
+            format : "content" to return the raw content of the response (bytes) without decoding it.
+                A 429 answer is still returned as a dictionary with a status_code.
+            rateControlled : True when the caller handles the rate with a RateController.
+                The 429 answers are then not retried by the adapter but returned with a status_code, so the caller can pause.
         """
         self._checkingDate()
         if params is None:
             params = {}
         request_headers = headers if headers is not None else self.header
+        session = self.rateSession if kwargs.get('rateControlled', False) else self.session
         if data is None and files is None:
-            res = self.session.post(endpoint, headers=request_headers, params=params)
+            res = session.post(endpoint, headers=request_headers, params=params)
         elif data is not None and files is None:
-            res = self.session.post(endpoint, headers=request_headers, data=json.dumps(data), params=params)
+            res = session.post(endpoint, headers=request_headers, data=json.dumps(data), params=params)
         elif data is None and files is not None:
-            res = self.session.post(endpoint, headers=request_headers, params=params, files=files)
+            res = session.post(endpoint, headers=request_headers, params=params, files=files)
         else:
-            res = self.session.post(endpoint, headers=request_headers, params=params, data=json.dumps(data), files=files)
+            res = session.post(endpoint, headers=request_headers, params=params, data=json.dumps(data), files=files)
+        self._recordCall(res)
+        if kwargs.get('format') == 'content':
+            if res.status_code == 429:
+                return {'status_code': 429}
+            return res.content
         try:
             res_json = res.json()
             if res.status_code == 429 or res_json.get('error_code') == "429050":
@@ -240,6 +284,7 @@ class AdobeRequest:
             res = self.session.patch(endpoint, headers=request_headers, params=params, data=json.dumps(data))
         else:
             res = self.session.patch(endpoint, headers=request_headers, params=params, files=files)
+        self._recordCall(res)
         try:
             res_json = res.json()
         except Exception:
@@ -262,6 +307,7 @@ class AdobeRequest:
             res = self.session.put(endpoint, headers=request_headers, params=params, data=json.dumps(data))
         else:
             res = self.session.put(endpoint, headers=request_headers, params=params, files=files)
+        self._recordCall(res)
         try:
             status_code = res.json()
         except Exception:
@@ -280,6 +326,7 @@ class AdobeRequest:
             res = self.session.delete(endpoint, headers=request_headers)
         else:
             res = self.session.delete(endpoint, headers=request_headers, params=params)
+        self._recordCall(res)
         try:
             status_code = res.status_code
         except Exception:
@@ -0,0 +1,354 @@
+import csv
+import gzip
+import json
+import os
+import re
+import time
+from concurrent import futures
+from pathlib import Path
+from typing import Iterable, Union
+
+# Non standard libraries
+import pandas as pd
+
+from aanalytics2.ingestion import Bulkapi
+from aanalytics2.rateController import RateController
+
+
+class DataFeedReplay:
+    """
+    Replay raw data feed hits (hit_data.tsv) into a report suite through the Bulk Data Insertion API.
+    The data feed columns are mapped to the Bulk API CSV columns, using the REFERENCE table of the Bulkapi instance.
+    The files are read by chunks, never entirely loaded in memory.
+    Each chunk is partitioned by visitor into visitor groups that are uploaded in parallel,
+    the order of the hits of a visitor is kept as all chunks of a partition use the same visitor group.
+    Arguments to instantiate:
+        bulkapi : REQUIRED : Bulkapi instance used to send the data.
+        columnNames : REQUIRED : column names of the data feed, in the order of the hit_data.tsv file.
+            Returned by the Analytics.getDataFeedColumnNames method or read from the column_headers.tsv file.
+        rsid : REQUIRED : report suite ID that will receive the hits.
+    """
+
+    ## data feed column -> Bulk API CSV column
+    FEED_COLUMNS = {
+        "hit_time_gmt": "timestamp",
+        "mcvisid": "marketingCloudVisitorID",
+        "pagename": "pageName",
+        "page_url": "pageURL",
+        "page_type": "pageType",
+        "user_agent": "userAgent",
+        "ip": "ipaddress",
+        "campaign": "campaign",
+        "channel": "channel",
+        "currency": "currencyCode",
+        "referrer": "referrer",
+        "purchaseid": "purchaseID",
+        "transactionid": "transactionID",
+        "product_list": "products",
+        "event_list": "events",
+        "page_event": "linkType",
+        "page_event_var1": "linkURL",
+        "page_event_var2": "linkName",
+        "browser_height": "browserHeight",
+        "browser_width": "browserWidth",
+        "homepage": "homePage",
+        "cookies": "cookiesEnabled",
+        "java_enabled": "javaEnabled",
+        "zip": "zip",
+        "state": "state",
+    }
+    ## data feed page_event value -> Bulk API linkType
+    LINK_TYPES = {"10": "o", "11": "d", "12": "e"}
+    ## hit_source values that should not be replayed (data sources, summary data, ...)
+    EXCLUDED_HIT_SOURCES = {"5", "7", "8", "9"}
+    _familyPattern = re.compile(r"^(evar|prop|hier|list)(\d+)$")
+
+    def __init__(self,
+                 bulkapi: Bulkapi = None,
+                 columnNames: list = None,
+                 rsid: str = None,
+                 partitions: int = 4,
+                 chunkSize: int = 50000,
+                 maxRequestsPerSecond: float = None,
+                 checkpoint: str = None,
+                 usePostColumns: bool = False,
+                 vgidPrefix: str = "replay",
+                 retry: int = 3,
+                 encoding: str = "utf-8") -> None:
+        """
+        Instantiate the replay engine.
+        Arguments:
+            bulkapi : REQUIRED : Bulkapi instance used to send the data.
+            columnNames : REQUIRED : ordered list of the data feed column names (list of string or list of {'name':...}).
+            rsid : REQUIRED : report suite ID that will receive the hits (usually a sandbox report suite).
+            partitions : OPTIONAL : number of visitor groups uploaded in parallel (default 4).
+            chunkSize : OPTIONAL : number of rows read and sent per chunk (default 50000).
+                A chunk is divided between the partitions, so a single upload contains roughly chunkSize/partitions rows.
+            maxRequestsPerSecond : OPTIONAL : throttle the uploads to that rate. Default no throttling.
+            checkpoint : OPTIONAL : path to a JSON file where the progress is saved after each chunk.
+                If the file exists, the replay resumes after the last chunk fully sent.
+            usePostColumns : OPTIONAL : use the post_ columns (processed values) instead of the raw ones when available. (default False)
+            vgidPrefix : OPTIONAL : prefix of the visitor group IDs (default "replay").
+            retry : OPTIONAL : number of retries for an upload answered with a 429 or a 5XX error (default 3).
+            encoding : OPTIONAL : encoding of the data feed files (default utf-8).
+        """
+        if bulkapi is None:
+            raise ValueError("Require a Bulkapi instance")
+        if columnNames is None or len(columnNames) == 0:
+            raise ValueError("Require the list of data feed column names")
+        if rsid is None:
+            raise ValueError("Require a report suite ID")
+        self.bulkapi = bulkapi
+        self.columnNames = [col["name"] if type(col) == dict else str(col) for col in columnNames]
+        self.rsid = rsid
+        self.partitions = max(1, int(partitions))
+        self.chunkSize = max(1, int(chunkSize))
+        self.rateController = RateController(maxRequestsPerSecond=maxRequestsPerSecond, burst=self.partitions,
+                                             maxConcurrency=self.partitions)
+        self.checkpoint = checkpoint
+        self.usePostColumns = usePostColumns
+        self.vgidPrefix = vgidPrefix
+        self.retry = retry
+        self.encoding = encoding
+        self.mapping = self.buildColumnMapping()
+
+    def _bulkColumns(self) -> tuple:
+        """
+        Return the set of Bulk API column names and the set of numbered column families (eVar, prop, ...) from the REFERENCE table.
+        """
+        headers, families = set(), set()
+        reference = self.bulkapi.REFERENCE
+        if reference is None:  ## file not available, trusting the default mapping
+            headers = set(self.FEED_COLUMNS.values()) | {"reportSuiteID", "visitorID"}
+            families = {"eVar", "prop", "hier", "list"}
+            return headers, families
+        for header in reference["Header/Column Name"].astype(str):
+            name = header.split(" ")[0]
+            family = re.match(r"^([a-zA-Z]+)[#n]$", name)
+            if family:
+                families.add(family.group(1))
+            else:
+                headers.add(name)
+        return headers, families
+
+    def buildColumnMapping(self) -> dict:
+        """
+        Build the mapping between the data feed columns and the Bulk API columns.
+        Only the columns existing in the Bulk API REFERENCE table are kept.
+        Returns a dictionary {feed column : bulk column}.
+        """
+        headers, families = self._bulkColumns()
+        familyNames = {family.lower(): family for family in families}
+        available = set(self.columnNames)
+        mapping = {}
+        for column in self.columnNames:
+            if column.startswith("post_"):
+                continue
+            source = column
+            if self.usePostColumns and f"post_{column}" in available:
+                source = f"post_{column}"
+            if column in self.FEED_COLUMNS and self.FEED_COLUMNS[column] in headers:
+                mapping[source] = self.FEED_COLUMNS[column]
+                continue
+            numbered = self._familyPattern.match(column)
+            if numbered and numbered.group(1) in familyNames:
+                mapping[source] = f"{familyNames[numbered.group(1)]}{numbered.group(2)}"
+        return mapping
+
+    @staticmethod
+    def translateEventList(event_list: str = None) -> str:
+        """
+        Translate the numeric event_list of the data feed into the event names expected by the Bulk API.
+        Example: "1,200,201=5.00" -> "purchase,event1,event2=5.00"
+        Arguments:
+            event_list : REQUIRED : event_list value of a data feed row
+        """
+        if event_list is None or event_list == "":
+            return ""
+        standard = {"1": "purchase", "2": "prodView", "10": "scOpen", "11": "scView", "12": "scAdd",
+                    "13": "scRemove", "14": "scCheckout"}
+        events = []
+        for event in event_list.split(","):
+            code, sep, value = event.strip().partition("=")
+            if code in standard:
+                name = standard[code]
+            elif code.isdigit() and 200 <= int(code) <= 299:
+                name = f"event{int(code) - 199}"
+            elif code.isdigit() and 20100 <= int(code) <= 20999:
+                name = f"event{int(code) - 19999}"
+            else:  ## eVar instances (100-199) and unknown codes are not replayed
+                continue
+            events.append(f"{name}{sep}{value}")
+        return ",".join(events)
+
+    def _prepareChunk(self, chunk: pd.DataFrame) -> tuple:
+        """
+        Transform a chunk of data feed rows into Bulk API columns and assign a partition to each row.
+        Returns the transformed dataframe, the partition of each row and the number of rows skipped.
+        """
+        nb_rows = len(chunk)
+        keep = pd.Series(True, index=chunk.index)
+        if "exclude_hit" in chunk.columns:
+            keep &= chunk["exclude_hit"].isin(["", "0"])
+        if "hit_source" in chunk.columns:
+            keep &= ~chunk["hit_source"].isin(self.EXCLUDED_HIT_SOURCES)
+        chunk = chunk[keep]
+        df = chunk[list(self.mapping.keys())].rename(columns=self.mapping)
+        if "events" in df.columns:
+            df["events"] = df["events"].map(self.translateEventList)
+        if "linkType" in df.columns:
+            df["linkType"] = df["linkType"].map(self.LINK_TYPES).fillna("")
+        if "post_visid_high" in chunk.columns and "post_visid_low" in chunk.columns:
+            df["visitorID"] = chunk["post_visid_high"] + "_" + chunk["post_visid_low"]
+        df["reportSuiteID"] = self.rsid
+        if "marketingCloudVisitorID" in df.columns and "visitorID" in df.columns:
+            visitorKey = df["marketingCloudVisitorID"].where(df["marketingCloudVisitorID"] != "", df["visitorID"])
+        elif "marketingCloudVisitorID" in df.columns:
+            visitorKey = df["marketingCloudVisitorID"]
+        elif "visitorID" in df.columns:
+            visitorKey = df["visitorID"]
+        else:
+            raise ValueError("No visitor identifier (mcvisid or post_visid_high/post_visid_low) in the data feed columns")
+        partition = pd.util.hash_pandas_object(visitorKey, index=False).values % self.partitions
+        return df, partition, nb_rows - len(df)
+
+    def _sendPartition(self, data: bytes, partition: int) -> dict:
+        """
+        Upload one gzipped partition, retrying on 429 and 5XX responses.
+        """
+        vgid = f"{self.vgidPrefix}_{partition}"
+        for attempt in range(self.retry + 1):
+            with self.rateController:
+                res = self.bulkapi.sendBatch(data, vgid=vgid)
+            if res.status_code == 429:
+                self.rateController.pause(float(res.headers.get("Retry-After", 0) or 0) or 2 ** attempt)
+            elif res.status_code < 500:
+                break
+            else:
+                time.sleep(2 ** attempt)
+        try:
+            result = res.json()
+        except Exception:
+            result = {"error": res.text}
+        result["status_code"] = res.status_code
+        return result
+
+    def _loadCheckpoint(self) -> dict:
+        if self.checkpoint is not None and Path(self.checkpoint).exists():
+            with open(self.checkpoint, "r") as f:
+                return json.load(f)
+        return {"files": {}}
+
+    def _saveCheckpoint(self, state: dict) -> None:
+        if self.checkpoint is None:
+            return
+        tmp_path = f"{self.checkpoint}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.checkpoint)
+
+    @staticmethod
+    def _readChunks(reader: object = None, skipRows: int = 0, firstRows: int = None) -> Iterable:
+        """
+        Yield the chunks of the reader after skipping the rows already sent.
+        Rows are skipped after parsing: an escaped newline makes skiprows count lines, not rows.
+        When firstRows is given (chunk partially sent), the first chunk yielded has exactly that number of rows,
+        so it contains the same rows as when it was partially sent.
+        """
+        buffer = None
+        for chunk in reader:
+            if skipRows >= len(chunk):
+                skipRows -= len(chunk)
+                continue
+            chunk = chunk.iloc[skipRows:]
+            skipRows = 0
+            if firstRows is None:
+                yield chunk
+                continue
+            buffer = chunk if buffer is None else pd.concat([buffer, chunk])
+            if len(buffer) < firstRows:
+                continue
+            yield buffer.iloc[:firstRows]
+            if len(buffer) > firstRows:
+                yield buffer.iloc[firstRows:]
+            buffer, firstRows = None, None
+        if buffer is not None and len(buffer) > 0:
+            yield buffer
+
+    def replay(self, files: Union[str, list] = None, verbose: bool = False) -> dict:
+        """
+        Replay the data feed file(s) into the report suite. Returns a summary of the replay.
+        The replay stops at the first chunk that cannot be fully sent, so it can be resumed with the checkpoint.
+        The partitions of that chunk accepted by the API are saved in the checkpoint and are not sent again on resume
+        (the Bulk API ingestion is not idempotent), the number of partitions needs to stay the same.
+        Arguments:
+            files : REQUIRED : path or list of paths to the hit_data.tsv files (can be gzipped).
+            verbose : OPTIONAL : print the progress after each chunk.
+        """
+        if files is None:
+            raise ValueError("Require at least one file to replay")
+        if type(files) == str:
+            files = [files]
+        state = self._loadCheckpoint()
+        summary = {"files": 0, "rowsRead": 0, "rowsSent": 0, "rowsSkipped": 0, "uploads": 0, "errors": [],
+                   "complete": True}
+        start = time.time()
+        extra = {"exclude_hit", "hit_source", "post_visid_high", "post_visid_low"} & set(self.columnNames)
+        usecols = sorted(set(self.mapping.keys()) | extra, key=self.columnNames.index)
+        with futures.ThreadPoolExecutor(self.partitions) as executor:
+            for file in files:
+                fileKey = str(Path(file).resolve())
+                fileState = state["files"].setdefault(fileKey, {"rows": 0, "done": False})
+                if fileState["done"]:
+                    if verbose:
+                        print(f"{file} already replayed, skipping it")
+                    continue
+                ## tabs, newlines and backslashes inside the fields are escaped with a backslash in the data feeds
+                reader = pd.read_csv(file, sep="\t", header=None, names=self.columnNames, usecols=usecols,
+                                     dtype=str, keep_default_na=False, quoting=csv.QUOTE_NONE, escapechar="\\",
+                                     encoding=self.encoding, chunksize=self.chunkSize)
+                pending = fileState.get("pending")
+                if pending is not None and pending["partitions"] != self.partitions:
+                    raise ValueError(f"{file} was partially sent with {pending['partitions']} partitions, "
+                                     f"resume it with the same number of partitions")
+                for chunk in self._readChunks(reader, fileState["rows"], pending["rows"] if pending else None):
+                    ## partitions of that chunk already accepted before the checkpoint was saved
+                    sentParts = set(pending["sent"]) if pending is not None else set()
+                    pending = None
+                    df, partition, skipped = self._prepareChunk(chunk)
+                    uploads = {}
+                    for part in range(self.partitions):
+                        sub_df = df[partition == part]
+                        if sub_df.empty or part in sentParts:
+                            continue
+                        data = gzip.compress(sub_df.to_csv(index=False).encode("utf-8"), compresslevel=5)
+                        uploads[part] = (len(sub_df), executor.submit(self._sendPartition, data, part))
+                    results = {part: (nb_rows, upload.result()) for part, (nb_rows, upload) in uploads.items()}
+                    errors = [res for _, res in results.values() if res["status_code"] >= 400 or "error" in res]
+                    accepted = [part for part, (_, res) in results.items()
+                                if res["status_code"] < 400 and "error" not in res]
+                    summary["uploads"] += len(results)
+                    summary["rowsSent"] += sum(results[part][0] for part in accepted)
+                    if len(errors) > 0:
+                        ## the accepted partitions are saved, so a resume only sends the other ones
+                        fileState["pending"] = {"rows": len(chunk), "partitions": self.partitions,
+                                                "sent": sorted(sentParts | set(accepted))}
+                        summary["errors"] += errors
+                        summary["complete"] = False
+                        self._saveCheckpoint(state)
+                        summary["elapsed"] = round(time.time() - start, 2)
+                        if verbose:
+                            print(f"Replay stopped on {file} after {fileState['rows']} rows: {errors[0]}")
+                        return summary
+                    fileState.pop("pending", None)
+                    fileState["rows"] += len(chunk)
+                    summary["rowsRead"] += len(chunk)
+                    summary["rowsSkipped"] += skipped
+                    self._saveCheckpoint(state)
+                    if verbose:
+                        print(f"{file} : {fileState['rows']} rows processed, {summary['rowsSent']} hits sent in total")
+                fileState["done"] = True
+                summary["files"] += 1
+                self._saveCheckpoint(state)
+        summary["elapsed"] = round(time.time() - start, 2)
+        return summary
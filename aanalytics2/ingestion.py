@@ -19,13 +19,16 @@ class DIAPI:
         rsid : REQUIRED : Report Suite ID
         tracking_server : REQUIRED : tracking server for tracking.
         example : "xxxx.sc.omtrdc.net"
+        protocol : OPTIONAL : protocol used to reach the tracking server (default "https")
     """
 
-    def __init__(self, rsid: str = None, tracking_server: str = None):
+    def __init__(self, rsid: str = None, tracking_server: str = None, protocol: str = "https"):
         """
         Arguments:
             rsid : REQUIRED : Report Suite ID
             tracking_server : REQUIRED : tracking server for tracking.
+            protocol : OPTIONAL : protocol used to reach the tracking server (default "https").
+                "http" can be used to target a local collection server, for testing purpose.
         """
         if rsid is None:
             raise Exception("Expecting a ReportSuite ID (rsid)")
@@ -33,6 +36,7 @@ class DIAPI:
         if tracking_server is None:
             raise Exception("Expecting a tracking server")
         self.tracking_server = tracking_server
+        self.protocol = protocol
         try:
             import importlib.resources as pkg_resources
             path = pkg_resources.path("aanalytics2", "supported_tags.pickle")
@@ -69,7 +73,7 @@ class DIAPI:
         if pe is not None and pe not in ["d", "e", "o"]:
             raise Exception('Expecting pe argument to be ("d", "e", or "o")')
         header = {'Content-Type': 'application/json'}
-        endpoint = f"https://{self.tracking_server}/b/ss/{self.rsid}/0"
+        endpoint = f"{self.protocol}://{self.tracking_server}/b/ss/{self.rsid}/0"
         params = {"pageName": pageName, "g": g,
                   "pe": pe, "pev1": pev1, "pev2": pev2, "events": events, **kwargs}
         res = requests.get(endpoint, params=params, headers=header)
@@ -94,7 +98,7 @@ class DIAPI:
         if linkType is not None and linkType not in ["d", "e", "o"]:
             raise Exception('Expecting pe argument to be ("d", "e", or "o")')
         header = {'Content-Type': 'application/xml'}
-        endpoint = f"https://{self.tracking_server}/b/ss//6"
+        endpoint = f"{self.protocol}://{self.tracking_server}/b/ss//6"
         dictionary = {"pageName": pageName, "pageURL": pageURL,
                       "linkType": linkType, "linkURL": linkURL, "linkName": linkName, "events": events, "reportSuite": self.rsid, **kwargs}
         import dicttoxml as dxml
@@ -144,7 +148,7 @@ class Bulkapi:
         except:
             self.REFERENCE = None
         # if no token has been generated.
-        self.connector = connector.AdobeRequest()
+        self.connector = connector.AdobeRequest(config_object=config_object)
         self.header = self.connector.header
         self.header["x-adobe-vgid"] = "ingestion"
         del self.header["Content-Type"]
@@ -216,6 +220,34 @@ class Bulkapi:
                 self._createdFiles.append(new_path)
             return new_path
 
+    def sendBatch(self, data: Union[str, bytes] = None, vgid: str = "ingestion", encoding: str = 'utf-8', **kwargs):
+        """
+        Send an in-memory CSV batch through the Bulk API, without writing it on disk. Returns the response object from requests.
+        Arguments:
+            data : REQUIRED : CSV content (with header) as a string, or as bytes already gzipped.
+            vgid : OPTIONAL : visitor group ID used for that batch (default "ingestion").
+                All hits of a visitor need to be sent in the same visitor group.
+            encoding : OPTIONAL : encoding used when data is a string.
+        Possible kwargs:
+            compress_level : handle the compression level, from 0 (no compression) to 9 (slow but more compressed). default 5.
+        """
+        if data is None:
+            raise Exception("Expecting data")
+        path = "/aa/collect/v1/events"
+        if type(data) == str:
+            data = gzip.compress(data.encode(encoding), compresslevel=kwargs.get("compress_level", 5))
+        header = {**self._freshHeader(), 'x-adobe-vgid': vgid}
+        res = requests.post(self.endpoint + path, headers=header, files={"file": (None, data)})
+        return res
+
+    def _freshHeader(self) -> dict:
+        """
+        Return the header with a valid token: the token of the connector is refreshed when it has expired,
+        so long replays keep sending with a valid Authorization header.
+        """
+        self.connector._checkingDate()
+        return {key: value for key, value in self.connector.header.items() if key != "Content-Type"}
+
     def sendFiles(self, files: Union[list, IO] = None,encoding:str='utf-8',**kwargs):
         """
         Method to send the file(s) through the Bulk API. Returns a list with the different status file sent.
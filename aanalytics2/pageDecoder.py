@@ -0,0 +1,190 @@
+import atexit
+import json
+import multiprocessing
+import threading
+from concurrent import futures
+from itertools import chain
+
+from typing import Optional
+
+import numpy as np
+
+## optional fields of the rows returned with anomaly detection
+ANOMALY_FIELDS = ("dataExpected", "dataUpperBound", "dataLowerBound")
+
+## fastest JSON decoder installed: orjson, then msgspec, then the json module
+try:
+    import orjson
+    JSON_ENGINE = "orjson"
+    _loads = orjson.loads
+except ImportError:
+    try:
+        import msgspec
+        JSON_ENGINE = "msgspec"
+        _loads = msgspec.json.Decoder().decode
+
+        class ReportRow(msgspec.Struct):
+            """
+            Row of a /reports response, decoded by msgspec without building a dictionary per row.
+            """
+            itemId: str
+            value: str
+            data: list[Optional[float]]
+            dataExpected: Optional[list[Optional[float]]] = None
+            dataUpperBound: Optional[list[Optional[float]]] = None
+            dataLowerBound: Optional[list[Optional[float]]] = None
+
+        ## the response is split in raw values first, so that only the rows are decoded with the schema
+        _pageDecoder = msgspec.json.Decoder(dict[str, msgspec.Raw])
+        _rowsDecoder = msgspec.json.Decoder(list[ReportRow])
+    except ImportError:
+        JSON_ENGINE = "json"
+        _loads = json.loads
+
+## process pools shared by all the reports, one per number of processes
+_pools = {}
+_poolsLock = threading.Lock()
+
+
+def getDecodePool(processes: int = None) -> futures.ProcessPoolExecutor:
+    """
+    Return the process pool used to decode the report pages, created on first use and shared by all reports
+    (so reports requested in parallel threads are decoded on several cores).
+    The processes are started with "spawn" (forking a process running threads is unsafe), so the script using the pool
+    needs the if __name__ == "__main__": guard, and the pools are shut down when the interpreter exits
+    (see shutdownDecodePools).
+    Arguments:
+        processes : OPTIONAL : number of processes (default the number of CPUs)
+    """
+    with _poolsLock:
+        if processes not in _pools:
+            _pools[processes] = futures.ProcessPoolExecutor(max_workers=processes,
+                                                            mp_context=multiprocessing.get_context("spawn"))
+        return _pools[processes]
+
+
+@atexit.register
+def shutdownDecodePools() -> None:
+    """
+    Shut down the process pools created by getDecodePool. A new pool is created if getDecodePool is called again.
+    """
+    with _poolsLock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def loads(content: bytes = None) -> object:
+    """
+    Decode JSON content with the fastest decoder installed (see JSON_ENGINE).
+    Arguments:
+        content : REQUIRED : JSON content (bytes or str)
+    """
+    return _loads(content)
+
+
+def rowsMatrix(rows: list = None, field: str = "data", nbMetrics: int = None) -> np.ndarray:
+    """
+    Return the values of one field of the rows ("data", "dataExpected", ...) as a float64 array of shape (rows, metrics).
+    Missing values (None) become NaN.
+    Arguments:
+        rows : REQUIRED : list of rows returned by the API
+        field : OPTIONAL : list field of the rows (default "data")
+        nbMetrics : OPTIONAL : number of values per row (default the length of the field in the first row)
+    """
+    if nbMetrics is None:
+        nbMetrics = len(rows[0][field]) if len(rows) > 0 else 0
+    return _listsMatrix([row[field] for row in rows], nbMetrics)
+
+
+def _listsMatrix(values: list = None, nbMetrics: int = 0) -> np.ndarray:
+    """
+    Return the lists of values (one per row) as a float64 array of shape (rows, metrics), None becoming NaN.
+    """
+    try:
+        matrix = np.fromiter(chain.from_iterable(values), dtype="float64", count=len(values) * nbMetrics)
+    except TypeError:  ## None values
+        matrix = np.array(values, dtype="float64")
+    return matrix.reshape(len(values), nbMetrics)
+
+
+def decodeReportPage(content: bytes = None) -> dict:
+    """
+    Decode the raw content of a /reports response (with orjson or msgspec when installed)
+    and shape its rows into typed column arrays.
+    Can be executed in the decoding processes: the arrays are much cheaper to send back than the rows.
+    Returns the response without the "rows" key, with a "columnar" key containing:
+        itemId : list of the item ids
+        value : list of the item values
+        data : float64 numpy array of shape (rows, metrics)
+        dataExpected, dataUpperBound, dataLowerBound : float64 numpy arrays, when the rows contain them
+    Responses without rows (static reports, errors) are returned as decoded.
+    Arguments:
+        content : REQUIRED : raw content of the response (bytes)
+    """
+    if JSON_ENGINE == "msgspec":
+        typed = _decodeTypedPage(content)
+        if typed is not None:
+            return typed
+    res = _loads(content)
+    if not isinstance(res, dict) or not isinstance(res.get("rows"), list):
+        return res
+    rows = res.pop("rows")
+    nbMetrics = len(rows[0]["data"]) if len(rows) > 0 else len(res.get("columns", {}).get("columnIds", []))
+    columnar = {
+        "itemId": [row["itemId"] for row in rows],
+        "value": [row["value"] for row in rows],
+        "data": rowsMatrix(rows, "data", nbMetrics),
+    }
+    for field in ANOMALY_FIELDS:
+        if len(rows) > 0 and field in rows[0]:
+            columnar[field] = rowsMatrix(rows, field, nbMetrics)
+    res["columnar"] = columnar
+    return res
+
+
+def _decodeTypedPage(content: bytes = None) -> dict:
+    """
+    Decode a /reports response with the ReportRow schema of msgspec (used when msgspec is the JSON engine).
+    Returns None when the content does not match the schema (no rows, error, unexpected types),
+    so that it is decoded without schema.
+    Arguments:
+        content : REQUIRED : raw content of the response (bytes)
+    """
+    try:
+        raw = _pageDecoder.decode(content)
+        if "rows" not in raw:
+            return None
+        rows = _rowsDecoder.decode(raw.pop("rows"))
+    except msgspec.ValidationError:
+        return None
+    res = {key: _loads(value) for key, value in raw.items()}
+    nbMetrics = len(rows[0].data) if len(rows) > 0 else len(res.get("columns", {}).get("columnIds", []))
+    columnar = {
+        "itemId": [row.itemId for row in rows],
+        "value": [row.value for row in rows],
+        "data": _listsMatrix([row.data for row in rows], nbMetrics),
+    }
+    for field in ANOMALY_FIELDS:
+        if len(rows) > 0 and getattr(rows[0], field) is not None:
+            columnar[field] = _listsMatrix([getattr(row, field) for row in rows], nbMetrics)
+    res["columnar"] = columnar
+    return res
+
+
+def concatColumnar(parts: list = None) -> dict:
+    """
+    Concatenate the "columnar" elements of several pages, in order.
+    Arguments:
+        parts : REQUIRED : list of "columnar" dictionaries returned by decodeReportPage
+    """
+    columnar = {
+        "itemId": [itemId for part in parts for itemId in part["itemId"]],
+        "value": [value for part in parts for value in part["value"]],
+        "data": np.concatenate([part["data"] for part in parts], axis=0),
+    }
+    for field in ANOMALY_FIELDS:
+        if all(field in part for part in parts):
+            columnar[field] = np.concatenate([part[field] for part in parts], axis=0)
+    return columnar
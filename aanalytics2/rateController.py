@@ -0,0 +1,92 @@
+import threading
+import time
+
+
+class RateController:
+    """
+    Shared budget of concurrency and request rate, to be used by several threads.
+    The rate is handled with a token bucket: tokens are refilled at maxRequestsPerSecond and up to burst tokens can be stored.
+    Usage:
+        controller = RateController(maxRequestsPerSecond=2, burst=12, maxConcurrency=5)
+        with controller:
+            ## 1 request made here
+    """
+
+    def __init__(self, maxRequestsPerSecond: float = None, burst: int = None, maxConcurrency: int = None) -> None:
+        """
+        Instantiate the rate controller.
+        Arguments:
+            maxRequestsPerSecond : OPTIONAL : average number of requests allowed per second. None for no rate limit.
+            burst : OPTIONAL : number of requests that can be sent at once before the rate applies (default 1)
+            maxConcurrency : OPTIONAL : number of requests that can run at the same time. None for no limit.
+        """
+        if maxRequestsPerSecond is not None and maxRequestsPerSecond <= 0:
+            raise ValueError("maxRequestsPerSecond should be a positive number")
+        self.maxRequestsPerSecond = maxRequestsPerSecond
+        self.burst = max(1, burst or 1)
+        self.maxConcurrency = maxConcurrency
+        self._tokens = float(self.burst)
+        self._lastRefill = time.monotonic()
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(maxConcurrency) if maxConcurrency else None
+        self.calls = 0
+        self.waitTime = 0.0
+
+    def __repr__(self) -> str:
+        return f"RateController(maxRequestsPerSecond={self.maxRequestsPerSecond}, burst={self.burst}, maxConcurrency={self.maxConcurrency})"
+
+    def _waitForToken(self) -> float:
+        """
+        Take one token from the bucket, sleeping until one is available. Returns the time waited.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._lastRefill) * self.maxRequestsPerSecond)
+                self._lastRefill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                sleep = (1 - self._tokens) / self.maxRequestsPerSecond
+            time.sleep(sleep)
+            waited += sleep
+
+    def acquire(self) -> None:
+        """
+        Block until a request can be sent under the concurrency and rate budget.
+        """
+        start = time.monotonic()
+        if self._semaphore is not None:
+            self._semaphore.acquire()
+        if self.maxRequestsPerSecond is not None:
+            self._waitForToken()
+        with self._lock:
+            self.calls += 1
+            self.waitTime += time.monotonic() - start
+
+    def release(self) -> None:
+        """
+        Release the concurrency slot taken by acquire.
+        """
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    def pause(self, seconds: float) -> None:
+        """
+        Empty the bucket so that no new request starts in the next seconds (e.g. after receiving a 429).
+        Arguments:
+            seconds : REQUIRED : number of seconds to pause
+        """
+        if self.maxRequestsPerSecond is None:
+            time.sleep(seconds)
+            return
+        with self._lock:
+            self._tokens = min(self._tokens, 0) - seconds * self.maxRequestsPerSecond
+
+    def __enter__(self) -> "RateController":
+        self.acquire()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.release()
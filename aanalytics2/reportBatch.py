@@ -0,0 +1,97 @@
+import time
+from concurrent import futures
+from typing import Callable, Iterable
+
+
+class ReportBatch:
+    """
+    Iterable returned by the Analytics.getReports method.
+    Iterating over it executes the requests concurrently and yields (request, result) tuples as each report finishes.
+    The result is either the report (Workspace instance) or the exception raised for that request,
+    so a failing request does not stop the others.
+    Once the iteration is over, the summary attribute provides the wall time, number of API calls and retries.
+    """
+
+    def __init__(self, requests: Iterable = None, runner: Callable = None, max_concurrency: int = 5,
+                 connector: object = None, membersOf: Callable = None) -> None:
+        """
+        Arguments:
+            requests : REQUIRED : list or iterator of requests.
+            runner : REQUIRED : function executing one request and returning its result.
+            max_concurrency : OPTIONAL : number of requests executed at the same time (default 5)
+            connector : OPTIONAL : AdobeRequest instance used, to report the API calls and retries.
+            membersOf : OPTIONAL : function returning the list of original requests covered by one item of requests.
+                When used, the runner returns a list of results aligned with that list (e.g. merged requests).
+        """
+        if requests is None:
+            raise ValueError("Require a list or an iterator of requests")
+        if runner is None:
+            raise ValueError("Require a function to execute the requests")
+        self.requests = requests
+        self.runner = runner
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.connector = connector
+        self.membersOf = membersOf
+        self.summary = None
+
+    def __repr__(self) -> str:
+        return f"ReportBatch(max_concurrency={self.max_concurrency}, summary={self.summary})"
+
+    def _run(self, request: object) -> object:
+        try:
+            return self.runner(request)
+        except Exception as error:
+            return error
+
+    def _results(self, item: object, result: object) -> list:
+        """
+        Return the list of (request, result) tuples for one executed item.
+        """
+        if self.membersOf is None:
+            return [(item, result)]
+        members = self.membersOf(item)
+        if isinstance(result, Exception):
+            return [(member, result) for member in members]
+        return list(zip(members, result))
+
+    def __iter__(self):
+        start = time.time()
+        calls_start = getattr(self.connector, "apiCalls", 0)
+        retries_start = getattr(self.connector, "retries", 0)
+        nb_requests, nb_errors = 0, 0
+        iterator = iter(self.requests)
+        exhausted = False
+        pending = {}
+        with futures.ThreadPoolExecutor(self.max_concurrency) as executor:
+            while True:
+                ## keeping a bounded number of requests submitted so iterators are not fully consumed upfront
+                while not exhausted and len(pending) < self.max_concurrency * 2:
+                    try:
+                        request = next(iterator)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending[executor.submit(self._run, request)] = request
+                if len(pending) == 0:
+                    break
+                done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    for request, result in self._results(pending.pop(future), future.result()):
+                        nb_requests += 1
+                        if isinstance(result, Exception):
+                            nb_errors += 1
+                        yield request, result
+        self.summary = {
+            "requests": nb_requests,
+            "succeeded": nb_requests - nb_errors,
+            "failed": nb_errors,
+            "wallTime": round(time.time() - start, 3),
+            "apiCalls": getattr(self.connector, "apiCalls", 0) - calls_start,
+            "retries": getattr(self.connector, "retries", 0) - retries_start,
+        }
+
+    def to_list(self) -> list:
+        """
+        Execute all requests and return the list of (request, result) tuples.
+        """
+        return list(self)
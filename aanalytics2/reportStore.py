@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import threading
+from copy import deepcopy
+from pathlib import Path
+from typing import Union
+
+import pandas as pd
+
+## date dimensions supported for the incremental reports and their pandas period (weeks start on Sunday)
+DATE_DIMENSIONS = {
+    "variables/daterangehour": "h",
+    "variables/daterangeday": "D",
+    "variables/daterangeweek": "W-SAT",
+    "variables/daterangemonth": "M",
+    "variables/daterangequarter": "Q",
+    "variables/daterangeyear": "Y",
+}
+
+
+def requestFingerprint(dataRequest: dict = None, excludeDateRange: bool = False) -> str:
+    """
+    Return the sha256 hexdigest of the canonical JSON of a report request.
+    The page setting is not part of the fingerprint, so every page of a report shares it.
+    Arguments:
+        dataRequest : REQUIRED : report request (dictionary)
+        excludeDateRange : OPTIONAL : remove the dateRange global filters, so the same report over different dates
+            shares the fingerprint (default False)
+    """
+    if dataRequest is None:
+        raise ValueError("Require a report request")
+    request = deepcopy(dataRequest)
+    request.get("settings", {}).pop("page", None)
+    if excludeDateRange:
+        request["globalFilters"] = [
+            gFilter for gFilter in request.get("globalFilters", []) if gFilter.get("type") != "dateRange"
+        ]
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def periodStart(timestamp: Union[str, pd.Timestamp] = None, freq: str = "D", shift: int = 0) -> pd.Timestamp:
+    """
+    Return the start of the period containing the timestamp, moved by shift periods.
+    Arguments:
+        timestamp : REQUIRED : date (string or Timestamp)
+        freq : OPTIONAL : pandas period frequency, see DATE_DIMENSIONS (default "D")
+        shift : OPTIONAL : number of periods to move (negative for the past) (default 0)
+    """
+    return (pd.Timestamp(timestamp).to_period(freq) + shift).start_time
+
+
+class ReportStore:
+    """
+    Local store of report responses, one JSON file per key in a folder.
+    Each record contains the metadata of the report and the response (rows, columns, summaryData)
+    so a Workspace can be rebuilt from it without calling the API.
+    Used by Analytics.getReportIncremental.
+    """
+
+    def __init__(self, folder: Union[str, Path] = "aanalytics2_store") -> None:
+        """
+        Arguments:
+            folder : OPTIONAL : folder where the records are saved (default "aanalytics2_store"). Created if needed.
+        """
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"ReportStore(folder={str(self.folder)!r}, records={len(self.keys())})"
+
+    def _path(self, key: str) -> Path:
+        return self.folder / f"{key}.json"
+
+    def keys(self) -> list:
+        """
+        Return the list of keys saved in the store.
+        """
+        return sorted(path.stem for path in self.folder.glob("*.json"))
+
+    def load(self, key: str = None) -> dict:
+        """
+        Return the record saved for that key, None when there is none.
+        Arguments:
+            key : REQUIRED : key of the record (request fingerprint)
+        """
+        path = self._path(key)
+        with self._lock:
+            if not path.exists():
+                return None
+            with open(path, "r") as f:
+                return json.load(f)
+
+    def save(self, key: str = None, record: dict = None) -> None:
+        """
+        Save the record for that key, replacing the previous one.
+        The file is written next to the previous one and then renamed, so a failure does not corrupt the store.
+        Arguments:
+            key : REQUIRED : key of the record (request fingerprint)
+            record : REQUIRED : dictionary with the "metadata" and "response" keys
+        """
+        if key is None or record is None:
+            raise ValueError("Require a key and a record")
+        path = self._path(key)
+        tmpPath = path.with_suffix(".tmp")
+        with self._lock:
+            with open(tmpPath, "w") as f:
+                json.dump(record, f)
+            os.replace(tmpPath, path)
+
+    def delete(self, key: str = None) -> None:
+        """
+        Delete the record saved for that key.
+        Arguments:
+            key : REQUIRED : key of the record (request fingerprint)
+        """
+        with self._lock:
+            self._path(key).unlink(missing_ok=True)
+
+
+class ReportCheckpoint:
+    """
+    Folder where each page of a report is saved as soon as it is received, under the fingerprint of the request.
+    When a paginated report fails (network error, error returned by the API, ...), requesting it again with the
+    same checkpoint resumes from the first missing page. The pages are deleted once the report is complete.
+    Used by the checkpoint argument of Analytics.getReport2 and Analytics.getReport.
+    """
+
+    def __init__(self, folder: Union[str, Path] = "aanalytics2_checkpoints") -> None:
+        """
+        Arguments:
+            folder : OPTIONAL : folder where the pages are saved (default "aanalytics2_checkpoints"). Created if needed.
+        """
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    def __repr__(self) -> str:
+        return f"ReportCheckpoint(folder={str(self.folder)!r})"
+
+    def _path(self, fingerprint: str, page: int) -> Path:
+        return self.folder / fingerprint / f"page_{page}.json"
+
+    def loadPage(self, fingerprint: str = None, page: int = 0) -> dict:
+        """
+        Return the response saved for that page, None when there is none.
+        Arguments:
+            fingerprint : REQUIRED : fingerprint of the request (see requestFingerprint)
+            page : REQUIRED : page number
+        """
+        path = self._path(fingerprint, page)
+        if not path.exists():
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def savePage(self, fingerprint: str = None, page: int = 0, response: dict = None) -> None:
+        """
+        Save the response of one page. The file is written next to its final name and then renamed.
+        Arguments:
+            fingerprint : REQUIRED : fingerprint of the request (see requestFingerprint)
+            page : REQUIRED : page number
+            response : REQUIRED : response of the page
+        """
+        path = self._path(fingerprint, page)
+        path.parent.mkdir(exist_ok=True)
+        tmpPath = path.with_suffix(".tmp")
+        with open(tmpPath, "w") as f:
+            json.dump(response, f)
+        os.replace(tmpPath, path)
+
+    def pages(self, fingerprint: str = None) -> list:
+        """
+        Return the sorted list of the page numbers saved for that fingerprint.
+        Arguments:
+            fingerprint : REQUIRED : fingerprint of the request (see requestFingerprint)
+        """
+        return sorted(int(path.stem.split("_")[1]) for path in (self.folder / fingerprint).glob("page_*.json"))
+
+    def clear(self, fingerprint: str = None) -> None:
+        """
+        Delete the pages saved for that fingerprint.
+        Arguments:
+            fingerprint : REQUIRED : fingerprint of the request (see requestFingerprint)
+        """
+        folder = self.folder / fingerprint
+        for path in folder.glob("page_*.*"):
+            path.unlink()
+        if folder.exists():
+            folder.rmdir()
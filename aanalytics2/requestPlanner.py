@@ -0,0 +1,467 @@
+import json
+from copy import deepcopy
+from typing import Union
+
+from aanalytics2.requestCreator import RequestCreator
+
+## maximum number of metrics sent in a single report request built by the planner
+MAX_METRICS_PER_REQUEST = 50
+## leading characters used by default to partition the items of a dimension with search clauses
+DEFAULT_SEARCH_PREFIXES = list("abcdefghijklmnopqrstuvwxyz0123456789")
+
+
+def _toDict(request: Union[dict, RequestCreator]) -> dict:
+    if isinstance(request, RequestCreator):
+        return request.to_dict()
+    if type(request) == dict:
+        return request
+    raise TypeError("Expected a dictionary or a RequestCreator instance")
+
+
+def _filterDefinitions(dataRequest: dict) -> dict:
+    """
+    Return the metric filters of the request by id, without their id (so they can be compared between requests).
+    """
+    return {
+        metricFilter["id"]: {key: value for key, value in metricFilter.items() if key != "id"}
+        for metricFilter in dataRequest.get("metricContainer", {}).get("metricFilters", [])
+    }
+
+
+def _metricDefinition(metric: dict, filterDefinitions: dict) -> str:
+    """
+    Return a string identifying the metric and the definition of its filters, independently of the ids used.
+    """
+    filters = [filterDefinitions[filterId] for filterId in metric.get("filters", [])]
+    return json.dumps({"id": metric["id"], "filters": filters}, sort_keys=True)
+
+
+def _sortMetric(dataRequest: dict) -> dict:
+    """
+    Return the metric used for sorting the rows: the one with a "sort" key, else the first one.
+    """
+    metrics = dataRequest["metricContainer"]["metrics"]
+    for metric in metrics:
+        if "sort" in metric:
+            return metric
+    return metrics[0]
+
+
+def isMergeable(dataRequest: dict) -> bool:
+    """
+    Return True if the request can be merged with other ones: ranked report (dimension) without static rows.
+    Requests ignoring the zero rows (statistics.ignoreZeroes) are not merged: the rows returned depend on all the
+    metrics of the request, so a merged request would return rows that are zero for the metrics of one member.
+    Arguments:
+        dataRequest : REQUIRED : request dictionary
+    """
+    if "dimension" not in dataRequest or len(dataRequest.get("metricContainer", {}).get("metrics", [])) == 0:
+        return False
+    if dataRequest.get("statistics", {}).get("ignoreZeroes", False):
+        return False
+    for metricFilter in dataRequest["metricContainer"].get("metricFilters", []):
+        if str(metricFilter.get("id", "")).startswith("STATIC_ROW"):
+            return False
+    return True
+
+
+def compatibilityKey(dataRequest: dict) -> str:
+    """
+    Return a key that is identical for requests that only differ in their metric list.
+    It covers rsid, dimension, global filters, search, settings, statistics and the sorting metric (with its filters),
+    so the merged request returns the same rows, in the same order, as each request alone.
+    Arguments:
+        dataRequest : REQUIRED : request dictionary
+    """
+    settings = {key: value for key, value in dataRequest.get("settings", {}).items() if key != "page"}
+    sortMetric = _sortMetric(dataRequest)
+    key = {
+        "rsid": dataRequest.get("rsid"),
+        "dimension": dataRequest.get("dimension"),
+        "globalFilters": dataRequest.get("globalFilters", []),
+        "search": dataRequest.get("search"),
+        "settings": settings,
+        "statistics": dataRequest.get("statistics"),
+        "sort": [_metricDefinition(sortMetric, _filterDefinitions(dataRequest)), sortMetric.get("sort")],
+    }
+    return json.dumps(key, sort_keys=True)
+
+
+class MergedRequest:
+    """
+    Request built by the planner from several compatible requests.
+    Attributes:
+        request : the merged request dictionary to send.
+        members : list of (original request, request dictionary, {original columnId : merged columnId}) tuples.
+    """
+
+    def __init__(self, template: dict) -> None:
+        self.request = deepcopy(template)
+        self.request["metricContainer"] = {"metrics": [], "metricFilters": []}
+        self.members = []
+        self._metrics = {}  ## metric definition -> merged columnId
+        self._filters = {}  ## filter definition -> merged filter id
+
+    def __repr__(self) -> str:
+        return f"MergedRequest(members={len(self.members)}, metrics={len(self._metrics)})"
+
+    def newMetrics(self, dataRequest: dict) -> int:
+        """
+        Return the number of metrics the request would add to the merged request.
+        """
+        filterDefinitions = _filterDefinitions(dataRequest)
+        definitions = {_metricDefinition(metric, filterDefinitions)
+                       for metric in dataRequest["metricContainer"]["metrics"]}
+        return len(definitions - set(self._metrics))
+
+    @property
+    def metricCount(self) -> int:
+        return len(self._metrics)
+
+    def _addMetric(self, metric: dict, filterDefinitions: dict, sort: bool = False) -> str:
+        definition = _metricDefinition(metric, filterDefinitions)
+        if definition in self._metrics:
+            return self._metrics[definition]
+        filterIds = []
+        for filterId in metric.get("filters", []):
+            filterDefinition = json.dumps(filterDefinitions[filterId], sort_keys=True)
+            if filterDefinition not in self._filters:
+                newId = str(len(self._filters))
+                self._filters[filterDefinition] = newId
+                self.request["metricContainer"]["metricFilters"].append({"id": newId, **filterDefinitions[filterId]})
+            filterIds.append(self._filters[filterDefinition])
+        columnId = str(len(self._metrics))
+        newMetric = {key: value for key, value in metric.items() if key not in ("columnId", "filters", "sort")}
+        newMetric["columnId"] = columnId
+        if sort and "sort" in metric:
+            newMetric["sort"] = metric["sort"]
+        if len(filterIds) > 0:
+            newMetric["filters"] = filterIds
+        self.request["metricContainer"]["metrics"].append(newMetric)
+        self._metrics[definition] = columnId
+        return columnId
+
+    def add(self, original: object, dataRequest: dict) -> None:
+        """
+        Add a request to the merged request, the sorting metric of the first request added is placed first.
+        Arguments:
+            original : REQUIRED : the request as provided by the user (returned in members)
+            dataRequest : REQUIRED : the request dictionary
+        """
+        filterDefinitions = _filterDefinitions(dataRequest)
+        if len(self._metrics) == 0:
+            self._addMetric(_sortMetric(dataRequest), filterDefinitions, sort=True)
+        columnMap = {}
+        for metric in dataRequest["metricContainer"]["metrics"]:
+            columnMap[metric["columnId"]] = self._addMetric(metric, filterDefinitions)
+        self.members.append((original, dataRequest, columnMap))
+
+
+def planMergedRequests(requests: list, maxMetrics: int = MAX_METRICS_PER_REQUEST, originals: list = None) -> list:
+    """
+    Group the requests that only differ in their metric list and merge their metricContainer into a single request,
+    up to maxMetrics metrics per request. The metricFilters ids are renumbered, identical metrics are requested once.
+    Requests that cannot be merged (static rows, no dimension) are returned in their own MergedRequest.
+    Returns a list of MergedRequest instances.
+    Arguments:
+        requests : REQUIRED : list of requests (dictionary or RequestCreator instances)
+        maxMetrics : OPTIONAL : maximum number of metrics per merged request (default MAX_METRICS_PER_REQUEST)
+        originals : OPTIONAL : list of objects, aligned with requests, returned in the members instead of the requests.
+    """
+    if originals is None:
+        originals = requests
+    plans = []
+    openPlans = {}  ## compatibility key -> MergedRequest being filled
+    for original, request in zip(originals, requests):
+        dataRequest = _toDict(request)
+        metrics = dataRequest.get("metricContainer", {}).get("metrics", [])
+        if not isMergeable(dataRequest) or len(metrics) >= maxMetrics:
+            plan = MergedRequest(dataRequest)
+            plan.request = deepcopy(dataRequest)
+            plan.members.append((original, dataRequest, {metric.get("columnId"): metric.get("columnId")
+                                                         for metric in metrics}))
+            plans.append(plan)
+            continue
+        key = compatibilityKey(dataRequest)
+        plan = openPlans.get(key)
+        if plan is None or plan.metricCount + plan.newMetrics(dataRequest) > maxMetrics:
+            plan = MergedRequest(dataRequest)
+            openPlans[key] = plan
+            plans.append(plan)
+        plan.add(original, dataRequest)
+    return plans
+
+
+def totalsRequest(dataRequest: dict) -> dict:
+    """
+    Return the minimal request returning the totals (summaryData) of the metrics of a request:
+    no dimension, search or sorting, a limit of 1 row, and the segments of the global filters applied as metric filters,
+    so the totals of requests on different segments can be merged in one request.
+    The metrics keep their columnId.
+    Arguments:
+        dataRequest : REQUIRED : request dictionary
+    """
+    request = deepcopy(_toDict(dataRequest))
+    for key in ("dimension", "search"):
+        request.pop(key, None)
+    request.setdefault("settings", {})
+    request["settings"]["limit"] = 1
+    request["settings"]["page"] = 0
+    metricContainer = request.setdefault("metricContainer", {})
+    metricFilters = metricContainer.setdefault("metricFilters", [])
+    globalFilters = request.get("globalFilters", [])
+    segmentIds = [gFilter["segmentId"] for gFilter in globalFilters
+                  if gFilter.get("type") == "segment" and gFilter.get("segmentId") is not None]
+    request["globalFilters"] = [gFilter for gFilter in globalFilters
+                                if not (gFilter.get("type") == "segment" and gFilter.get("segmentId") is not None)]
+    filterIds = []
+    existingIds = {metricFilter["id"] for metricFilter in metricFilters}
+    for segmentId in segmentIds:
+        filterId = f"TOTALS_SEGMENT_{len(filterIds)}"
+        while filterId in existingIds:
+            filterId += "_"
+        metricFilters.append({"id": filterId, "type": "segment", "segmentId": segmentId})
+        filterIds.append(filterId)
+    for metric in metricContainer.get("metrics", []):
+        metric.pop("sort", None)
+        if len(filterIds) > 0:
+            metric["filters"] = metric.get("filters", []) + filterIds
+    return request
+
+
+def totalsKey(dataRequest: dict) -> str:
+    """
+    Return a key that is identical for totals requests (see totalsRequest) that can be merged:
+    same report suite, global filters (dateRange, breakdowns, segment definitions), settings and statistics.
+    Arguments:
+        dataRequest : REQUIRED : request dictionary returned by totalsRequest
+    """
+    settings = {key: value for key, value in dataRequest.get("settings", {}).items() if key != "page"}
+    key = {
+        "rsid": dataRequest.get("rsid"),
+        "globalFilters": dataRequest.get("globalFilters", []),
+        "settings": settings,
+        "statistics": dataRequest.get("statistics"),
+    }
+    return json.dumps(key, sort_keys=True)
+
+
+def planTotalsRequests(requests: list, maxMetrics: int = MAX_METRICS_PER_REQUEST, originals: list = None) -> list:
+    """
+    Convert the requests into totals requests (see totalsRequest) and merge the ones sharing the same report suite,
+    global filters and settings into a single request, up to maxMetrics metrics per request.
+    Returns a list of MergedRequest instances, the members containing the totals request of each original request.
+    Arguments:
+        requests : REQUIRED : list of requests (dictionary or RequestCreator instances)
+        maxMetrics : OPTIONAL : maximum number of metrics per merged request (default MAX_METRICS_PER_REQUEST)
+        originals : OPTIONAL : list of objects, aligned with requests, returned in the members instead of the requests.
+    """
+    if originals is None:
+        originals = requests
+    plans = []
+    openPlans = {}  ## totals key -> MergedRequest being filled
+    for original, request in zip(originals, requests):
+        dataRequest = totalsRequest(request)
+        key = totalsKey(dataRequest)
+        plan = openPlans.get(key)
+        if plan is None or plan.metricCount + plan.newMetrics(dataRequest) > maxMetrics:
+            plan = MergedRequest(dataRequest)
+            openPlans[key] = plan
+            plans.append(plan)
+        plan.add(original, dataRequest)
+    return plans
+
+
+def splitMergedResponse(response: dict, columnMap: dict) -> dict:
+    """
+    Extract the response of one member from the response of a merged request.
+    The data of the rows and the summaryData lists are reduced to the member columns, in its original order.
+    Arguments:
+        response : REQUIRED : response of the merged request (as returned by Analytics._fetchReport)
+        columnMap : REQUIRED : {original columnId : merged columnId} of the member
+    """
+    mergedIds = response.get("columns", {}).get("columnIds", [])
+    position = {columnId: index for index, columnId in enumerate(mergedIds)}
+    indexes = [position[mergedId] for mergedId in columnMap.values()]
+    n_columns = len(mergedIds)
+
+    def subset(values: list) -> list:
+        return [values[index] for index in indexes]
+
+    member = {key: value for key, value in response.items() if key not in ("rows", "columns", "summaryData")}
+    member["columns"] = {**response.get("columns", {}), "columnIds": list(columnMap.keys())}
+    member["summaryData"] = {
+        key: subset(value) if type(value) == list and len(value) == n_columns else value
+        for key, value in response.get("summaryData", {}).items()
+    }
+    rows = []
+    for row in response.get("rows", []):
+        newRow = dict(row)
+        for key in ("data", "dataExpected", "dataUpperBound", "dataLowerBound"):
+            if key in row:
+                newRow[key] = subset(row[key])
+        rows.append(newRow)
+    member["rows"] = rows
+    return member
+
+
+def splitMetricContainer(dataRequest: dict, maxMetrics: int = MAX_METRICS_PER_REQUEST) -> list:
+    """
+    Split a request with more than maxMetrics metrics into several requests.
+    Each metric keeps its columnId and filters, each sub-request only contains the metricFilters its metrics reference.
+    The sorting metric is added to every sub-request so they all return the same rows in the same order.
+    Returns the list of sub-requests (the request alone if it does not need to be split).
+    Arguments:
+        dataRequest : REQUIRED : request dictionary
+        maxMetrics : OPTIONAL : maximum number of metrics per sub-request (default MAX_METRICS_PER_REQUEST)
+    """
+    metrics = dataRequest["metricContainer"]["metrics"]
+    if len(metrics) <= maxMetrics:
+        return [dataRequest]
+    if maxMetrics < 2:
+        raise ValueError("maxMetrics should be at least 2 to split a request")
+    sortMetric = _sortMetric(dataRequest)
+    others = [metric for metric in metrics if metric is not sortMetric]
+    metricFilters = dataRequest["metricContainer"].get("metricFilters", [])
+    subRequests = []
+    for start in range(0, len(others), maxMetrics - 1):
+        chunk = [sortMetric] + others[start:start + maxMetrics - 1]
+        usedFilters = {filterId for metric in chunk for filterId in metric.get("filters", [])}
+        subRequest = {key: value for key, value in dataRequest.items() if key != "metricContainer"}
+        subRequest = deepcopy(subRequest)
+        subRequest["metricContainer"] = deepcopy({
+            **dataRequest["metricContainer"],
+            "metrics": chunk,
+            "metricFilters": [metricFilter for metricFilter in metricFilters if metricFilter["id"] in usedFilters],
+        })
+        subRequests.append(subRequest)
+    return subRequests
+
+
+def joinSplitResponses(responses: list, columnIds: list) -> dict:
+    """
+    Join the responses of the sub-requests returned by splitMetricContainer on the itemId.
+    The data of the rows and the summaryData lists follow the columnIds order.
+    The rows are the items of the first response, in its order (so the result does not grow past n_results).
+    Items missing from another sub-request get None for its metrics: use missingItems to request them before joining.
+    Arguments:
+        responses : REQUIRED : list of responses (as returned by Analytics._fetchReport), in the sub-requests order
+        columnIds : REQUIRED : list of the columnIds of the original request
+    """
+    if len(responses) == 1:
+        return responses[0]
+    ## columnId -> (response index, position in that response)
+    location = {}
+    for index, response in enumerate(responses):
+        for position, columnId in enumerate(response.get("columns", {}).get("columnIds", [])):
+            location.setdefault(columnId, (index, position))
+    joined = {key: value for key, value in responses[0].items() if key not in ("rows", "columns", "summaryData")}
+    joined["columns"] = {**responses[0].get("columns", {}), "columnIds": list(columnIds)}
+    summaryData = {}
+    for key, value in responses[0].get("summaryData", {}).items():
+        if type(value) == list and len(value) == len(responses[0].get("columns", {}).get("columnIds", [])):
+            summaryData[key] = [responses[location[columnId][0]]["summaryData"][key][location[columnId][1]]
+                                for columnId in columnIds]
+        else:
+            summaryData[key] = value
+    joined["summaryData"] = summaryData
+    ## itemId -> one row per response, for the items of the first response
+    rowsByItem = {row["itemId"]: [row] + [None] * (len(responses) - 1) for row in responses[0].get("rows", [])}
+    for index, response in enumerate(responses[1:], start=1):
+        for row in response.get("rows", []):
+            if row["itemId"] in rowsByItem:
+                rowsByItem[row["itemId"]][index] = row
+    rows = []
+    for itemId, itemRows in rowsByItem.items():
+        firstRow = itemRows[0]
+        newRow = dict(firstRow)
+        for key in ("data", "dataExpected", "dataUpperBound", "dataLowerBound"):
+            if key in firstRow:
+                newRow[key] = [
+                    itemRows[location[columnId][0]][key][location[columnId][1]]
+                    if itemRows[location[columnId][0]] is not None and key in itemRows[location[columnId][0]]
+                    else None
+                    for columnId in columnIds
+                ]
+        rows.append(newRow)
+    joined["rows"] = rows
+    joined["numberOfElements"] = len(rows)
+    return joined
+
+
+def missingItems(responses: list) -> list:
+    """
+    Return, for each response of the sub-requests returned by splitMetricContainer, the itemIds of the first response
+    it does not contain (ties on the sorting metric or truncated pages can make the sub-requests return other items).
+    The list of the first response is always empty.
+    Arguments:
+        responses : REQUIRED : list of responses (as returned by Analytics._fetchReport), in the sub-requests order
+    """
+    firstItems = [row["itemId"] for row in responses[0].get("rows", [])]
+    missing = [[]]
+    for response in responses[1:]:
+        found = {row["itemId"] for row in response.get("rows", [])}
+        missing.append([itemId for itemId in firstItems if itemId not in found])
+    return missing
+
+
+def itemsRequest(dataRequest: dict, itemIds: list) -> dict:
+    """
+    Return a copy of the request restricted to a list of items (itemIds search), with a limit covering all of them.
+    Arguments:
+        dataRequest : REQUIRED : request dictionary with a dimension
+        itemIds : REQUIRED : list of itemIds
+    """
+    request = deepcopy(dataRequest)
+    request.setdefault("search", {})["itemIds"] = list(itemIds)
+    request.setdefault("settings", {})
+    request["settings"]["limit"] = len(itemIds)
+    request["settings"]["page"] = 0
+    return request
+
+
+def addBreakdownFilters(dataRequest: dict, breakdowns: list) -> list:
+    """
+    Add one breakdown metricFilter per (dimension, itemId) to the request and apply them to all its metrics.
+    The ids of the new filters never collide with the ids of the metricFilters already in the request.
+    Returns the list of the new filter ids.
+    Arguments:
+        dataRequest : REQUIRED : request dictionary, modified in place
+        breakdowns : REQUIRED : list of (dimension, itemId) tuples, from the top level to the deepest one
+    """
+    metricFilters = dataRequest["metricContainer"].setdefault("metricFilters", [])
+    usedIds = {str(metricFilter.get("id")) for metricFilter in metricFilters}
+    filterIds = []
+    index = 0
+    for dimension, itemId in breakdowns:
+        while f"breakdown_{index}" in usedIds:
+            index += 1
+        filterId = f"breakdown_{index}"
+        usedIds.add(filterId)
+        metricFilters.append({"id": filterId, "type": "breakdown", "dimension": dimension, "itemId": str(itemId)})
+        filterIds.append(filterId)
+    if len(filterIds) > 0:
+        for metric in dataRequest["metricContainer"]["metrics"]:
+            metric["filters"] = metric.get("filters", []) + filterIds
+    return filterIds
+
+
+def searchPartitions(prefixes: list = None) -> list:
+    """
+    Return a list of disjoint search clauses covering all the items of a dimension:
+    one "BEGINS-WITH" clause per prefix and a last clause for the items starting with none of the prefixes.
+    The search is case insensitive, so prefixes should be lower case and none of them should start with another one.
+    Arguments:
+        prefixes : OPTIONAL : list of leading strings (default DEFAULT_SEARCH_PREFIXES: a-z and 0-9)
+    """
+    prefixes = [str(prefix).lower() for prefix in (prefixes or DEFAULT_SEARCH_PREFIXES)]
+    for prefix in prefixes:
+        if prefix == "" or "'" in prefix:
+            raise ValueError(f"Invalid prefix for a search clause: {prefix!r}")
+        if any(other != prefix and prefix.startswith(other) for other in prefixes):
+            raise ValueError(f"The prefix {prefix!r} overlaps with another prefix")
+    if len(set(prefixes)) != len(prefixes):
+        raise ValueError("The prefixes should be unique")
+    clauses = [f"( BEGINS-WITH '{prefix}' )" for prefix in prefixes]
+    clauses.append(" AND ".join(f"( NOT BEGINS-WITH '{prefix}' )" for prefix in prefixes))
+    return clauses
@@ -1,9 +1,14 @@
 import math
+import numpy as np
 import pandas as pd
 import json
 from typing import Union, IO
 import time
+from concurrent import futures
 from .requestCreator import RequestCreator
+from .rateController import RateController
+from .requestPlanner import addBreakdownFilters
+from .arrowExport import dataframeToArrow
 from .workspaceManager import WorkspaceManager, TextBuilder
 from copy import deepcopy
 
@@ -16,6 +21,7 @@ class Workspace:
     startDate = None
     endDate = None
     settings = None
+    spillFile = None  ## Arrow IPC file backing the dataframe, see the spillThreshold argument of getReport2
 
     def __init__(
         self,
@@ -28,6 +34,7 @@ class Workspace:
         metrics: Union[dict, list] = None,  ## for normal type, static report
         metricFilters: dict = None,
         resolveColumns: bool = True,
+        compact: bool = False,
     ) -> None:
         """
         Setup the different values from the response of the getReport
@@ -41,6 +48,7 @@ class Workspace:
             metrics : OPTIONAL : dictionary of the columns Id for normal report and list of columns name for Static report
             metricFilters : OPTIONAL : Filter name for the id of the filter
             resolveColumns : OPTIONAL : If you want to resolve the column name and returning ID instead of name
+            compact : OPTIONAL : reduce the memory used by the dataframe, see compactDataframe (default False)
         """
         for filter in dataRequest["globalFilters"]:
             if filter["type"] == "dateRange":
@@ -53,61 +61,93 @@ class Workspace:
         self.summaryData = summaryData
         self.reportType = reportType
         self.analyticsObject = analyticsConnector
-        ## global filters resolution
-        filters = []
-        for filter in dataRequest["globalFilters"]:
-            if filter["type"] == "segment":
-                segmentId = filter.get("segmentId",None)
-                if segmentId is not None:
-                    seg = self.analyticsObject.getSegment(filter["segmentId"])
-                    filter["segmentName"] = seg["name"]
-                else:
-                    context = filter.get('segmentDefinition',{}).get('container',{}).get('context')
-                    description = filter.get('segmentDefinition',{}).get('container',{}).get('pred',{}).get('description')
-                    listName = ','.join(filter.get('segmentDefinition',{}).get('container',{}).get('pred',{}).get('list',[]))
-                    function = filter.get('segmentDefinition',{}).get('container',{}).get('pred',{}).get('func')
-                    filter["segmentId"] = f"Dynamic: {context} {description} {function} {listName}"
-                    filter["segmentName"] = f"{context} {description} {listName}"
-            filters.append(filter)
-        self.globalFilters = filters
         self.metricFilters = metricFilters
-        if reportType == "normal" or reportType == "static":
-            df_init = pd.DataFrame(responseData).T
-            df_init = df_init.reset_index()
-        elif reportType == "multi":
-            df_init = responseData
+        ## the names and the dataframe are built on first access (see globalFilters, columns and dataframe)
+        self._request = dataRequest
+        self._responseData = responseData
+        self._responseColumns = columns
+        self._metrics = metrics
+        self._resolveColumns = resolveColumns
+        self._globalFilters = None
+        self._columns = None
+        self._dataframe = None
+        self.row_numbers = len(responseData)
+        self.memoryUsage = None
+        if compact:
+            self.compactDataframe()
+
+    def _prefetchNames(self) -> None:
+        """
+        Load the names of all components used in one go.
+        """
+        dataRequest = self._request
+        componentIds = [filter["segmentId"] for filter in dataRequest["globalFilters"]
+                        if filter["type"] == "segment" and filter.get("segmentId", None) is not None]
+        if self._resolveColumns and self.reportType == "normal" and "dimension" in dataRequest.keys():
+            componentIds += [part for col in self._responseColumns["columnIds"] for part in self._metrics[col].split(":::")]
+        self.analyticsObject.catalog.prefetch(
+            segments=[componentId for componentId in componentIds if componentId.startswith("s")],
+            calculatedMetrics=[componentId for componentId in componentIds if componentId.startswith("cm")],
+        )
+
+    @property
+    def globalFilters(self) -> list:
+        """Global filters of the request, with the name of the segments (resolved on first access)."""
+        if self._globalFilters is None:
+            self._prefetchNames()
+            catalog = self.analyticsObject.catalog
+            filters = []
+            for filter in self._request["globalFilters"]:
+                if filter["type"] == "segment":
+                    segmentId = filter.get("segmentId",None)
+                    if segmentId is not None:
+                        filter["segmentName"] = catalog.segmentName(filter["segmentId"])
+                    else:
+                        context = filter.get('segmentDefinition',{}).get('container',{}).get('context')
+                        description = filter.get('segmentDefinition',{}).get('container',{}).get('pred',{}).get('description')
+                        listName = ','.join(filter.get('segmentDefinition',{}).get('container',{}).get('pred',{}).get('list',[]))
+                        function = filter.get('segmentDefinition',{}).get('container',{}).get('pred',{}).get('func')
+                        filter["segmentId"] = f"Dynamic: {context} {description} {function} {listName}"
+                        filter["segmentName"] = f"{context} {description} {listName}"
+                filters.append(filter)
+            self._globalFilters = filters
+        return self._globalFilters
+
+    @globalFilters.setter
+    def globalFilters(self, filters: list) -> None:
+        self._globalFilters = filters
+
+    def _columnNames(self) -> list:
+        """
+        Return the names of the dataframe columns, resolving the metric names when resolveColumns is used.
+        """
+        dataRequest = self._request
+        reportType = self.reportType
+        columns_data = []
         if reportType == "normal":
             columns_data = ["itemId"]
         elif reportType == "static":
             columns_data = ["SegmentName"]
         ### adding dimensions & metrics in columns names when reportType is "normal"
         if "dimension" in dataRequest.keys() and reportType == "normal":
+            self._prefetchNames()
+            catalog = self.analyticsObject.catalog
             columns_data.append(dataRequest["dimension"])
             ### adding metrics in columns names
-            columnIds = columns["columnIds"]
-            # To get readable names of template metrics and Success Events, we need to get the full list of metrics for the Report Suite first. 
-            # But we won't do this if there are no such metrics in the report.
-            if (resolveColumns is True) & (
-                    len([metric for metric in metrics.values() if metric.startswith("metrics/")]) > 0):
-                rsMetricsList = self.analyticsObject.getMetrics(rsid=dataRequest["rsid"])
+            columnIds = self._responseColumns["columnIds"]
+            metrics: dict = self._metrics  ## case when dict is used
+            # Names of template metrics and Success Events come from the metrics of the Report Suite, loaded once by the catalog.
             for col in columnIds:
-                metrics: dict = metrics  ## case when dict is used
                 metricListName: list = metrics[col].split(":::")
-                if resolveColumns:
+                if self._resolveColumns:
                     metricResolvedName = []
                     for metric in metricListName:
                         if metric.startswith("cm"):
-                            cm = self.analyticsObject.getCalculatedMetric(metric)
-                            metricName = cm.get("name",metric)
-                            metricResolvedName.append(metricName)
+                            metricResolvedName.append(catalog.calculatedMetricName(metric))
                         elif metric.startswith("s"):
-                            seg = self.analyticsObject.getSegment(metric)
-                            segName = seg.get("name",metric)
-                            metricResolvedName.append(segName)
+                            metricResolvedName.append(catalog.segmentName(metric))
                         elif metric.startswith("metrics/"):
-                            matched = rsMetricsList[rsMetricsList["id"] == metric]["name"]
-                            metricName = matched.iloc[0] if not matched.empty else metric
-                            metricResolvedName.append(metricName)
+                            metricResolvedName.append(catalog.metricName(metric, dataRequest["rsid"]))
                         else:
                             metricResolvedName.append(metric)
                     colName = ":::".join(metricResolvedName)
@@ -115,20 +155,51 @@ class Workspace:
                 else:
                     columns_data.append(metrics[col])
         elif reportType == "static":
-            metrics: list = metrics  ## case when a list is used
+            metrics: list = self._metrics  ## case when a list is used
             columns_data.append("SegmentId")
             columns_data += metrics
-        if df_init.empty == False and (
-            reportType == "static" or reportType == "normal"
-        ):
-            df_init.columns = columns_data
-            self.columns = list(df_init.columns)
-        elif reportType == "multi":
-            self.columns = list(df_init.columns)
-        else:
-            self.columns = list(df_init.columns)
-        self.row_numbers = len(df_init)
-        self.dataframe = df_init
+        return columns_data
+
+    @property
+    def columns(self) -> list:
+        """Names of the dataframe columns (resolved on first access, without building the dataframe)."""
+        if self._columns is None:
+            if self._dataframe is None and self.row_numbers > 0 and self.reportType in ("normal", "static"):
+                self._columns = self._columnNames()
+            else:
+                self._columns = list(self.dataframe.columns)
+        return self._columns
+
+    @columns.setter
+    def columns(self, columns: list) -> None:
+        self._columns = columns
+
+    @property
+    def dataframe(self) -> pd.DataFrame:
+        """Data of the report, built from the response on first access."""
+        if self._dataframe is None:
+            reportType = self.reportType
+            if isinstance(self._responseData, pd.DataFrame):  ## built from column arrays by getReport2
+                df_init = self._responseData
+            elif reportType == "normal" or reportType == "static":
+                df_init = pd.DataFrame(self._responseData).T
+                df_init = df_init.reset_index()
+            elif reportType == "multi":
+                df_init = self._responseData
+            if df_init.empty == False and (
+                reportType == "static" or reportType == "normal"
+            ):
+                df_init.columns = self.columns
+            elif self._columns is None:
+                self._columns = list(df_init.columns)
+            self._dataframe = df_init
+            self._responseData = None  ## the dataframe holds the data from now on
+        return self._dataframe
+
+    @dataframe.setter
+    def dataframe(self, df: pd.DataFrame) -> None:
+        self._dataframe = df
+        self._responseData = None
 
     def __str__(self):
         return json.dumps(
@@ -154,6 +225,42 @@ class Workspace:
             indent=4,
         )
 
+    def compactDataframe(self) -> dict:
+        """
+        Reduce the memory used by the dataframe:
+        the metrics are downcast to the narrowest integer type, or float32, when no value changes (float64 otherwise),
+        the dimension values and itemIds become categorical when they contain repeated values,
+        Arrow-backed strings otherwise (when pyarrow is installed).
+        Returns (and stores in the memoryUsage attribute) the memory used in bytes before and after.
+        """
+        df = self.dataframe
+        before = int(df.memory_usage(deep=True).sum())
+        if self.reportType in ("normal", "static"):
+            metricColumns = list(df.columns)[2:]
+        else:
+            metricColumns = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+        for col in df.columns:
+            if col in metricColumns:
+                values = pd.to_numeric(df[col], errors="coerce")
+                compacted = pd.to_numeric(values, downcast="integer")
+                if not pd.api.types.is_integer_dtype(compacted):
+                    values = values.astype("float64")
+                    float32 = values.astype("float32")
+                    compacted = float32 if np.array_equal(float32.to_numpy(dtype="float64"), values.to_numpy(),
+                                                          equal_nan=True) else values
+                df[col] = compacted
+            elif not isinstance(df[col].dtype, pd.CategoricalDtype) and df[col].nunique(dropna=False) <= len(df) / 2:
+                df[col] = df[col].astype("category")
+            elif df[col].dtype == object:
+                try:
+                    df[col] = df[col].astype("string[pyarrow]")  ## unique values stored in one Arrow buffer
+                except ImportError:
+                    pass  ## pyarrow not installed, values kept as python strings
+        self.memoryUsage = {"before": before, "after": int(df.memory_usage(deep=True).sum())}
+        if getattr(self.analyticsObject, "loggingEnabled", False):
+            self.analyticsObject.logger.debug(f"dataframe memory usage: {self.memoryUsage}")
+        return self.memoryUsage
+
     def to_csv(
         self,
         filename: str = None,
@@ -182,6 +289,45 @@ class Workspace:
             filename = f"cjapy_{int(time.time())}.json"
         self.dataframe.to_json(filename, orient=orient)
 
+    def to_arrow(self) -> "pyarrow.Table":
+        """
+        Return the result as a pyarrow Table, with the metrics as float64 columns and the dimension values dictionary encoded.
+        Requires the pyarrow module.
+        """
+        if self.reportType in ("normal", "static"):
+            metricColumns = list(self.dataframe.columns)[2:]
+        else:
+            metricColumns = None
+        return dataframeToArrow(self.dataframe, metricColumns=metricColumns)
+
+    def to_parquet(self, filename: str = None, compression: str = "snappy") -> str:
+        """
+        Save the result in a parquet file (see to_arrow for the column types). Returns the filename.
+        Requires the pyarrow module.
+        Arguments:
+            filename : OPTIONAL : name of the file
+            compression : OPTIONAL : compression codec (default "snappy")
+        """
+        import pyarrow.parquet as pq
+        if filename is None:
+            filename = f"cjapy_{int(time.time())}.parquet"
+        pq.write_table(self.to_arrow(), filename, compression=compression)
+        return filename
+
+    def to_feather(self, filename: str = None, compression: str = "lz4") -> str:
+        """
+        Save the result in a feather (Arrow IPC) file (see to_arrow for the column types). Returns the filename.
+        Requires the pyarrow module.
+        Arguments:
+            filename : OPTIONAL : name of the file
+            compression : OPTIONAL : compression codec, "lz4", "zstd" or "uncompressed" (default "lz4")
+        """
+        import pyarrow.feather as feather
+        if filename is None:
+            filename = f"cjapy_{int(time.time())}.feather"
+        feather.write_feather(self.to_arrow(), filename, compression=compression)
+        return filename
+
     def breakdown(
         self,
         index: Union[int, str] = None,
@@ -220,6 +366,70 @@ class Workspace:
         )
         return report
 
+    def breakdownMany(
+        self,
+        indexes: Union[list, str] = "all",
+        dimension: str = None,
+        n_results: Union[int, str] = 10,
+        max_concurrency: int = 5,
+        maxRequestsPerSecond: float = 2,
+        burst: int = 12,
+    ) -> pd.DataFrame:
+        """
+        Breakdown several rows of the dataframe by another dimension, with the requests executed concurrently.
+        NOTE: breakdowns are possible only from normal reportType.
+        Return a dataframe in long format: the parent itemId and value, followed by the breakdown itemId, value and metrics.
+        The metric columns use the names of this report, no additional call is made to resolve them.
+        Arguments:
+            indexes : OPTIONAL : list of values or indexes of the dataframe to breakdown, or "all" (default "all")
+            dimension : REQUIRED : dimension to report.
+            n_results : OPTIONAL : number of results for each breakdown. Default 10, can use "inf"
+            max_concurrency : OPTIONAL : number of breakdowns requested at the same time (default 5)
+            maxRequestsPerSecond : OPTIONAL : average number of report calls per second (default 2)
+            burst : OPTIONAL : number of report calls that can be sent at once before the rate applies (default 12)
+        """
+        if dimension is None:
+            raise ValueError("Require a dimension to request")
+        if self.reportType != "normal":
+            raise ValueError("Breakdowns are possible only from normal reportType")
+        parentDimension = list(self.dataframe.columns)[1]
+        if type(indexes) == str and indexes == "all":
+            parents = self.dataframe[["itemId", parentDimension]].values.tolist()
+        else:
+            parents = []
+            for index in indexes:
+                if type(index) == str:
+                    row: pd.Series = self.dataframe[self.dataframe.iloc[:, 1] == index]
+                    parents.append([row["itemId"].values[0], index])
+                else:
+                    parents.append([self.dataframe.loc[index, "itemId"], self.dataframe.loc[index, parentDimension]])
+        baseRequest = self.dataRequest.to_dict()
+        baseRequest["dimension"] = dimension
+        baseRequest.pop("search", None)
+        baseRequest["settings"]["page"] = 0
+        if n_results != "inf":
+            baseRequest["settings"]["limit"] = min(int(n_results), baseRequest["settings"].get("limit") or int(n_results))
+        requests = []
+        for itemId, _ in parents:
+            request = deepcopy(baseRequest)
+            addBreakdownFilters(request, [(parentDimension, itemId)])
+            requests.append(request)
+        params = self.analyticsObject._reportParams()
+        rateController = RateController(maxRequestsPerSecond=maxRequestsPerSecond, burst=burst,
+                                        maxConcurrency=max_concurrency)
+        with futures.ThreadPoolExecutor(max(1, max_concurrency)) as executor:
+            responses = list(executor.map(
+                lambda request: self.analyticsObject._fetchSplitReport(request, params=params, n_results=n_results,
+                                                                       rateController=rateController),
+                requests))
+        metricNames = list(self.dataframe.columns)[2:]
+        records = []
+        for (parentItemId, parentValue), response in zip(parents, responses):
+            for row in response.get("rows", []):
+                records.append([parentItemId, parentValue, row["itemId"], row["value"]]
+                               + list(row["data"][:len(metricNames)]))
+        return pd.DataFrame(records, columns=["parentItemId", parentDimension, "itemId", dimension] + metricNames)
+
 
 class TargetWorkspace(Workspace):
     """
@@ -255,6 +465,7 @@ class TargetWorkspace(Workspace):
         metrics: Union[dict, list] = None,
         metricFilters: dict = None,
         resolveColumns: bool = True,
+        compact: bool = False,
         # Target-specific parameters
         activityName: str = None,
         list_items: list = None,
@@ -283,6 +494,7 @@ class TargetWorkspace(Workspace):
             metrics         : OPTIONAL : column mapping dict (normal) or list (static).
             metricFilters   : OPTIONAL : filter name mapping for metric filter IDs.
             resolveColumns  : OPTIONAL : resolve column IDs to display names (default True).
+            compact         : OPTIONAL : reduce the memory used by the dataframe once it is built (default False).
             activityName    : OPTIONAL : name of the Target activity.
             list_items      : OPTIONAL : list of experience names to keep (filters the dataframe).
             controlGroup    : OPTIONAL : name of the control experience. Defaults to the experience
@@ -321,7 +533,6 @@ class TargetWorkspace(Workspace):
         self.apiCalls:int = apiCalls
         self.analyticsObject = analyticsConnector
         self.activityFilter:str = activityFilter
-        self.segments:list = self.analyticsObject.getSegments(format="raw")
 
         # Rename dimension column to 'Target Experience' and metric columns to targetMetrics
         if self.metrics:
@@ -373,6 +584,13 @@ class TargetWorkspace(Workspace):
         except Exception as e:
             print(f"Error computing confidence. The data returned may not be suitable for confidence computation: {e}")
             self.dataframe = df.copy()
+        if compact:
+            self.compactDataframe()
+
+    @property
+    def segments(self) -> list:
+        """List of the segments of the company (id and name), loaded once by the catalog of the Analytics instance."""
+        return self.analyticsObject.catalog.segmentList()
 
     def _betacf(self, a: float, b: float, x: float, max_iter: int = 200, eps: float = 3e-7) -> float:
         """Lentz continued-fraction evaluation of the incomplete beta function."""
@@ -439,80 +657,178 @@ class TargetWorkspace(Workspace):
         else:
             raise ValueError("evaluation must be '2sides', 'leftOneSided', or 'rightOneSided'")
 
+    def _betacf_vec(self, a: np.ndarray, b: np.ndarray, x: np.ndarray, max_iter: int = 200, eps: float = 3e-7) -> np.ndarray:
+        """Vectorized version of _betacf, each element stops iterating once converged."""
+        a, b, x = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float), np.asarray(x, dtype=float))
+        qab = a + b
+        qap = a + 1.0
+        qam = a - 1.0
+        c = np.ones_like(x)
+        d = 1.0 - qab * x / qap
+        d = np.where(np.abs(d) < 1e-30, 1e-30, d)
+        d = 1.0 / d
+        h = d.copy()
+        active = np.ones(x.shape, dtype=bool)
+        for m in range(1, max_iter + 1):
+            if not active.any():
+                break
+            m2 = 2 * m
+            aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+            d_new = 1.0 + aa * d
+            d_new = np.where(np.abs(d_new) < 1e-30, 1e-30, d_new)
+            c_new = 1.0 + aa / c
+            c_new = np.where(np.abs(c_new) < 1e-30, 1e-30, c_new)
+            d_new = 1.0 / d_new
+            h_new = h * d_new * c_new
+            aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+            d_new = 1.0 + aa * d_new
+            d_new = np.where(np.abs(d_new) < 1e-30, 1e-30, d_new)
+            c_new = 1.0 + aa / c_new
+            c_new = np.where(np.abs(c_new) < 1e-30, 1e-30, c_new)
+            d_new = 1.0 / d_new
+            delta = d_new * c_new
+            h_new = h_new * delta
+            ## converged elements keep their value
+            d = np.where(active, d_new, d)
+            c = np.where(active, c_new, c)
+            h = np.where(active, h_new, h)
+            active = active & ~(np.abs(delta - 1.0) < eps)
+        return h
+
+    def _lgamma_vec(self, values: np.ndarray) -> np.ndarray:
+        """
+        math.lgamma of each value, as a float array. numpy has no lgamma (and scipy is not a dependency):
+        math.lgamma is called once per distinct value, e.g. once for b=0.5 and once per degree of freedom.
+        """
+        values = np.asarray(values, dtype=float)
+        unique, inverse = np.unique(values, return_inverse=True)
+        results = np.fromiter((math.lgamma(value) for value in unique), dtype=float, count=len(unique))
+        return results[inverse].reshape(values.shape)
+
+    def _erfc_vec(self, values: np.ndarray) -> np.ndarray:
+        """
+        Complementary error function of each value, as a float array.
+        scipy.special.erfc when scipy is installed, otherwise the Chebyshev approximation of Numerical Recipes
+        (erfcc, fractional error below 1.2e-7), computed on the whole array at once.
+        """
+        values = np.asarray(values, dtype=float)
+        try:
+            from scipy.special import erfc
+            return erfc(values)
+        except ImportError:
+            pass  ## scipy is not a dependency
+        z = np.abs(values)
+        t = 1.0 / (1.0 + 0.5 * z)
+        coefficients = [0.17087277, -0.82215223, 1.48851587, -1.13520398, 0.27886807,
+                        -0.18628806, 0.09678418, 0.37409196, 1.00002368, -1.26551223]
+        polynomial = np.zeros_like(t)
+        for coefficient in coefficients:
+            polynomial = polynomial * t + coefficient
+        result = t * np.exp(-z * z + polynomial)
+        return np.where(values >= 0, result, 2.0 - result)
+
+    def _betai_vec(self, a: np.ndarray, b: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """
+        Vectorized regularized incomplete beta function I_x(a, b).
+        Same precision as _betai (the continued fraction stops at a relative change of 3e-7, not the precision of
+        scipy.special.betainc), so the p-values are the ones of the row by row computation.
+        """
+        a, b, x = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float), np.asarray(x, dtype=float))
+        result = np.where(x <= 0.0, 0.0, 1.0)
+        inside = (x > 0.0) & (x < 1.0)
+        if not inside.any():
+            return result
+        a, b, x = a[inside], b[inside], x[inside]
+        lbeta = self._lgamma_vec(a) + self._lgamma_vec(b) - self._lgamma_vec(a + b)
+        front = np.exp(a * np.log(x) + b * np.log(1.0 - x) - lbeta)
+        direct = x < (a + 1.0) / (a + b + 2.0)
+        values = np.empty_like(x)
+        if direct.any():
+            values[direct] = front[direct] / a[direct] * self._betacf_vec(a[direct], b[direct], x[direct])
+        if (~direct).any():
+            values[~direct] = 1.0 - front[~direct] / b[~direct] * self._betacf_vec(b[~direct], a[~direct], 1.0 - x[~direct])
+        result[inside] = values
+        return result
+
+    def _t_pvalue_vec(self, t: np.ndarray, df: np.ndarray, evaluation: str) -> np.ndarray:
+        """Vectorized p-value of Welch's t-statistic."""
+        t = np.asarray(t, dtype=float)
+        df = np.asarray(df, dtype=float)
+        two_tail = self._betai_vec(df / 2.0, 0.5, df / (df + t * t))
+        if evaluation == '2sides':
+            return two_tail
+        elif evaluation == 'rightOneSided':
+            return np.where(t <= 0, two_tail / 2.0, 1.0 - two_tail / 2.0)
+        elif evaluation == 'leftOneSided':
+            return np.where(t >= 0, two_tail / 2.0, 1.0 - two_tail / 2.0)
+        else:
+            raise ValueError("evaluation must be '2sides', 'leftOneSided', or 'rightOneSided'")
+
     def _compute_confidence(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Append confidence and significance columns for each conversion metric.
         Uses self.baseMetric as the exposure count and self.conversionMetrics as conversion counts.
+        The p-values are computed on whole columns at once.
         """
         if len(self.metrics) < 2 or self._experience_col is None:
             return df
+        if self.evaluation not in ('2sides', 'leftOneSided', 'rightOneSided'):
+            raise ValueError("evaluation must be '2sides', 'leftOneSided', or 'rightOneSided'")
 
         control_mask = df[self._experience_col] == self.controlGroup
         if not control_mask.any():
             return df
 
         control_idx = df.index[control_mask][0]
+        is_control = np.asarray(df.index == control_idx)
         n_control = float(df.loc[control_idx, self.baseMetric])
+        n_variant = df[self.baseMetric].to_numpy(dtype=float)
 
         for metric in self.conversionMetrics:
             x_control = float(df.loc[control_idx, metric])
-            confidences = []
-            for idx, row in df.iterrows():
-                if idx == control_idx:
-                    confidences.append(float('nan'))
-                    continue
-                n_variant = float(row[self.baseMetric])
-                x_variant = float(row[metric])
+            x_variant = df[metric].to_numpy(dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
                 total = n_control + n_variant
-                if total == 0 or n_control == 0 or n_variant == 0:
-                    confidences.append(float('nan'))
-                    continue
                 p_pool = (x_control + x_variant) / total
-                if p_pool == 0 or p_pool == 1:
-                    confidences.append(float('nan'))
-                    continue
+                valid = ~is_control & (total != 0) & (n_control != 0) & (n_variant != 0) \
+                    & (p_pool != 0) & (p_pool != 1)
+                p_value = np.full(len(df), np.nan)
                 if self.method == 't-test':
                     p_control = x_control / n_control
                     p_variant = x_variant / n_variant
                     v1 = p_control * (1 - p_control) / n_control
                     v2 = p_variant * (1 - p_variant) / n_variant
-                    se = math.sqrt(v1 + v2)
-                    if se == 0:
-                        confidences.append(float('nan'))
-                        continue
+                    se = np.sqrt(v1 + v2)
+                    valid &= se != 0
                     t_stat = (p_variant - p_control) / se
                     df_welch = (v1 + v2) ** 2 / (
-                        v1 ** 2 / max(n_control - 1, 1) + v2 ** 2 / max(n_variant - 1, 1)
+                        v1 ** 2 / max(n_control - 1, 1) + v2 ** 2 / np.maximum(n_variant - 1, 1)
                     )
-                    p_value = self._t_pvalue(t_stat, df_welch, self.evaluation)
+                    if valid.any():
+                        p_value[valid] = self._t_pvalue_vec(t_stat[valid], df_welch[valid], self.evaluation)
                 else:  # z-test (default)
-                    se = math.sqrt(p_pool * (1 - p_pool) * (1 / n_control + 1 / n_variant))
-                    if se == 0:
-                        confidences.append(float('nan'))
-                        continue
+                    se = np.sqrt(p_pool * (1 - p_pool) * (1 / n_control + 1 / n_variant))
+                    valid &= se != 0
                     z = (x_variant / n_variant - x_control / n_control) / se
-                    if self.evaluation == '2sides':
-                        p_value = math.erfc(abs(z) / math.sqrt(2))
-                    elif self.evaluation == 'rightOneSided':
-                        p_value = 0.5 * math.erfc(z / math.sqrt(2))
-                    elif self.evaluation == 'leftOneSided':
-                        p_value = 0.5 * math.erfc(-z / math.sqrt(2))
-                    else:
-                        raise ValueError(
-                            "evaluation must be '2sides', 'leftOneSided', or 'rightOneSided'"
-                        )
-                confidences.append(round(1 - p_value, 4))
-            df[f'{metric}_confidence'] = confidences
+                    if valid.any():
+                        if self.evaluation == '2sides':
+                            p_value[valid] = self._erfc_vec(np.abs(z[valid]) / math.sqrt(2))
+                        elif self.evaluation == 'rightOneSided':
+                            p_value[valid] = 0.5 * self._erfc_vec(z[valid] / math.sqrt(2))
+                        else:
+                            p_value[valid] = 0.5 * self._erfc_vec(-z[valid] / math.sqrt(2))
+            df[f'{metric}_confidence'] = np.where(valid, np.round(1 - p_value, 4), np.nan)
             df[f'{metric}_is_significant'] = df[f'{metric}_confidence'] >= self.confidenceLevel
 
         return df
-    
+
     def __single_breakdown__(
         self,
         index: Union[int, str] = None,
         dimension: str = None,
         n_results: Union[int, str] = 10,
         focusMetricId: str = None,
+        rateController: RateController = None,
     ) -> object:
         """
         Breakdown a specific index or value of the dataframe, by another dimension.
@@ -523,6 +839,7 @@ class TargetWorkspace(Workspace):
             dimension : REQUIRED : dimension to report.
             n_results : OPTIONAL : number of results you want to have on your breakdown. Default 10, can use "inf"
             focusMetricId : OPTIONAL : If you want to focus on a specific metric for the breakdown, provide its column name here. Default None, which means all metrics will be included in the breakdown request.
+            rateController : OPTIONAL : RateController instance shared between concurrent breakdowns.
         """
         n_results = float(n_results) ## transforming n_result in float
         if index is None or dimension is None:
@@ -546,7 +863,7 @@ class TargetWorkspace(Workspace):
             new_request.addMetricFilter(metricId=metric, filterId=breakdown)
         new_request.setLimit(n_results)
         report = self.analyticsObject.getReport2(
-            new_request, n_results=n_results
+            new_request, n_results=n_results, rateController=rateController
         )
         return report
 
@@ -555,48 +872,75 @@ class TargetWorkspace(Workspace):
         dimension: str = None,
         n_results: Union[int, str] = 10,
         focusMetric : str | None = None,
+        max_concurrency: int = 5,
     ) -> pd.DataFrame:
         """
         Breakdown every experience row by the given dimension and return a single combined DataFrame.
-        For each experience, one API call is made and the resulting metric columns are suffixed with
+        For each experience, one API call is made (concurrently) and the resulting metric columns are suffixed with
         the experience name: '{metric} ({experience})'.
-        All per-experience DataFrames are then merged on the dimension key columns (itemId + dimension).
+        All per-experience DataFrames are then combined on the dimension key columns (itemId + dimension).
         self.apiCalls is incremented by the number of rows processed.
         Arguments:
             dimension : REQUIRED : Dimension to break down each experience by.
             n_results : OPTIONAL : Number of results per breakdown request. Default 10, can use "inf".
             focusMetric : OPTIONAL : Metric to focus on for the breakdown. Default None. If provided, the request will only contain that single metric.
-        Returns a merged DataFrame with the breakdown dimension and one set of metric columns per experience.
+                The metric name is resolved with the catalog of the Analytics instance (kept in memory between calls).
+            max_concurrency : OPTIONAL : number of experiences requested at the same time (default 5)
+        Returns a combined DataFrame with the breakdown dimension and one set of metric columns per experience.
         """
         if dimension is None:
             raise ValueError("Require a dimension for the breakdown")
-        combined = None
         focusMetricId = None
         if focusMetric is not None:
             if focusMetric.startswith("metrics/") == False and focusMetric.startswith("cm") == False:
-                metricsList:list = self.analyticsObject.getMetrics(rsid=self.dataRequest.rsid,format="raw")
-                cmList:list = self.analyticsObject.getCalculatedMetrics(format="raw")
-                self.apiCalls += 2
-                completeList= metricsList + cmList
-                matched = [m for m in completeList if m["name"] == focusMetric]
-                if not matched:
+                catalog = self.analyticsObject.catalog
+                calls = catalog.threadCalls()
+                focusMetricId = catalog.metricIdFromName(focusMetric, rsid=self.dataRequest.rsid)
+                self.apiCalls += catalog.threadCalls() - calls
+                if focusMetricId is None:
                     raise ValueError(f"focusMetric '{focusMetric}' not found in the report suite metrics or calculated metrics")
-                focusMetricId= matched[0]['id']
             else:
                 focusMetricId = focusMetric
-        for exp in self.dataframe['Target Experience'].to_list():
-            sub_report = self.__single_breakdown__(index=exp, dimension=dimension, n_results=n_results, focusMetricId=focusMetricId)
-            self.apiCalls += 1
-            sub_df = sub_report.dataframe.copy()
+        experiences = self.dataframe['Target Experience'].to_list()
+        rateController = RateController(maxRequestsPerSecond=2, burst=12, maxConcurrency=max_concurrency)
+        with futures.ThreadPoolExecutor(max(1, min(max_concurrency, len(experiences) or 1))) as executor:
+            sub_reports = list(executor.map(
+                lambda exp: self.__single_breakdown__(index=exp, dimension=dimension, n_results=n_results,
+                                                      focusMetricId=focusMetricId, rateController=rateController),
+                experiences))
+        self.apiCalls += len(experiences)
+        return self._combineBreakdowns(experiences, [sub_report.dataframe for sub_report in sub_reports])
+
+    @staticmethod
+    def _combineBreakdowns(experiences: list = None, dataframes: list = None) -> pd.DataFrame:
+        """
+        Combine the breakdown dataframes of the experiences on their keys (itemId + dimension), with an outer join.
+        The metric columns are suffixed with the experience name and, when there are several experiences,
+        the rows are sorted on the keys, as successive outer merges do. When a dataframe has duplicated keys, the successive merges are used
+        (the concatenation on the keys requires unique keys).
+        Arguments:
+            experiences : REQUIRED : list of the experience names
+            dataframes : REQUIRED : list of the breakdown dataframes, in the order of the experiences
+        """
+        sub_dfs = []
+        for exp, sub_df in zip(experiences, dataframes):
             # Second column is the breakdown dimension; first is itemId
             dim_col = list(sub_df.columns)[1]
             key_cols = ["itemId", dim_col]
             metric_cols = [c for c in sub_df.columns if c not in key_cols]
-            sub_df = sub_df.rename(columns={col: f"{col.split(':::')[0]} ({exp})" for col in metric_cols})
-            if combined is None:
-                combined = sub_df
-            else:
-                combined = combined.merge(sub_df, on=key_cols, how="outer")
+            sub_dfs.append(sub_df.rename(columns={col: f"{col.split(':::')[0]} ({exp})" for col in metric_cols}))
+        if len(sub_dfs) == 0:
+            return pd.DataFrame()
+        if len(sub_dfs) == 1:  ## nothing to join, the order of the report is kept
+            combined = sub_dfs[0]
+        elif any(sub_df.duplicated(subset=["itemId", sub_df.columns[1]]).any() for sub_df in sub_dfs):
+            combined = sub_dfs[0]
+            for sub_df in sub_dfs[1:]:
+                combined = combined.merge(sub_df, on=["itemId", sub_df.columns[1]], how="outer")
+        else:
+            ## one outer join on the keys, sorted like successive outer merges
+            combined = pd.concat([sub_df.set_index(["itemId", sub_df.columns[1]]) for sub_df in sub_dfs],
+                                 axis=1, join="outer", sort=True).reset_index()
         combined = combined.drop(columns=["itemId"])
         return combined
 
@@ -703,16 +1047,14 @@ class TargetWorkspace(Workspace):
         owner = self.analyticsObject.getUserMe()
         existing_segmentIds = [el['segmentId'] for el in self.globalFilters if el['type'] == 'segment']
         # Resolve display names for standard metrics (e.g. 'metrics/visits' → 'Visits')
-        _std_metrics_cache = None
+        catalog = self.analyticsObject.catalog
         resolved_metric_names = []
         for mid, mname in zip(metric_ids, self.metrics):
             if mid.startswith("metrics/") and mid == mname:
-                # Name was never resolved — fetch the metric list once
-                if _std_metrics_cache is None:
-                    _std_metrics_cache = self.analyticsObject.getMetrics(rsid=rsid, format="raw")
-                    self.apiCalls += 1
-                matched = next((m for m in _std_metrics_cache if m["id"] == mid), None)
-                resolved_metric_names.append(matched["name"] if matched else mname)
+                # Name was never resolved — the metric list is kept by the catalog
+                calls = catalog.threadCalls()
+                resolved_metric_names.append(catalog.metricName(mid, rsid))
+                self.apiCalls += catalog.threadCalls() - calls
             else:
                 resolved_metric_names.append(mname)
         # Pair original metric IDs with their display names
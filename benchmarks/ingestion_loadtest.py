@@ -0,0 +1,422 @@
+"""
+Offline load-test harness for the ingestion module (DIAPI & Bulkapi).
+
+It starts a local HTTP stand-in for the Adobe collection servers, answering on:
+    * /b/ss/...                         (Data Insertion API, GET & POST)
+    * /aa/collect/v1/events             (Bulk Data Insertion API)
+    * /aa/collect/v1/events/validate    (Bulk Data Insertion API validation)
+The stand-in can add latency, return random 5XX errors and inject 429 (throttling) responses.
+The ingestion classes are then driven with synthetic hits and, per configuration, the harness reports:
+hits/s, MB/s, p50/p99 latency of the calls and the memory high-water mark.
+
+Nothing is sent to Adobe: the Bulkapi instance is created with a placeholder configuration and a non expired token.
+
+Usage:
+    python benchmarks/ingestion_loadtest.py
+    python benchmarks/ingestion_loadtest.py --hits 20000 --latency 0 0.02 --error-rate 0 0.01 --throttle-rate 0 0.05
+    python benchmarks/ingestion_loadtest.py --scenarios bulk_send --rows-per-file 5000 --save results.csv
+"""
+import argparse
+import csv
+import gzip
+import io
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent import futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pandas as pd
+
+## running the harness against the local version of the aanalytics2 module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aanalytics2 import config, ingestion
+
+SCENARIOS = ["diapi_get", "diapi_post", "bulk_send", "bulk_validation"]
+
+
+class CollectionServerSettings:
+    """
+    Behavior of the local collection server.
+    Arguments:
+        latency : OPTIONAL : seconds to wait before answering each request (default 0)
+        errorRate : OPTIONAL : share of requests answered with a 503 error, between 0 and 1 (default 0)
+        throttleRate : OPTIONAL : share of requests answered with a 429 error, between 0 and 1 (default 0)
+        retryAfter : OPTIONAL : value of the Retry-After header sent with the 429 responses (default 0)
+        seed : OPTIONAL : seed of the random generator used for error injection
+    """
+
+    def __init__(self, latency: float = 0, errorRate: float = 0, throttleRate: float = 0, retryAfter: int = 0,
+                 seed: int = None) -> None:
+        self.latency = latency
+        self.errorRate = errorRate
+        self.throttleRate = throttleRate
+        self.retryAfter = retryAfter
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def draw(self) -> int:
+        """
+        Return the status code to answer with for the next request.
+        """
+        with self.lock:
+            value = self.random.random()
+        if value < self.throttleRate:
+            return 429
+        if value < self.throttleRate + self.errorRate:
+            return 503
+        return 200
+
+
+class _CollectionHandler(BaseHTTPRequestHandler):
+    """
+    Request handler mimicking the Adobe collection endpoints.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # silence the default stderr logging
+        pass
+
+    def _readBody(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        return self.rfile.read(length) if length > 0 else b""
+
+    def _answer(self, status: int, body: bytes, contentType: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", str(self.server.settings.retryAfter))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, body: bytes) -> None:
+        settings: CollectionServerSettings = self.server.settings
+        self.server.record(len(self.requestline) + len(body))
+        if settings.latency > 0:
+            time.sleep(settings.latency)
+        status = settings.draw()
+        path = self.path.split("?")[0]
+        if status == 429:
+            return self._answer(429, json.dumps({"error_code": "429050", "message": "Too many requests"}).encode())
+        if status != 200:
+            return self._answer(status, json.dumps({"error_code": str(status), "message": "Service unavailable"}).encode())
+        if path.startswith("/b/ss/"):
+            return self._answer(200, b"<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n<status>SUCCESS</status>",
+                                contentType="text/xml")
+        if path == "/aa/collect/v1/events/validate":
+            return self._answer(200, json.dumps({"success": "File is valid"}).encode())
+        if path == "/aa/collect/v1/events":
+            data = {
+                "file_id": f"loadtest-{self.server.requests}",
+                "visitor_group_id": self.headers.get("x-adobe-vgid", ""),
+                "size": len(body),
+                "received_date": int(time.time()),
+                "rows": None,
+                "invalid_rows": 0,
+                "status": "File received, not yet processed.",
+                "status_code": "UPLOADED",
+            }
+            return self._answer(200, json.dumps(data).encode())
+        return self._answer(404, json.dumps({"error_code": "404", "message": f"unknown path {path}"}).encode())
+
+    def do_GET(self):
+        self._handle(b"")
+
+    def do_POST(self):
+        self._handle(self._readBody())
+
+
+class LocalCollectionServer:
+    """
+    Local HTTP stand-in for the collection servers, running in a background thread.
+    Use it as a context manager:
+        with LocalCollectionServer(CollectionServerSettings(latency=0.01)) as server:
+            server.url  # http://127.0.0.1:<port>
+    """
+
+    def __init__(self, settings: CollectionServerSettings = None) -> None:
+        self.settings = settings or CollectionServerSettings()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _CollectionHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.settings = self.settings
+        self.httpd.requests = 0
+        self.httpd.bytesReceived = 0
+        self._lock = threading.Lock()
+
+        def record(size: int) -> None:
+            with self._lock:
+                self.httpd.requests += 1
+                self.httpd.bytesReceived += size
+
+        self.httpd.record = record
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def host(self) -> str:
+        return f"127.0.0.1:{self.httpd.server_address[1]}"
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}"
+
+    @property
+    def bytesReceived(self) -> int:
+        return self.httpd.bytesReceived
+
+    def __enter__(self) -> "LocalCollectionServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def generateHits(n_hits: int = 1000, n_visitors: int = 100, rsid: str = "loadtest.rsid", seed: int = 0):
+    """
+    Generator of synthetic hits, as dictionaries using the Bulk API column names.
+    Arguments:
+        n_hits : OPTIONAL : number of hits to generate (default 1000)
+        n_visitors : OPTIONAL : number of distinct visitors (default 100)
+        rsid : OPTIONAL : report suite ID set on the hits
+        seed : OPTIONAL : seed of the random generator
+    """
+    rand = random.Random(seed)
+    start = int(time.time()) - 86400
+    for i in range(n_hits):
+        page = rand.randint(1, 500)
+        yield {
+            "timestamp": start + i,
+            "marketingCloudVisitorID": f"{rand.randint(0, n_visitors):038d}",
+            "events": rand.choice(["", "event1", "event2", "event1,event3"]),
+            "pageName": f"loadtest:page{page}",
+            "pageURL": f"https://www.example.com/page{page}.html",
+            "reportSuiteID": rsid,
+            "userAgent": "Mozilla/5.0 (X11; Linux x86_64) aanalytics2-loadtest",
+            "eVar1": f"campaign{rand.randint(1, 50)}",
+            "prop1": f"section{rand.randint(1, 20)}",
+        }
+
+
+def writeBulkFiles(hits, folder: str, rowsPerFile: int = 1000) -> list:
+    """
+    Write the hits into gzipped CSV files ready for the Bulk API. Returns the list of file paths.
+    Arguments:
+        hits : REQUIRED : iterable of hits, as returned by generateHits
+        folder : REQUIRED : folder where to write the files
+        rowsPerFile : OPTIONAL : number of hits per file (default 1000)
+    """
+    files = []
+    hits = iter(hits)
+    for index in itertools.count():
+        batch = list(itertools.islice(hits, rowsPerFile))
+        if len(batch) == 0:
+            break
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(batch[0].keys()))
+        writer.writeheader()
+        writer.writerows(batch)
+        path = Path(folder) / f"loadtest_{index}.csv.gz"
+        with gzip.open(path, "wb") as f:
+            f.write(buffer.getvalue().encode("utf-8"))
+        files.append(str(path))
+    return files
+
+
+def _placeholderConfig() -> dict:
+    """
+    Configuration with a non expired placeholder token, so the Bulkapi connector does not request a token.
+    """
+    placeholder = dict(config.config_object)
+    placeholder.update({
+        "org_id": "loadtest@AdobeOrg",
+        "client_id": "loadtest",
+        "secret": "loadtest",
+        "token": "loadtest",
+        "date_limit": time.time() + 86400,
+    })
+    return placeholder
+
+
+def _percentile(values: list, percent: float) -> float:
+    if len(values) == 0:
+        return float("nan")
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(percent / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+def _isSuccess(res) -> bool:
+    """
+    Return True when the result of an ingestion call is a success.
+    Lists (sendFiles) succeed when all their elements succeed, dictionaries when their status_code is below 400
+    and they have no error, responses when their status is below 400 and their JSON body (if any) has no error.
+    A validation answered with 200 but reporting an error is a failure.
+    """
+    if isinstance(res, list):  # sendFiles returns a list of JSON responses
+        return all(_isSuccess(elem) for elem in res)
+    if isinstance(res, dict):
+        status = res.get("status_code")  # numeric for the connector answers, "UPLOADED" for the Bulk API ones
+        if isinstance(status, int) and status >= 400:
+            return False
+        return res.get("error") is None and res.get("error_code") is None
+    if res is None or getattr(res, "status_code", 500) >= 400:
+        return False
+    try:
+        body = res.json()
+    except ValueError:  # no JSON body (DIAPI answers)
+        return True
+    return not isinstance(body, dict) or _isSuccess(body)
+
+
+def _timedCall(func, *args, **kwargs):
+    """
+    Run the function and return (elapsed seconds, success).
+    """
+    start = time.perf_counter()
+    try:
+        res = func(*args, **kwargs)
+    except Exception:
+        return time.perf_counter() - start, False
+    return time.perf_counter() - start, _isSuccess(res)
+
+
+def runScenario(scenario: str, server: LocalCollectionServer, n_hits: int = 1000, rowsPerFile: int = 1000,
+                workers: int = 4, tmpFolder: str = None) -> dict:
+    """
+    Drive one ingestion scenario against the local server and return the measured statistics.
+    Arguments:
+        scenario : REQUIRED : one of "diapi_get", "diapi_post", "bulk_send", "bulk_validation"
+        server : REQUIRED : running LocalCollectionServer instance
+        n_hits : OPTIONAL : number of hits to send (default 1000)
+        rowsPerFile : OPTIONAL : number of hits per Bulk API file (default 1000)
+        workers : OPTIONAL : number of threads sending data in parallel (default 4)
+        tmpFolder : OPTIONAL : folder where the Bulk API files are written
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError(f"scenario should be one of {SCENARIOS}")
+    latencies = []
+    nb_errors = 0
+    if scenario in ("diapi_get", "diapi_post"):
+        diapi = ingestion.DIAPI(rsid="loadtest.rsid", tracking_server=server.host, protocol="http")
+        if scenario == "diapi_get":
+            def send(hit):
+                return _timedCall(diapi.getMethod, pageName=hit["pageName"], g=hit["pageURL"], events=hit["events"],
+                                  mid=hit["marketingCloudVisitorID"], v1=hit["eVar1"], c1=hit["prop1"])
+        else:
+            def send(hit):
+                return _timedCall(diapi.postMethod, pageName=hit["pageName"], pageURL=hit["pageURL"],
+                                  events=hit["events"], marketingCloudVisitorID=hit["marketingCloudVisitorID"],
+                                  eVar1=hit["eVar1"], prop1=hit["prop1"])
+        start_bytes = server.bytesReceived
+        start = time.perf_counter()
+        with futures.ThreadPoolExecutor(max(1, workers)) as executor:
+            for elapsed, success in executor.map(send, generateHits(n_hits)):
+                latencies.append(elapsed)
+                nb_errors += 0 if success else 1
+        wall = time.perf_counter() - start
+    else:
+        bulk = ingestion.Bulkapi(endpoint=server.url, config_object=_placeholderConfig())
+        files = writeBulkFiles(generateHits(n_hits), tmpFolder, rowsPerFile=rowsPerFile)
+        start_bytes = server.bytesReceived
+        start = time.perf_counter()
+        if scenario == "bulk_send":
+            ## one file per call so that each call latency can be measured, calls sent in parallel
+            with futures.ThreadPoolExecutor(max(1, workers)) as executor:
+                results = executor.map(lambda file: _timedCall(bulk.sendFiles, file, workers=1), files)
+                for elapsed, success in results:
+                    latencies.append(elapsed)
+                    nb_errors += 0 if success else 1
+        else:
+            for file in files:
+                elapsed, success = _timedCall(bulk.validation, file)
+                latencies.append(elapsed)
+                nb_errors += 0 if success else 1
+        wall = time.perf_counter() - start
+        for file in files:
+            Path(file).unlink()
+    sent_bytes = server.bytesReceived - start_bytes
+    return {
+        "scenario": scenario,
+        "hits": n_hits,
+        "calls": len(latencies),
+        "errors": nb_errors,
+        "wall_s": round(wall, 3),
+        "hits_per_s": round(n_hits / wall, 1) if wall > 0 else float("nan"),
+        "MB_per_s": round(sent_bytes / 1024 / 1024 / wall, 3) if wall > 0 else float("nan"),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def runLoadTest(scenarios: list = None, n_hits: int = 1000, latencies: list = None, errorRates: list = None,
+                throttleRates: list = None, rowsPerFile: int = 1000, workers: int = 4, seed: int = 0) -> pd.DataFrame:
+    """
+    Run every scenario for every combination of server settings. Returns a dataframe with one row per run.
+    Arguments:
+        scenarios : OPTIONAL : list of scenarios to run (default all of them)
+        n_hits : OPTIONAL : number of hits sent per run (default 1000)
+        latencies : OPTIONAL : list of server latencies in seconds (default [0])
+        errorRates : OPTIONAL : list of 5XX error rates (default [0])
+        throttleRates : OPTIONAL : list of 429 rates (default [0])
+        rowsPerFile : OPTIONAL : number of hits per Bulk API file (default 1000)
+        workers : OPTIONAL : number of threads sending data in parallel (default 4)
+        seed : OPTIONAL : seed used for the error injection
+    """
+    scenarios = scenarios or SCENARIOS
+    results = []
+    with tempfile.TemporaryDirectory() as tmpFolder:
+        for latency, errorRate, throttleRate in itertools.product(latencies or [0], errorRates or [0],
+                                                                  throttleRates or [0]):
+            settings = CollectionServerSettings(latency=latency, errorRate=errorRate, throttleRate=throttleRate,
+                                                seed=seed)
+            with LocalCollectionServer(settings) as server:
+                for scenario in scenarios:
+                    tracemalloc.start()
+                    stats = runScenario(scenario, server, n_hits=n_hits, rowsPerFile=rowsPerFile, workers=workers,
+                                        tmpFolder=tmpFolder)
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    stats.update({
+                        "latency_s": latency,
+                        "error_rate": errorRate,
+                        "throttle_rate": throttleRate,
+                        "peak_memory_MB": round(peak / 1024 / 1024, 2),
+                    })
+                    results.append(stats)
+    columns = ["scenario", "latency_s", "error_rate", "throttle_rate", "hits", "calls", "errors", "wall_s",
+               "hits_per_s", "MB_per_s", "p50_ms", "p99_ms", "peak_memory_MB"]
+    return pd.DataFrame(results)[columns]
+
+
+def main(argv: list = None) -> pd.DataFrame:
+    parser = argparse.ArgumentParser(description="Offline load test of the DIAPI and Bulkapi classes.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--hits", type=int, default=2000, help="number of hits sent per run")
+    parser.add_argument("--latency", type=float, nargs="+", default=[0.0], help="server latencies in seconds")
+    parser.add_argument("--error-rate", type=float, nargs="+", default=[0.0], help="share of 503 responses")
+    parser.add_argument("--throttle-rate", type=float, nargs="+", default=[0.0], help="share of 429 responses")
+    parser.add_argument("--rows-per-file", type=int, default=500, help="hits per Bulk API file")
+    parser.add_argument("--workers", type=int, default=4, help="threads sending data in parallel")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", type=str, default=None, help="CSV file to save the results in")
+    args = parser.parse_args(argv)
+    df = runLoadTest(scenarios=args.scenarios, n_hits=args.hits, latencies=args.latency,
+                     errorRates=args.error_rate, throttleRates=args.throttle_rate,
+                     rowsPerFile=args.rows_per_file, workers=args.workers, seed=args.seed)
+    print(df.to_string(index=False))
+    if args.save:
+        df.to_csv(args.save, index=False)
+    return df
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark of the accumulation of the report pages, with and without copying the rows.
+
+It builds synthetic report pages and compares, for the getReport (_readData) and getReport2 (_prepareData) paths:
+    * copy : previous behavior, each page deep copied when it is added to the list, the list copied again when it is read
+    * move : current behavior, the rows of each page moved to the list and read without being copied
+The time and the memory high-water mark (tracemalloc) of each path are reported, and both results are checked to be equal.
+
+Nothing is sent to Adobe: the Analytics instance is created with a placeholder configuration and a non expired token.
+
+Usage:
+    python benchmarks/report_accumulation.py
+    python benchmarks/report_accumulation.py --pages 10 --rows 20000 --metrics 5 --anomaly
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from copy import deepcopy
+
+import pandas as pd
+
+## running the benchmark against the local version of the aanalytics2 module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import aanalytics2
+from aanalytics2 import config
+
+
+def offlineAnalytics() -> aanalytics2.Analytics:
+    """
+    Return an Analytics instance that is never connected (placeholder configuration).
+    """
+    configObject = dict(config.config_object)
+    configObject.update(org_id="benchmark", client_id="benchmark", secret="benchmark", token="benchmark",
+                        date_limit=time.time() + 3600)
+    return aanalytics2.Analytics(company_id="benchmark", config_object=configObject, header=dict(config.header))
+
+
+def syntheticPages(nbPages: int = 5, nbRows: int = 20000, nbMetrics: int = 5, anomaly: bool = False,
+                   seed: int = 0) -> list:
+    """
+    Return the rows of nbPages pages of nbRows rows, as returned by the API.
+    """
+    rand = random.Random(seed)
+    pages = []
+    for page in range(nbPages):
+        rows = []
+        for index in range(page * nbRows, (page + 1) * nbRows):
+            data = [float(rand.randint(0, 100000)) for _ in range(nbMetrics)]
+            row = {"itemId": str(1000000000 + index), "value": f"page name {index}", "data": data}
+            if anomaly:
+                row["dataExpected"] = [value * 0.9 for value in data]
+                row["dataUpperBound"] = [value * 1.2 for value in data]
+                row["dataLowerBound"] = [value * 0.6 for value in data]
+            rows.append(row)
+        pages.append(rows)
+    return pages
+
+
+def measure(function, *args) -> tuple:
+    """
+    Return the result, the time (seconds) and the memory high-water mark (MB) of the function.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main(argv: list = None) -> pd.DataFrame:
+    parser = argparse.ArgumentParser(description="Benchmark of the accumulation of the report pages.")
+    parser.add_argument("--pages", type=int, default=5, help="number of pages")
+    parser.add_argument("--rows", type=int, default=20000, help="number of rows per page")
+    parser.add_argument("--metrics", type=int, default=5, help="number of metrics per row")
+    parser.add_argument("--anomaly", action="store_true", help="add the anomaly detection fields to the rows")
+    parser.add_argument("--save", help="CSV file where the results are written")
+    args = parser.parse_args(argv)
+    analytics = offlineAnalytics()
+    columns = ["variables/page"] + [f"metrics/metric{index}" for index in range(args.metrics)]
+
+    def getReportCopy(pages: list) -> pd.DataFrame:
+        dataList = []
+        for rows in pages:
+            dataList += deepcopy(rows)
+        return analytics._readData(deepcopy(dataList), anomaly=args.anomaly, cols=list(columns))
+
+    def getReportMove(pages: list) -> pd.DataFrame:
+        dataList = []
+        for rows in pages:
+            dataList += rows
+        return analytics._readData(dataList, anomaly=args.anomaly, cols=list(columns))
+
+    def getReport2Copy(pages: list) -> dict:
+        dataRows = []
+        for rows in pages:
+            dataRows += rows
+        return analytics._prepareData(deepcopy(dataRows), reportType="normal")
+
+    def getReport2Move(pages: list) -> dict:
+        dataRows = []
+        for rows in pages:
+            dataRows += rows
+        return analytics._prepareData(dataRows, reportType="normal")
+
+    results = []
+    for path, copyFunction, moveFunction in [("getReport", getReportCopy, getReportMove),
+                                             ("getReport2", getReport2Copy, getReport2Move)]:
+        pages = syntheticPages(args.pages, args.rows, args.metrics, anomaly=args.anomaly)
+        copyResult, copySeconds, copyPeak = measure(copyFunction, pages)
+        moveResult, moveSeconds, movePeak = measure(moveFunction, pages)
+        if isinstance(copyResult, pd.DataFrame):
+            pd.testing.assert_frame_equal(copyResult, moveResult)
+        elif copyResult != moveResult:
+            raise AssertionError(f"{path}: the results are different")
+        for mode, seconds, peak in [("copy", copySeconds, copyPeak), ("move", moveSeconds, movePeak)]:
+            results.append({"path": path, "mode": mode, "rows": args.pages * args.rows, "metrics": args.metrics,
+                            "seconds": round(seconds, 3), "peakMB": round(peak, 1)})
+    df = pd.DataFrame(results)
+    print(df.to_string(index=False))
+    if args.save:
+        df.to_csv(args.save, index=False)
+    return df
+
+
+if __name__ == "__main__":
+    main()
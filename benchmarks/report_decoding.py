@@ -0,0 +1,131 @@
+"""
+Benchmark of the decoding of the /reports responses.
+
+It builds synthetic report pages (20 000 rows by default, with optional anomaly detection fields) and compares:
+    * current  : json module (as requests' Response.json), rows prepared by Analytics._prepareData, dataframe built from them
+    * columnar : pageDecoder.decodeReportPage (orjson or msgspec when installed), dataframe built from the column arrays
+and the time to parse the raw JSON with each decoder installed (json, orjson, msgspec).
+
+Usage:
+    python benchmarks/report_decoding.py
+    python benchmarks/report_decoding.py --rows 20000 50000 --metrics 5 20 --anomaly --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+## running the benchmark against the local version of the aanalytics2 module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aanalytics2 import pageDecoder
+from aanalytics2.aanalytics2 import Analytics
+
+
+def syntheticPage(nbRows: int = 20000, nbMetrics: int = 5, anomaly: bool = False, seed: int = 0) -> bytes:
+    """
+    Return the raw content of a /reports response with nbRows rows of nbMetrics metrics.
+    Arguments:
+        nbRows : OPTIONAL : number of rows (default 20000)
+        nbMetrics : OPTIONAL : number of metrics (default 5)
+        anomaly : OPTIONAL : add the dataExpected, dataUpperBound and dataLowerBound fields (default False)
+        seed : OPTIONAL : seed of the random generator
+    """
+    rand = random.Random(seed)
+    rows = []
+    for index in range(nbRows):
+        data = [float(rand.randint(0, 100000)) for _ in range(nbMetrics)]
+        row = {"itemId": str(1000000000 + index), "value": f"page name {index}", "data": data}
+        if anomaly:
+            row["dataExpected"] = [value * 0.9 for value in data]
+            row["dataUpperBound"] = [value * 1.2 for value in data]
+            row["dataLowerBound"] = [value * 0.6 for value in data]
+        rows.append(row)
+    page = {
+        "totalPages": 1, "firstPage": True, "lastPage": True, "numberOfElements": nbRows, "number": 0,
+        "totalElements": nbRows,
+        "columns": {"dimension": {"id": "variables/page", "type": "string"},
+                    "columnIds": [str(index) for index in range(nbMetrics)]},
+        "rows": rows,
+        "summaryData": {"filteredTotals": [0.0] * nbMetrics, "totals": [0.0] * nbMetrics},
+    }
+    return json.dumps(page).encode()
+
+
+def currentPath(content: bytes) -> pd.DataFrame:
+    res = json.loads(content)
+    preparedData = Analytics._prepareData(None, res["rows"], reportType="normal")
+    return pd.DataFrame(preparedData).T.reset_index()
+
+
+def columnarPath(content: bytes) -> pd.DataFrame:
+    columnar = pageDecoder.decodeReportPage(content)["columnar"]
+    df = pd.DataFrame({"itemId": columnar["itemId"], "value": columnar["value"]})
+    for index in range(columnar["data"].shape[1]):
+        df[index] = columnar["data"][:, index]
+    return df
+
+
+def decoders() -> dict:
+    """
+    Return the JSON decoders installed, by name.
+    """
+    result = {"json": json.loads}
+    try:
+        import orjson
+        result["orjson"] = orjson.loads
+    except ImportError:
+        pass
+    try:
+        import msgspec
+        result["msgspec"] = msgspec.json.Decoder().decode
+    except ImportError:
+        pass
+    return result
+
+
+def timeit(function, content: bytes, repeat: int = 3) -> float:
+    """
+    Return the best time, in seconds, of repeat executions.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: list = None) -> pd.DataFrame:
+    parser = argparse.ArgumentParser(description="Benchmark of the decoding of the report responses.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[20000], help="number of rows per page")
+    parser.add_argument("--metrics", type=int, nargs="+", default=[5], help="number of metrics per row")
+    parser.add_argument("--anomaly", action="store_true", help="add the anomaly detection fields to the rows")
+    parser.add_argument("--repeat", type=int, default=3, help="executions per measure, the best is kept")
+    parser.add_argument("--save", help="CSV file where the results are written")
+    args = parser.parse_args(argv)
+    print(f"JSON engine of pageDecoder: {pageDecoder.JSON_ENGINE}")
+    results = []
+    for nbRows in args.rows:
+        for nbMetrics in args.metrics:
+            content = syntheticPage(nbRows, nbMetrics, anomaly=args.anomaly)
+            measures = {f"parse_{name}": decoder for name, decoder in decoders().items()}
+            measures["current"] = currentPath
+            measures["columnar"] = columnarPath
+            for name, function in measures.items():
+                seconds = timeit(function, content, repeat=args.repeat)
+                results.append({"rows": nbRows, "metrics": nbMetrics, "sizeMB": round(len(content) / 1e6, 2),
+                                "measure": name, "ms": round(seconds * 1000, 1),
+                                "rowsPerSecond": int(nbRows / seconds)})
+    df = pd.DataFrame(results)
+    print(df.to_string(index=False))
+    if args.save:
+        df.to_csv(args.save, index=False)
+    return df
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import importlib.util
+import json
+import os
+import sys
+import inspect
+import time
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import pandas as pd
+import pytest
+import aanalytics2
+from aanalytics2 import config
+from aanalytics2.analyticsStore import AnalyticsStore, METADATA_TABLE
+from aanalytics2.reportStore import requestFingerprint
+from aanalytics2.requestCreator import RequestCreator
+
+ENGINES = ["sqlite", pytest.param("duckdb", marks=pytest.mark.skipif(
+    importlib.util.find_spec("duckdb") is None, reason="duckdb is not installed"))]
+
+
+class _PageReports:
+    ## stand-in for connector.postData: one page of nbRows rows, the values multiplied by factor
+    def __init__(self, nbRows: int = 3, factor: float = 1.0) -> None:
+        self.nbRows = nbRows
+        self.factor = factor
+
+    def postData(self, endpoint: str, params: dict = None, data: dict = None, **kwargs) -> dict:
+        nbMetrics = len(data["metricContainer"]["metrics"])
+        rows = [{"itemId": str(index), "value": f"page {index}",
+                 "data": [float(index * self.factor + metric) for metric in range(nbMetrics)]}
+                for index in range(self.nbRows)]
+        return {"totalPages": 1, "firstPage": True, "lastPage": True, "number": 0, "numberOfElements": len(rows),
+                "totalElements": len(rows),
+                "columns": {"dimension": {"id": data["dimension"]},
+                            "columnIds": [metric["columnId"] for metric in data["metricContainer"]["metrics"]]},
+                "rows": rows, "summaryData": {"filteredTotals": [0.0] * nbMetrics, "totals": [0.0] * nbMetrics}}
+
+
+def _segments(endpoint: str, params: dict = None, **kwargs) -> dict:
+    ## stand-in for connector.getData: names of the segments of the global filters
+    return {"content": [{"id": segmentId, "name": f"Segment {segmentId}"}
+                        for segmentId in (params or {}).get("segmentFilter", "").split(",") if segmentId],
+            "lastPage": True}
+
+
+def _offlineAnalytics(postData) -> aanalytics2.Analytics:
+    ## Analytics instance never connected (placeholder configuration), the reports answered by postData
+    configObject = dict(config.config_object)
+    configObject.update(org_id="test", client_id="test", secret="test", token="test", date_limit=time.time() + 3600)
+    analytics = aanalytics2.Analytics(company_id="test", config_object=configObject, header=dict(config.header))
+    analytics.connector.postData = postData
+    analytics.connector.getData = _segments
+    return analytics
+
+
+def _request(segment: str = None) -> RequestCreator:
+    request = RequestCreator()
+    request.setRSID("rsid")
+    request.setDimension("variables/page")
+    request.addMetric("metrics/visits")
+    request.addMetric("metrics/orders")
+    request.addGlobalFilter("2024-01-01T00:00:00.000/2024-02-01T00:00:00.000")
+    if segment is not None:
+        request.addGlobalFilter(segment)
+    return request
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_analyticsStore_save_load(tmp_path, engine):
+    reports = _PageReports()
+    analytics = _offlineAnalytics(reports.postData)
+    report = analytics.getReport2(_request("s300_1"), resolveColumns=False)
+    with AnalyticsStore(tmp_path / f"reports.{engine}", engine=engine) as store:
+        assert store.engine == engine
+        tableName = store.save(report)
+        fingerprint = requestFingerprint(report.dataRequest.to_dict())
+        assert tableName == f"report_{fingerprint[:16]}"
+        pd.testing.assert_frame_equal(store.load(tableName), report.dataframe, check_dtype=False)
+        metadata = store.reports()
+        assert len(metadata) == 1
+        assert metadata["rsid"].iloc[0] == "rsid" and metadata["dimension"].iloc[0] == "variables/page"
+        assert metadata["dateRange"].iloc[0] == "2024-01-01T00:00:00.000/2024-02-01T00:00:00.000"
+        assert json.loads(metadata["globalFilters"].iloc[0]) == [{"type": "segment", "segmentId": "s300_1"}]
+        assert json.loads(metadata["metrics"].iloc[0]) == ["metrics/visits", "metrics/orders"]
+        assert metadata["nbRows"].iloc[0] == 3
+        assert store.tableName(report.dataRequest) == tableName
+        assert store.tableName(_request().to_dict()) is None
+        df = store.query(f'SELECT * FROM "{tableName}" WHERE "metrics/visits" > ?', [0])
+        assert df["itemId"].tolist() == ["1", "2"]
+    ## the database is kept on disk
+    with AnalyticsStore(tmp_path / f"reports.{engine}", engine=engine) as store:
+        assert store.reports()["tableName"].tolist() == [tableName]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_analyticsStore_upsert_and_delete(engine):
+    reports = _PageReports()
+    analytics = _offlineAnalytics(reports.postData)
+    with AnalyticsStore(":memory:", engine=engine) as store:
+        tableName = store.save(analytics.getReport2(_request(), resolveColumns=False))
+        ## the same request saved again replaces the table and its metadata
+        reports.nbRows, reports.factor = 5, 10.0
+        assert store.save(analytics.getReport2(_request(), resolveColumns=False)) == tableName
+        assert len(store.reports()) == 1 and store.reports()["nbRows"].iloc[0] == 5
+        assert store.load(tableName)["metrics/visits"].tolist() == [0.0, 10.0, 20.0, 30.0, 40.0]
+        ## another request gets its own table, or the table name given
+        other = store.save(analytics.getReport2(_request("s300_2"), resolveColumns=False))
+        named = store.save(analytics.getReport2(_request("s300_3"), resolveColumns=False), tableName="my_report")
+        assert other != tableName and named == "my_report"
+        assert sorted(store.reports()["tableName"]) == sorted([tableName, other, "my_report"])
+        store.delete(tableName)
+        store.delete(tableName)
+        assert sorted(store.reports()["tableName"]) == sorted([other, "my_report"])
+        with pytest.raises(Exception):
+            store.load(tableName)
+        assert len(store.query(f"SELECT * FROM {METADATA_TABLE} WHERE tableName = ?", [tableName])) == 0
+        with pytest.raises(ValueError):
+            store.save()
+        with pytest.raises(ValueError):
+            store.load()
+
+
+def test_analyticsStore_engine():
+    with pytest.raises(ValueError):
+        AnalyticsStore(":memory:", engine="postgres")
+    with AnalyticsStore(":memory:") as store:
+        assert store.engine == ("duckdb" if importlib.util.find_spec("duckdb") is not None else "sqlite")
@@ -0,0 +1,160 @@
+import os
+import sys
+import inspect
+import time
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import pandas as pd
+import pytest
+import aanalytics2
+from aanalytics2 import config
+from aanalytics2.requestCreator import RequestCreator
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from aanalytics2.arrowExport import ArrowPageWriter, dataframeToArrow
+
+COLUMNS = ["itemId", "variables/page", "metrics/visits", "metrics/orders"]
+
+
+def _rows(start: int, end: int) -> list:
+    ## the dimension values repeat across the pages
+    return [{"itemId": str(index), "value": f"page {index % 3}", "data": [float(index), float(index * 10)]}
+            for index in range(start, end)]
+
+
+class _PagedReports:
+    ## stand-in for connector.postData: 7 rows, returned in pages of "limit" rows
+    def __init__(self, nbRows: int = 7) -> None:
+        self.nbRows = nbRows
+        self.pages = []
+
+    def postData(self, endpoint: str, params: dict = None, data: dict = None, **kwargs) -> dict:
+        page, limit = data["settings"]["page"], data["settings"]["limit"]
+        self.pages.append(page)
+        totalPages = -(-self.nbRows // limit)
+        rows = _rows(page * limit, min(self.nbRows, (page + 1) * limit))
+        return {"totalPages": totalPages, "firstPage": page == 0, "lastPage": page == totalPages - 1,
+                "number": page, "numberOfElements": len(rows), "totalElements": self.nbRows,
+                "columns": {"dimension": {"id": "variables/page"}, "columnIds": ["0", "1"]},
+                "rows": rows, "summaryData": {"filteredTotals": [0.0, 0.0], "totals": [0.0, 0.0]}}
+
+
+def _offlineAnalytics(postData) -> aanalytics2.Analytics:
+    ## Analytics instance never connected (placeholder configuration), the reports answered by postData
+    configObject = dict(config.config_object)
+    configObject.update(org_id="test", client_id="test", secret="test", token="test", date_limit=time.time() + 3600)
+    analytics = aanalytics2.Analytics(company_id="test", config_object=configObject, header=dict(config.header))
+    analytics.connector.postData = postData
+    return analytics
+
+
+def _request() -> RequestCreator:
+    request = RequestCreator()
+    request.setRSID("rsid")
+    request.setDimension("variables/page")
+    request.addMetric("metrics/visits")
+    request.addMetric("metrics/orders")
+    request.addGlobalFilter("2024-01-01T00:00:00.000/2024-02-01T00:00:00.000")
+    return request
+
+
+def test_arrowPageWriter_parquet_row_groups(tmp_path):
+    filename = str(tmp_path / "report.parquet")
+    with ArrowPageWriter(filename, COLUMNS) as writer:
+        writer.write(_rows(0, 3))
+        writer.write([])  ## an empty page adds no row group
+        writer.write(_rows(3, 6))
+        writer.write(_rows(6, 7))
+    assert writer.rows == 7
+    parquetFile = pq.ParquetFile(filename)
+    assert parquetFile.metadata.num_row_groups == 3
+    assert [parquetFile.metadata.row_group(index).num_rows for index in range(3)] == [3, 3, 1]
+    table = parquetFile.read()
+    assert table.schema.field("variables/page").type == pa.dictionary(pa.int32(), pa.string())
+    assert table.schema.field("metrics/visits").type == pa.float64()
+    df = table.to_pandas()
+    assert df["itemId"].tolist() == [str(index) for index in range(7)]
+    assert df["variables/page"].astype(str).tolist() == [f"page {index % 3}" for index in range(7)]
+    assert df["metrics/orders"].tolist() == [float(index * 10) for index in range(7)]
+
+
+def test_arrowPageWriter_feather_dictionary_deltas(tmp_path):
+    filename = str(tmp_path / "report.feather")
+    with ArrowPageWriter(filename, COLUMNS, fileFormat="feather") as writer:
+        writer.write(_rows(0, 2))
+        writer.write(_rows(2, 5))
+    reader = pa.ipc.open_file(filename)
+    assert reader.num_record_batches == 2
+    ## the dictionary grows page after page, the values already seen keep their index
+    first, second = [reader.get_batch(index).column(1) for index in range(2)]
+    assert first.indices.to_pylist() == [0, 1] and second.indices.to_pylist() == [2, 0, 1]
+    assert second.dictionary.to_pylist() == ["page 0", "page 1", "page 2"]
+    df = reader.read_all().to_pandas()
+    assert df["variables/page"].astype(str).tolist() == ["page 0", "page 1", "page 2", "page 0", "page 1"]
+    assert df["metrics/visits"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+def test_arrowPageWriter_arguments(tmp_path):
+    with pytest.raises(ValueError):
+        ArrowPageWriter(str(tmp_path / "report.parquet"), ["itemId"])
+    with pytest.raises(ValueError):
+        ArrowPageWriter(str(tmp_path / "report.csv"), COLUMNS, fileFormat="csv")
+
+
+def test_dataframeToArrow():
+    df = pd.DataFrame({"itemId": [1, 2, 3], "variables/page": ["a", None, "a"], "metrics/visits": [1, 2, None]})
+    table = dataframeToArrow(df)
+    assert table.schema.field("itemId").type == pa.string()
+    assert table.column("itemId").to_pylist() == ["1", "2", "3"]
+    assert pa.types.is_dictionary(table.schema.field("variables/page").type)
+    assert table.column("variables/page").to_pylist() == ["a", None, "a"]
+    assert table.schema.field("metrics/visits").type == pa.float64()
+    with pytest.raises(ValueError):
+        dataframeToArrow()
+
+
+@pytest.mark.parametrize("fileFormat", ["parquet", "feather"])
+def test_exportReport_matches_getReport2(tmp_path, fileFormat):
+    reports = _PagedReports()
+    analytics = _offlineAnalytics(reports.postData)
+    filename = analytics.exportReport(_request(), filename=str(tmp_path / f"report.{fileFormat}"),
+                                      fileFormat=fileFormat, limit=3, resolveColumns=False)
+    assert reports.pages == [0, 1, 2]
+    if fileFormat == "parquet":
+        assert pq.ParquetFile(filename).metadata.num_row_groups == 3
+        exported = pq.read_table(filename).to_pandas()
+    else:
+        assert pa.ipc.open_file(filename).num_record_batches == 3
+        exported = pa.ipc.open_file(filename).read_all().to_pandas()
+    report = analytics.getReport2(_request(), limit=3, resolveColumns=False)
+    assert list(exported.columns) == list(report.dataframe.columns)
+    exported["variables/page"] = exported["variables/page"].astype(str)
+    pd.testing.assert_frame_equal(exported, report.dataframe, check_dtype=False)
+
+
+def test_exportReport_n_results(tmp_path):
+    reports = _PagedReports()
+    analytics = _offlineAnalytics(reports.postData)
+    filename = analytics.exportReport(_request(), filename=str(tmp_path / "report.parquet"), n_results=4, limit=3,
+                                      resolveColumns=False)
+    assert reports.pages == [0, 1]
+    assert pq.read_table(filename).column("itemId").to_pylist() == ["0", "1", "2", "3"]
+    with pytest.raises(ValueError):
+        analytics.exportReport(_request(), fileFormat="csv")
+
+
+def test_workspace_arrow_exports(tmp_path):
+    analytics = _offlineAnalytics(_PagedReports().postData)
+    report = analytics.getReport2(_request(), resolveColumns=False)
+    table = report.to_arrow()
+    assert table.num_rows == 7 and pa.types.is_dictionary(table.schema.field("variables/page").type)
+    parquetFile = report.to_parquet(str(tmp_path / "report.parquet"))
+    featherFile = report.to_feather(str(tmp_path / "report.feather"))
+    for df in [pq.read_table(parquetFile).to_pandas(), feather.read_table(featherFile).to_pandas()]:
+        assert df["metrics/visits"].tolist() == report.dataframe["metrics/visits"].tolist()
+        assert df["variables/page"].astype(str).tolist() == report.dataframe["variables/page"].tolist()
@@ -0,0 +1,119 @@
+import os
+import sys
+import inspect
+import threading
+import time
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import pytest
+import aanalytics2
+from aanalytics2 import config
+from aanalytics2.requestPlanner import addBreakdownFilters
+
+DATE_RANGE = "2024-01-01T00:00:00.000/2024-02-01T00:00:00.000"
+
+
+def _request() -> dict:
+    ## the user already uses a metric filter with the id of the first generated breakdown filter
+    return {
+        "rsid": "rsid",
+        "globalFilters": [{"type": "dateRange", "dateRange": DATE_RANGE}],
+        "metricContainer": {
+            "metrics": [{"columnId": "0", "id": "metrics/visits", "filters": ["breakdown_0"]},
+                        {"columnId": "1", "id": "metrics/orders"}],
+            "metricFilters": [{"id": "breakdown_0", "type": "segment", "segmentId": "s300_1"}],
+        },
+        "dimension": "variables/page",
+        "settings": {"countRepeatInstances": True, "limit": 400, "page": 0},
+    }
+
+
+class _BreakdownReports:
+    ## stand-in for connector.postData: 3 items per dimension, named after the dimension and the breakdown path
+    def __init__(self) -> None:
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def postData(self, endpoint: str, params: dict = None, data: dict = None, **kwargs) -> dict:
+        with self.lock:
+            self.requests.append(data)
+        metricFilters = {metricFilter["id"]: metricFilter for metricFilter in data["metricContainer"].get("metricFilters", [])}
+        ## the filter ids are unique, each metric keeps its own filters
+        assert len(metricFilters) == len(data["metricContainer"].get("metricFilters", []))
+        path = [metricFilter["itemId"] for metricFilter in metricFilters.values() if metricFilter["type"] == "breakdown"]
+        prefix = "".join(f"{itemId}>" for itemId in path)
+        name = data["dimension"].split("/")[1]
+        items = [f"{prefix}{name}{index}" for index in range(3)][:data["settings"]["limit"]]
+        ## the values count the filters of each metric: segments and breakdowns
+        values = [float(len(metric.get("filters", []))) for metric in data["metricContainer"]["metrics"]]
+        rows = [{"itemId": itemId, "value": itemId.split(">")[-1], "data": values} for itemId in items]
+        return {"totalPages": 1, "firstPage": True, "lastPage": True, "number": 0, "numberOfElements": len(rows),
+                "totalElements": len(rows), "columns": {"dimension": {"id": data["dimension"]},
+                                                        "columnIds": ["0", "1"]},
+                "rows": rows, "summaryData": {"filteredTotals": [0.0, 0.0], "totals": [0.0, 0.0]}}
+
+
+def _offlineAnalytics(postData) -> aanalytics2.Analytics:
+    ## Analytics instance never connected (placeholder configuration), the reports answered by postData
+    configObject = dict(config.config_object)
+    configObject.update(org_id="test", client_id="test", secret="test", token="test", date_limit=time.time() + 3600)
+    analytics = aanalytics2.Analytics(company_id="test", config_object=configObject, header=dict(config.header))
+    analytics.connector.postData = postData
+    return analytics
+
+
+def test_addBreakdownFilters_unique_ids():
+    request = _request()
+    filterIds = addBreakdownFilters(request, [("variables/page", "1"), ("variables/evar1", 2)])
+    assert filterIds == ["breakdown_1", "breakdown_2"]
+    assert request["metricContainer"]["metricFilters"][1:] == [
+        {"id": "breakdown_1", "type": "breakdown", "dimension": "variables/page", "itemId": "1"},
+        {"id": "breakdown_2", "type": "breakdown", "dimension": "variables/evar1", "itemId": "2"}]
+    assert request["metricContainer"]["metrics"][0]["filters"] == ["breakdown_0", "breakdown_1", "breakdown_2"]
+    assert request["metricContainer"]["metrics"][1]["filters"] == ["breakdown_1", "breakdown_2"]
+    assert addBreakdownFilters(request, []) == []
+
+
+def test_getBreakdownTree_calls_and_shape():
+    reports = _BreakdownReports()
+    analytics = _offlineAnalytics(reports.postData)
+    df = analytics.getBreakdownTree(_request(), dimensions=["variables/page", "variables/evar1", "variables/evar2"],
+                                    top=[3, 2, "inf"], resolveColumns=False)
+    ## 1 top level, 3 breakdowns of the pages, 3 x 2 breakdowns of the eVar1 items
+    assert len(reports.requests) == 1 + 3 + 6
+    assert list(df.columns) == ["variables/page", "variables/evar1", "variables/evar2",
+                                "metrics/visits:::s300_1", "metrics/orders"]
+    assert df.shape == (3 * 2 * 3, 5)
+    assert df.iloc[0, :3].tolist() == ["page0", "evar10", "evar20"]
+    ## the deepest rows are filtered on the user segment and on the 2 parent items
+    assert df["metrics/visits:::s300_1"].unique().tolist() == [3.0]
+    assert df["metrics/orders"].unique().tolist() == [2.0]
+    deepest = [request for request in reports.requests if request["dimension"] == "variables/evar2"]
+    assert all(request["metricContainer"]["metricFilters"][0]["segmentId"] == "s300_1" for request in deepest)
+    withParents = analytics.getBreakdownTree(_request(), dimensions=["variables/page", "variables/evar1"],
+                                             top=[2, 2], includeParents=True, resolveColumns=False)
+    assert len(withParents) == 2 + 2 * 2
+    assert withParents["variables/evar1"].isna().sum() == 2
+
+
+def test_breakdownMany_calls_and_shape():
+    reports = _BreakdownReports()
+    analytics = _offlineAnalytics(reports.postData)
+    report = analytics.getReport2(_request(), resolveColumns=False)
+    reports.requests = []
+    df = report.breakdownMany(dimension="variables/evar1", n_results=2)
+    assert len(reports.requests) == 3
+    assert list(df.columns) == ["parentItemId", "variables/page", "itemId", "variables/evar1",
+                                "metrics/visits:::s300_1", "metrics/orders"]
+    assert df.shape == (3 * 2, 6)
+    assert df["parentItemId"].tolist() == ["page0", "page0", "page1", "page1", "page2", "page2"]
+    assert df["itemId"].tolist()[:2] == ["page0>evar10", "page0>evar11"]
+    assert df["metrics/visits:::s300_1"].unique().tolist() == [2.0]
+    assert df["metrics/orders"].unique().tolist() == [1.0]
+    df = report.breakdownMany(indexes=["page1"], dimension="variables/evar1")
+    assert df["parentItemId"].unique().tolist() == ["page1"] and len(df) == 3
+    with pytest.raises(ValueError):
+        report.breakdownMany()
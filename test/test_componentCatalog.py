@@ -0,0 +1,105 @@
+import os
+import sys
+import inspect
+import threading
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import pandas as pd
+import pytest
+from aanalytics2.componentCatalog import ComponentCatalog, BATCH_SIZE
+
+
+class _StubAnalytics:
+    ## stand-in for Analytics: the components methods used by the catalog, calls recorded
+    def __init__(self, hidden: list = None) -> None:
+        self.calls = []
+        self.hidden = hidden or []  ## segment ids not returned by the list (ex: not shared)
+
+    def getSegments(self, sidFilter: list = None, format: str = "df") -> list:
+        self.calls.append(("getSegments", list(sidFilter or [])))
+        ids = sidFilter if sidFilter is not None else ["s300_1", "s300_2"]
+        return [{"id": segmentId, "name": f"Segment {segmentId}"} for segmentId in ids if segmentId not in self.hidden]
+
+    def getSegment(self, segmentId: str = None) -> dict:
+        self.calls.append(("getSegment", segmentId))
+        return {"id": segmentId, "name": f"Hidden {segmentId}"}
+
+    def getCalculatedMetrics(self, cmFilter: list = None, format: str = "df") -> list:
+        self.calls.append(("getCalculatedMetrics", list(cmFilter or [])))
+        ids = cmFilter if cmFilter is not None else ["cm300_1"]
+        return [{"id": cmId, "name": f"Calculated {cmId}"} for cmId in ids]
+
+    def getCalculatedMetric(self, calculatedMetricId: str = None, full: bool = False) -> dict:
+        self.calls.append(("getCalculatedMetric", calculatedMetricId))
+        return {"id": calculatedMetricId, "name": calculatedMetricId}
+
+    def getMetrics(self, rsid: str = None, format: str = "df") -> list:
+        self.calls.append(("getMetrics", rsid))
+        return [{"id": "metrics/visits", "name": "Visits"}, {"id": "metrics/orders", "name": "Orders"}]
+
+    def getDimensions(self, rsid: str = None) -> pd.DataFrame:
+        self.calls.append(("getDimensions", rsid))
+        return pd.DataFrame({"id": ["variables/page"], "name": ["Page"]})
+
+
+def test_prefetch_batches_segments():
+    analytics = _StubAnalytics(hidden=["s300_7"])
+    catalog = ComponentCatalog(analytics)
+    segmentIds = [f"s300_{index}" for index in range(BATCH_SIZE * 2 + 50)]
+    catalog.prefetch(segments=segmentIds + segmentIds[:10])
+    assert [name for name, _ in analytics.calls] == ["getSegments"] * 3 + ["getSegment"]
+    assert [len(ids) for name, ids in analytics.calls[:3]] == [BATCH_SIZE, BATCH_SIZE, 50]
+    assert catalog.calls == 4
+    ## names read from the catalog, no other call
+    assert catalog.segmentName("s300_3") == "Segment s300_3"
+    assert catalog.segmentName("s300_7") == "Hidden s300_7"
+    catalog.prefetch(segments=segmentIds)
+    assert catalog.calls == 4 and len(analytics.calls) == 4
+
+
+def test_names_and_ids():
+    analytics = _StubAnalytics()
+    catalog = ComponentCatalog(analytics)
+    assert catalog.metricName("metrics/visits", "rsid") == "Visits"
+    assert catalog.metricName("metrics/unknown", "rsid") == "metrics/unknown"
+    assert catalog.dimensionName("variables/page", "rsid") == "Page"
+    assert catalog.calculatedMetricName("cm300_5") == "Calculated cm300_5"
+    assert catalog.metricIdFromName("Orders", "rsid") == "metrics/orders"
+    assert catalog.metricIdFromName("Calculated cm300_1", "rsid") == "cm300_1"
+    assert catalog.metricIdFromName("Unknown", "rsid") is None
+    assert catalog.segmentIdFromName("Segment s300_2") == "s300_2"
+    assert catalog.segmentList() == [{"id": "s300_1", "name": "Segment s300_1"},
+                                     {"id": "s300_2", "name": "Segment s300_2"}]
+    ## each list loaded once: metrics, dimensions, 1 calculated metric, all calculated metrics, all segments
+    assert [name for name, _ in analytics.calls] == ["getMetrics", "getDimensions", "getCalculatedMetrics",
+                                                     "getCalculatedMetrics", "getSegments"]
+
+
+def test_ttl_and_clear():
+    analytics = _StubAnalytics()
+    catalog = ComponentCatalog(analytics, ttl={"segments": 0})
+    catalog.segmentName("s300_1")
+    catalog.segmentName("s300_1")  ## expired immediately: loaded again
+    catalog.metricName("metrics/visits", "rsid")
+    catalog.metricName("metrics/visits", "rsid")  ## kept for the default TTL
+    assert [name for name, _ in analytics.calls] == ["getSegments", "getSegments", "getMetrics"]
+    catalog.clear("metrics")
+    catalog.metricName("metrics/visits", "rsid")
+    assert analytics.calls[-1] == ("getMetrics", "rsid")
+    catalog = ComponentCatalog(analytics, ttl=60)
+    assert set(catalog.ttl.values()) == {60}
+    with pytest.raises(ValueError):
+        ComponentCatalog()
+
+
+def test_threadCalls_counts_the_current_thread():
+    catalog = ComponentCatalog(_StubAnalytics())
+    thread = threading.Thread(target=catalog.segmentName, args=("s300_1",))
+    thread.start()
+    thread.join()
+    assert catalog.calls == 1 and catalog.threadCalls() == 0
+    catalog.metricName("metrics/visits", "rsid")
+    assert catalog.calls == 2 and catalog.threadCalls() == 1
@@ -0,0 +1,195 @@
+import gzip
+import io
+import os
+import sys
+import inspect
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import pandas as pd
+import pytest
+import aanalytics2.ingestion
+from aanalytics2.dataFeedReplay import DataFeedReplay
+
+COLUMNS = ["hit_time_gmt", "mcvisid", "post_visid_high", "post_visid_low", "pagename", "page_url",
+           "event_list", "evar1", "post_evar1", "hit_source", "exclude_hit"]
+
+
+class _Response:
+    def __init__(self, status_code: int = 200) -> None:
+        self.status_code = status_code
+        self.headers = {}
+        self.text = ""
+
+    def json(self) -> dict:
+        return {"success": self.status_code < 400}
+
+
+class _StubBulkapi:
+    ## stand-in for Bulkapi: no REFERENCE table (default mapping), the uploads are kept in memory
+    REFERENCE = None
+
+    def __init__(self, statuses: list = None, failures: dict = None) -> None:
+        ## statuses are consumed in the upload order, failures are the number of rejected uploads per vgid
+        self.statuses = list(statuses or [])
+        self.failures = dict(failures or {})
+        self.uploads = []
+
+    def sendBatch(self, data: bytes, vgid: str = None) -> _Response:
+        status = self.statuses.pop(0) if len(self.statuses) > 0 else 200
+        if self.failures.get(vgid, 0) > 0:
+            self.failures[vgid] -= 1
+            status = 400
+        df = pd.read_csv(io.BytesIO(gzip.decompress(data)), dtype=str, keep_default_na=False)
+        self.uploads.append((vgid, df, status))
+        return _Response(status)
+
+    def sentRows(self) -> pd.DataFrame:
+        frames = [df for _, df, status in self.uploads if status < 400]
+        return pd.concat(frames).sort_values("timestamp").reset_index(drop=True)
+
+
+def _writeFeed(path, rows: list) -> str:
+    ## rows are lists of raw fields, already escaped as in a data feed
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for row in rows:
+            f.write("\t".join(row) + "\n")
+    return str(path)
+
+
+def _row(time: int, visitor: str, page: str = "home", url: str = "https://example.com", events: str = "",
+         evar1: str = "", hitSource: str = "1", exclude: str = "0") -> list:
+    return [str(time), visitor, "1", visitor, page, url, events, evar1, evar1, hitSource, exclude]
+
+
+def test_escaped_fields_keep_the_columns(tmp_path):
+    feed = _writeFeed(tmp_path / "hit_data.tsv", [
+        _row(1, "v1", url="https://example.com/a\\\tb", evar1="back\\\\slash"),
+        _row(2, "v2", page="line\\\nbreak", evar1="after"),
+        _row(3, "v3", evar1="last"),
+    ])
+    bulkapi = _StubBulkapi()
+    summary = DataFeedReplay(bulkapi, COLUMNS, "sandbox", partitions=1).replay(feed)
+    assert summary["rowsSent"] == 3 and summary["complete"]
+    sent = bulkapi.sentRows()
+    assert sent["pageURL"].tolist()[0] == "https://example.com/a\tb"
+    assert sent["eVar1"].tolist() == ["back\\slash", "after", "last"]
+    assert sent["pageName"].tolist()[1] == "line\nbreak"
+
+
+def test_translateEventList():
+    assert DataFeedReplay.translateEventList("1,200,201=5.00") == "purchase,event1,event2=5.00"
+    assert DataFeedReplay.translateEventList("20100,20999") == "event101,event1000"
+    ## eVar instances and unknown codes are not replayed
+    assert DataFeedReplay.translateEventList("100,150,12,999") == "scAdd"
+    assert DataFeedReplay.translateEventList("") == ""
+    assert DataFeedReplay.translateEventList(None) == ""
+
+
+def test_column_mapping():
+    replay = DataFeedReplay(_StubBulkapi(), COLUMNS, "sandbox")
+    assert replay.mapping == {"hit_time_gmt": "timestamp", "mcvisid": "marketingCloudVisitorID",
+                              "pagename": "pageName", "page_url": "pageURL", "event_list": "events",
+                              "evar1": "eVar1"}
+    replay = DataFeedReplay(_StubBulkapi(), COLUMNS, "sandbox", usePostColumns=True)
+    assert replay.mapping["post_evar1"] == "eVar1" and "evar1" not in replay.mapping
+
+
+def test_excluded_hits_and_events(tmp_path):
+    feed = _writeFeed(tmp_path / "hit_data.tsv", [
+        _row(1, "v1", events="1,200"),
+        _row(2, "v1", hitSource="5"),  ## data source
+        _row(3, "v2", exclude="1"),  ## excluded hit
+        _row(4, "v2", events="20100=2"),
+    ])
+    bulkapi = _StubBulkapi()
+    summary = DataFeedReplay(bulkapi, COLUMNS, "sandbox", partitions=1).replay(feed)
+    assert (summary["rowsRead"], summary["rowsSent"], summary["rowsSkipped"]) == (4, 2, 2)
+    sent = bulkapi.sentRows()
+    assert sent["timestamp"].tolist() == ["1", "4"]
+    assert sent["events"].tolist() == ["purchase,event1", "event101=2"]
+    assert sent["reportSuiteID"].unique().tolist() == ["sandbox"]
+    assert sent["visitorID"].tolist() == ["1_v1", "1_v2"]
+
+
+def test_partitions_keep_visitors_together(tmp_path):
+    feed = _writeFeed(tmp_path / "hit_data.tsv", [_row(time, f"v{time % 10}") for time in range(200)])
+    bulkapi = _StubBulkapi()
+    summary = DataFeedReplay(bulkapi, COLUMNS, "sandbox", partitions=4, chunkSize=50).replay(feed)
+    assert summary["rowsSent"] == 200 and summary["uploads"] == len(bulkapi.uploads)
+    groups = {}
+    for vgid, df, _ in bulkapi.uploads:
+        for visitor in df["marketingCloudVisitorID"]:
+            groups.setdefault(visitor, set()).add(vgid)
+        ## the hits of a visitor keep their order inside an upload
+        for _, hits in df.groupby("marketingCloudVisitorID"):
+            assert hits["timestamp"].astype(int).is_monotonic_increasing
+    assert all(len(vgids) == 1 for vgids in groups.values())
+    assert len({vgid for vgid, _, _ in bulkapi.uploads}) > 1
+
+
+def test_checkpoint_resume(tmp_path):
+    feed = _writeFeed(tmp_path / "hit_data.tsv", [_row(time, "v1", page=f"line\\\n{time}") for time in range(10)])
+    checkpoint = str(tmp_path / "checkpoint.json")
+    ## the third chunk is rejected: the replay stops after 6 rows
+    bulkapi = _StubBulkapi(statuses=[200, 200, 400])
+    summary = DataFeedReplay(bulkapi, COLUMNS, "sandbox", partitions=1, chunkSize=3,
+                             checkpoint=checkpoint).replay(feed)
+    assert summary["complete"] == False and summary["rowsSent"] == 6
+    ## resuming sends the rows from the failed chunk, once
+    resumed = _StubBulkapi()
+    summary = DataFeedReplay(resumed, COLUMNS, "sandbox", partitions=1, chunkSize=3,
+                             checkpoint=checkpoint).replay(feed)
+    assert summary["complete"] and summary["rowsSent"] == 4
+    assert resumed.sentRows()["timestamp"].astype(int).tolist() == [6, 7, 8, 9]
+    assert resumed.sentRows()["pageName"].tolist()[0] == "line\n6"
+    ## a complete file is not sent again
+    again = _StubBulkapi()
+    summary = DataFeedReplay(again, COLUMNS, "sandbox", partitions=1, checkpoint=checkpoint).replay(feed)
+    assert summary["rowsSent"] == 0 and len(again.uploads) == 0
+
+
+def test_checkpoint_resume_partitions(tmp_path):
+    feed = _writeFeed(tmp_path / "hit_data.tsv", [_row(time, f"v{time % 10}") for time in range(40)])
+    checkpoint = str(tmp_path / "checkpoint.json")
+    ## the second partition of the first chunk is rejected, the first one is accepted
+    bulkapi = _StubBulkapi(failures={"replay_1": 1})
+    summary = DataFeedReplay(bulkapi, COLUMNS, "sandbox", partitions=2, chunkSize=16,
+                             checkpoint=checkpoint).replay(feed)
+    assert summary["complete"] == False
+    accepted = bulkapi.sentRows()
+    assert set(vgid for vgid, _, status in bulkapi.uploads if status < 400) == {"replay_0"}
+    assert summary["rowsSent"] == len(accepted) and 0 < len(accepted) < 16
+    ## the number of partitions cannot change for a chunk partially sent
+    with pytest.raises(ValueError):
+        DataFeedReplay(_StubBulkapi(), COLUMNS, "sandbox", partitions=4, checkpoint=checkpoint).replay(feed)
+    ## resuming with another chunk size: only the rejected partition of the pending chunk is sent again
+    resumed = _StubBulkapi()
+    summary = DataFeedReplay(resumed, COLUMNS, "sandbox", partitions=2, chunkSize=10,
+                             checkpoint=checkpoint).replay(feed)
+    assert summary["complete"] and summary["rowsSent"] == 40 - len(accepted)
+    assert resumed.uploads[0][0] == "replay_1"
+    pendingRows = resumed.uploads[0][1]["timestamp"].astype(int)
+    assert (pendingRows < 16).all() and not pendingRows.isin(accepted["timestamp"].astype(int)).any()
+    ## every hit is sent exactly once over both runs
+    sent = pd.concat([accepted, resumed.sentRows()])
+    assert sorted(sent["timestamp"].astype(int).tolist()) == list(range(40))
+
+
+def test_sendBatch_refreshes_token(monkeypatch):
+    class _StubConnector:
+        header = {"Authorization": "Bearer old", "Content-Type": "application/json", "x-api-key": "key"}
+
+        def _checkingDate(self) -> None:
+            self.header["Authorization"] = "Bearer new"
+
+    posted = []
+    monkeypatch.setattr(aanalytics2.ingestion.requests, "post",
+                        lambda url, headers=None, files=None: posted.append(headers))
+    bulkapi = aanalytics2.ingestion.Bulkapi.__new__(aanalytics2.ingestion.Bulkapi)
+    bulkapi.endpoint = "https://analytics-collection.adobe.io"
+    bulkapi.connector = _StubConnector()
+    bulkapi.sendBatch(b"data", vgid="sandbox_0")
+    assert posted[0] == {"Authorization": "Bearer new", "x-api-key": "key", "x-adobe-vgid": "sandbox_0"}
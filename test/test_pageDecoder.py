@@ -0,0 +1,134 @@
+import importlib.util
+import json
+import os
+import sys
+import inspect
+import time
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import numpy as np
+import pandas as pd
+import pytest
+import aanalytics2
+from aanalytics2 import config, pageDecoder
+from aanalytics2.aanalytics2 import Analytics
+from aanalytics2.requestCreator import RequestCreator
+
+
+def _rows(start: int = 0, nbRows: int = 5, nbMetrics: int = 3, anomaly: bool = False) -> list:
+    rows = []
+    for index in range(start, start + nbRows):
+        data = [float(index * 10 + metric) for metric in range(nbMetrics)]
+        row = {"itemId": str(1000 + index), "value": f"page {index}", "data": data}
+        if anomaly:
+            row["dataExpected"] = [value * 0.9 for value in data]
+            row["dataUpperBound"] = [value * 1.2 for value in data]
+            row["dataLowerBound"] = [value * 0.6 for value in data]
+        rows.append(row)
+    return rows
+
+
+def _page(rows: list, nbMetrics: int = 3, page: int = 0, lastPage: bool = True) -> dict:
+    return {"totalPages": page + 1, "firstPage": page == 0, "lastPage": lastPage, "number": page,
+            "numberOfElements": len(rows),
+            "columns": {"dimension": {"id": "variables/page", "type": "string"},
+                        "columnIds": [str(index) for index in range(nbMetrics)]},
+            "rows": rows, "summaryData": {"filteredTotals": [0.0] * nbMetrics, "totals": [1.0] * nbMetrics}}
+
+
+def test_decodeReportPage_matches_prepareData():
+    rows = _rows(nbRows=20)
+    rows[3]["data"][1] = None
+    content = json.dumps(_page(rows)).encode()
+    res = pageDecoder.decodeReportPage(content)
+    assert "rows" not in res and res["summaryData"]["totals"] == [1.0, 1.0, 1.0]
+    columnar = res["columnar"]
+    prepared = Analytics._prepareData(None, json.loads(content)["rows"], reportType="normal")
+    assert columnar["itemId"] == list(prepared.keys())
+    assert columnar["value"] == [values[0] for values in prepared.values()]
+    expected = np.array([values[1:] for values in prepared.values()], dtype="float64")
+    assert columnar["data"].dtype == np.float64
+    np.testing.assert_array_equal(columnar["data"], expected)
+    assert np.isnan(columnar["data"][3, 1])
+
+
+def test_decodeReportPage_anomaly_and_empty_pages():
+    res = pageDecoder.decodeReportPage(json.dumps(_page(_rows(anomaly=True))).encode())
+    for field in pageDecoder.ANOMALY_FIELDS:
+        assert res["columnar"][field].shape == (5, 3)
+    np.testing.assert_allclose(res["columnar"]["dataUpperBound"], res["columnar"]["data"] * 1.2)
+    empty = pageDecoder.decodeReportPage(json.dumps(_page([])).encode())
+    assert empty["columnar"]["data"].shape == (0, 3) and empty["columnar"]["itemId"] == []
+    ## responses without rows are returned as decoded
+    error = {"errorCode": "invalid_request", "errorDescription": "error"}
+    assert pageDecoder.decodeReportPage(json.dumps(error).encode()) == error
+
+
+def test_concatColumnar():
+    parts = [pageDecoder.decodeReportPage(json.dumps(_page(_rows(start, anomaly=True))).encode())["columnar"]
+             for start in (0, 5)]
+    columnar = pageDecoder.concatColumnar(parts)
+    assert columnar["itemId"] == [str(1000 + index) for index in range(10)]
+    assert columnar["data"].shape == (10, 3) and columnar["dataLowerBound"].shape == (10, 3)
+    parts[1].pop("dataExpected")
+    assert "dataExpected" not in pageDecoder.concatColumnar(parts)
+
+
+class _PagedReports:
+    ## stand-in for connector.postData: 3 pages of 5 rows, as bytes when the raw content is requested
+    def postData(self, endpoint: str, params: dict = None, data: dict = None, format: str = None, **kwargs):
+        page = data["settings"]["page"]
+        res = _page(_rows(start=page * 5), page=page, lastPage=page == 2)
+        return json.dumps(res).encode() if format == "content" else res
+
+
+def _offlineAnalytics() -> aanalytics2.Analytics:
+    ## Analytics instance never connected (placeholder configuration)
+    configObject = dict(config.config_object)
+    configObject.update(org_id="test", client_id="test", secret="test", token="test", date_limit=time.time() + 3600)
+    analytics = aanalytics2.Analytics(company_id="test", config_object=configObject, header=dict(config.header))
+    analytics.connector.postData = _PagedReports().postData
+    return analytics
+
+
+@pytest.mark.parametrize("options", [{"fastDecode": True}, {"decodeProcesses": 1}])
+def test_decoded_report_matches_default(options):
+    request = RequestCreator()
+    request.setRSID("rsid")
+    request.setDimension("variables/page")
+    for index in range(3):
+        request.addMetric(f"metrics/event{index + 1}")
+    request.addGlobalFilter("2024-01-01T00:00:00.000/2024-02-01T00:00:00.000")
+    analytics = _offlineAnalytics()
+    expected = analytics.getReport2(request, limit=5, resolveColumns=False).dataframe
+    try:
+        result = analytics.getReport2(request, limit=5, resolveColumns=False, **options).dataframe
+    finally:
+        pageDecoder.shutdownDecodePools()
+    assert len(result) == 15 and list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(result, expected.infer_objects(), check_dtype=False)
+
+
+def test_msgspec_schema(monkeypatch):
+    ## copy of the module loaded with msgspec as JSON engine (orjson hidden)
+    pytest.importorskip("msgspec")
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    spec = importlib.util.spec_from_file_location("pageDecoderMsgspec", pageDecoder.__file__)
+    decoder = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(decoder)
+    assert decoder.JSON_ENGINE == "msgspec"
+    rows = _rows(anomaly=True)
+    rows[2]["data"][0] = None
+    content = json.dumps(_page(rows)).encode()
+    typed = decoder.decodeReportPage(content)
+    expected = pageDecoder.decodeReportPage(content)
+    assert typed.keys() == expected.keys() and typed["summaryData"] == expected["summaryData"]
+    assert typed["columnar"].keys() == expected["columnar"].keys()
+    for field, values in expected["columnar"].items():
+        np.testing.assert_array_equal(typed["columnar"][field], values)
+    ## rows not matching the schema are decoded without it
+    content = json.dumps(_page([{"itemId": 1, "value": 2, "data": [1.0, 2.0, 3.0]}])).encode()
+    assert decoder.decodeReportPage(content)["columnar"]["itemId"] == [1]
@@ -0,0 +1,71 @@
+import os
+import sys
+import inspect
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+from copy import deepcopy
+import pandas as pd
+import pytest
+from aanalytics2.aanalytics2 import Analytics
+
+
+class _Offline:
+    ## only the attribute read by _readData
+    loggingEnabled = False
+
+
+def _previousReadData(data_rows: list, cols: list) -> pd.DataFrame:
+    ## previous implementation of the anomaly columns of Analytics._readData: values appended row by row
+    data_rows = deepcopy(data_rows)
+    dict_data = {row.get('value', 'missing_value'): row['data'] for row in data_rows}
+    n_metrics = len(cols) - 1
+    cols = cols + [f'{metric}-{suffix}' for metric in cols[1:] for suffix in ['expected', 'UpperBound', 'LowerBound']]
+    for row in data_rows:
+        for item in range(n_metrics):
+            dict_data[row['value']].append(row.get('dataExpected', [0 for i in range(n_metrics)])[item])
+            dict_data[row['value']].append(row.get('dataUpperBound', [0 for i in range(n_metrics)])[item])
+            dict_data[row['value']].append(row.get('dataLowerBound', [0 for i in range(n_metrics)])[item])
+    df = pd.DataFrame(dict_data).T
+    df.reset_index(inplace=True, )
+    df.columns = cols
+    return df
+
+
+def _rows(nbRows: int = 6, nbMetrics: int = 3) -> list:
+    rows = []
+    for index in range(nbRows):
+        data = [float(index * 10 + metric) for metric in range(nbMetrics)]
+        rows.append({"itemId": str(index), "value": f"day {index}", "data": data,
+                     "dataExpected": [value + 0.5 for value in data],
+                     "dataUpperBound": [value + 2.0 for value in data],
+                     "dataLowerBound": [value - 2.0 for value in data]})
+    ## a row without anomaly detection: zeros for its bands
+    for field in ("dataExpected", "dataUpperBound", "dataLowerBound"):
+        rows[2].pop(field)
+    return rows
+
+
+@pytest.mark.parametrize("nbMetrics", [1, 3])
+def test_anomaly_columns_match_previous_implementation(nbMetrics):
+    rows = _rows(nbMetrics=nbMetrics)
+    cols = ["variables/daterangeday"] + [f"metrics/event{index}" for index in range(nbMetrics)]
+    expected = _previousReadData(rows, list(cols))
+    result = Analytics._readData(_Offline(), rows, anomaly=True, cols=list(cols))
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert result["metrics/event0-UpperBound"].tolist()[:2] == [2.0, 12.0]
+    assert result.loc[2, "metrics/event0-expected"] == 0
+    ## the rows received are not modified
+    assert rows == _rows(nbMetrics=nbMetrics)
+
+
+def test_anomaly_columns_with_item_id():
+    rows = _rows()
+    cols = ["variables/daterangeday", "metrics/event0", "metrics/event1", "metrics/event2"]
+    result = Analytics._readData(_Offline(), rows, anomaly=True, cols=list(cols), item_id=True)
+    assert list(result.columns[:5]) == cols + ["item_id"]
+    assert list(result.columns[5:8]) == ["metrics/event0-expected", "metrics/event0-UpperBound",
+                                         "metrics/event0-LowerBound"]
+    assert len(result.columns) == 5 + 9 and result["item_id"].tolist() == [row["itemId"] for row in rows]
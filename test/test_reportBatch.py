@@ -0,0 +1,188 @@
+import os
+import sys
+import inspect
+import threading
+import time
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import pytest
+import requests
+import aanalytics2
+from aanalytics2 import config, connector
+from aanalytics2.rateController import RateController
+from aanalytics2.reportBatch import ReportBatch
+
+
+def _offlineConfig() -> dict:
+    ## placeholder configuration with a token still valid: no token is requested
+    configObject = dict(config.config_object)
+    configObject.update(org_id="test", client_id="test", secret="test", token="test", date_limit=time.time() + 3600)
+    return configObject
+
+
+def _offlineAnalytics(postData) -> aanalytics2.Analytics:
+    ## Analytics instance never connected (placeholder configuration), the reports answered by postData
+    analytics = aanalytics2.Analytics(company_id="test", config_object=_offlineConfig(), header=dict(config.header))
+    analytics.connector.postData = postData
+    return analytics
+
+
+class _CountingConnector:
+    ## stand-in for AdobeRequest counters
+    def __init__(self) -> None:
+        self.apiCalls = 0
+        self.retries = 0
+
+
+class _RecordingController(RateController):
+    ## the pauses are recorded instead of emptying the bucket, so the test does not wait
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.pauses = []
+
+    def pause(self, seconds: float) -> None:
+        self.pauses.append(seconds)
+
+
+def test_reportBatch_isolates_errors():
+    def runner(request: int) -> int:
+        if request == 3:
+            raise ValueError("report 3 failed")
+        return request * 10
+
+    results = dict(ReportBatch(range(6), runner, max_concurrency=3).to_list())
+    assert isinstance(results.pop(3), ValueError)
+    assert results == {0: 0, 1: 10, 2: 20, 4: 40, 5: 50}
+
+
+def test_reportBatch_bounded_prefetch():
+    consumed = []
+
+    def requests():
+        for index in range(100):
+            consumed.append(index)
+            yield index
+
+    batch = ReportBatch(requests(), lambda request: request, max_concurrency=2)
+    iterator = iter(batch)
+    next(iterator)
+    ## only twice max_concurrency requests are read from the iterator before the first result
+    assert len(consumed) == 4
+    assert len(list(iterator)) == 99 and len(consumed) == 100
+
+
+def test_reportBatch_summary():
+    connectorStub = _CountingConnector()
+
+    def runner(request: int) -> int:
+        connectorStub.apiCalls += 2
+        if request % 2 == 1:
+            connectorStub.retries += 1
+            raise RuntimeError("API error")
+        return request
+
+    batch = ReportBatch(range(5), runner, max_concurrency=1, connector=connectorStub)
+    assert batch.summary is None
+    batch.to_list()
+    assert {key: batch.summary[key] for key in ("requests", "succeeded", "failed", "apiCalls", "retries")} \
+        == {"requests": 5, "succeeded": 3, "failed": 2, "apiCalls": 10, "retries": 2}
+
+
+def test_reportBatch_membersOf():
+    ## one item covering several requests: its results are yielded per member, an error for all of them
+    def runner(item: tuple) -> list:
+        if "c" in item:
+            raise ValueError("merged request failed")
+        return [member.upper() for member in item]
+
+    results = dict(ReportBatch([("a", "b"), ("c", "d")], runner, membersOf=list).to_list())
+    assert results["a"] == "A" and results["b"] == "B"
+    assert isinstance(results["c"], ValueError) and results["c"] is results["d"]
+
+
+def test_rateController_token_bucket():
+    controller = RateController(maxRequestsPerSecond=20, burst=2)
+    start = time.monotonic()
+    times = []
+    for _ in range(6):
+        with controller:
+            times.append(time.monotonic() - start)
+    ## the burst is sent at once, then one request every 1/20 second
+    assert times[1] < 0.03
+    assert times[-1] >= (6 - 2) / 20 - 0.01
+    assert controller.calls == 6 and controller.waitTime > 0
+
+
+def test_rateController_pause_and_concurrency():
+    controller = RateController(maxRequestsPerSecond=20, burst=1)
+    controller.pause(0.2)
+    start = time.monotonic()
+    with controller:
+        pass
+    assert time.monotonic() - start >= 0.2
+    controller = RateController(maxConcurrency=2)
+    running, maxRunning, lock = [0], [0], threading.Lock()
+
+    def work():
+        with controller:
+            with lock:
+                running[0] += 1
+                maxRunning[0] = max(maxRunning[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert maxRunning[0] == 2
+    with pytest.raises(ValueError):
+        RateController(maxRequestsPerSecond=0)
+
+
+def test_postReport_retries_429_through_controller():
+    answers = [{"status_code": 429}, {"status_code": 429}, {"rows": [], "totalPages": 1}]
+    calls = []
+
+    def postData(endpoint: str, params: dict = None, data: dict = None, **kwargs) -> dict:
+        calls.append(kwargs)
+        return answers.pop(0)
+
+    analytics = _offlineAnalytics(postData)
+    controller = _RecordingController(maxRequestsPerSecond=100, burst=10)
+    res = analytics._postReport({"rsid": "rsid"}, rateController=controller)
+    assert res == {"rows": [], "totalPages": 1}
+    assert controller.calls == 3 and controller.pauses == [2, 4]
+    assert analytics.connector.retries == 2
+    ## the adapter of the connector does not retry the 429 answers itself
+    assert all(kwargs.get("rateControlled") for kwargs in calls)
+    ## after the last retry, the 429 answer is returned
+    answers.extend([{"status_code": 429}] * 2)
+    assert analytics._postReport({"rsid": "rsid"}, rateController=controller, retry=1) == {"status_code": 429}
+
+
+def test_connector_rateControlled_session():
+    adobeRequest = connector.AdobeRequest(config_object=_offlineConfig(), header=dict(config.header))
+    assert 429 in adobeRequest.session.get_adapter("https://").max_retries.status_forcelist
+    assert 429 not in adobeRequest.rateSession.get_adapter("https://").max_retries.status_forcelist
+    sessions = []
+
+    def post(session: str):
+        def answer(endpoint: str, **kwargs) -> requests.Response:
+            sessions.append(session)
+            response = requests.Response()
+            response.status_code = 429
+            response._content = b'{"error_code": "429050"}'
+            return response
+        return answer
+
+    adobeRequest.session.post = post("session")
+    adobeRequest.rateSession.post = post("rateSession")
+    assert adobeRequest.postData("https://example.com", data={}, rateControlled=True)["status_code"] == 429
+    adobeRequest.postData("https://example.com", data={})
+    assert sessions == ["rateSession", "session"]
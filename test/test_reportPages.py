@@ -0,0 +1,105 @@
+import os
+import sys
+import inspect
+import time
+from copy import deepcopy
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import aanalytics2
+from aanalytics2 import config
+from aanalytics2.requestCreator import RequestCreator
+
+
+class _StoredPages:
+    ## stand-in for connector.postData: pages of "limit" rows, a new response for each request sharing the same row objects
+    def __init__(self, nbRows: int = 7, limit: int = 3) -> None:
+        self.nbRows = nbRows
+        self.requests = []
+        totalPages = -(-nbRows // limit)
+        self.pages = []
+        for page in range(totalPages):
+            rows = [{"itemId": str(index), "value": f"page {index}", "data": [float(index), float(index * 10)]}
+                    for index in range(page * limit, min(nbRows, (page + 1) * limit))]
+            self.pages.append({"totalPages": totalPages, "firstPage": page == 0, "lastPage": page == totalPages - 1,
+                               "number": page, "numberOfElements": len(rows), "totalElements": nbRows,
+                               "columns": {"dimension": {"id": "variables/page"}, "columnIds": ["0", "1"]},
+                               "rows": rows, "summaryData": {"filteredTotals": [0.0, 0.0], "totals": [0.0, 0.0]}})
+        self.snapshot = deepcopy(self.pages)
+
+    def postData(self, endpoint: str, params: dict = None, data: dict = None, **kwargs) -> dict:
+        self.requests.append(deepcopy(data))
+        page = self.pages[data["settings"]["page"]]
+        return dict(page, rows=list(page["rows"]))
+
+
+def _offlineAnalytics(postData) -> aanalytics2.Analytics:
+    ## Analytics instance never connected (placeholder configuration), the reports answered by postData
+    configObject = dict(config.config_object)
+    configObject.update(org_id="test", client_id="test", secret="test", token="test", date_limit=time.time() + 3600)
+    analytics = aanalytics2.Analytics(company_id="test", config_object=configObject, header=dict(config.header))
+    analytics.connector.postData = postData
+    return analytics
+
+
+def _request() -> RequestCreator:
+    request = RequestCreator()
+    request.setRSID("rsid")
+    request.setDimension("variables/page")
+    request.addMetric("metrics/visits")
+    request.addMetric("metrics/orders")
+    request.addGlobalFilter("2024-01-01T00:00:00.000/2024-02-01T00:00:00.000")
+    return request
+
+
+def test_getReport_accumulates_the_pages():
+    reports = _StoredPages()
+    analytics = _offlineAnalytics(reports.postData)
+    obj = analytics.getReport(_request(), limit=3, n_results="inf", item_id=True)
+    assert [sent["settings"]["page"] for sent in reports.requests] == [0, 1, 2]
+    df = obj["data"]
+    assert df["variables/page"].tolist() == [f"page {index}" for index in range(7)]
+    assert df["metrics/orders"].tolist() == [float(index * 10) for index in range(7)]
+    assert df["item_id"].tolist() == [str(index) for index in range(7)]
+    ## the rows received are not modified
+    assert reports.pages == reports.snapshot
+    ## n_results stops the loop once reached
+    reports.requests = []
+    obj = analytics.getReport(_request(), limit=3, n_results=4)
+    assert [sent["settings"]["page"] for sent in reports.requests] == [0, 1]
+    assert len(obj["data"]) == 6
+    assert reports.pages == reports.snapshot
+
+
+def test_readData_prepareData_do_not_share_the_rows():
+    reports = _StoredPages()
+    analytics = _offlineAnalytics(reports.postData)
+    rows = reports.pages[0]["rows"]
+    df = analytics._readData(rows, cols=["variables/page", "metrics/visits", "metrics/orders"], item_id=True)
+    assert df["item_id"].tolist() == ["0", "1", "2"]
+    expanded = analytics._prepareData(rows, reportType="normal")
+    assert expanded["1"] == ["page 1", 1.0, 10.0]
+    expanded["1"].append(0.0)
+    assert reports.pages == reports.snapshot
+
+
+def test_getReport2_pages_and_request():
+    reports = _StoredPages()
+    analytics = _offlineAnalytics(reports.postData)
+    request = _request().to_dict()
+    original = deepcopy(request)
+    report = analytics.getReport2(request, limit=3, resolveColumns=False)
+    assert [sent["settings"]["page"] for sent in reports.requests] == [0, 1, 2]
+    assert report.dataframe["itemId"].tolist() == [str(index) for index in range(7)]
+    assert report.dataframe["metrics/visits"].tolist() == [float(index) for index in range(7)]
+    ## the request given is not modified, the Workspace keeps the request of the first page
+    assert request == original
+    assert report.dataRequest.to_dict()["settings"]["page"] == 0
+    assert report.dataRequest.to_dict()["settings"]["limit"] == 3
+    ## the pages of another report from the same request start again at 0
+    reports.requests = []
+    analytics.getReport2(request, limit=3, resolveColumns=False)
+    assert [sent["settings"]["page"] for sent in reports.requests] == [0, 1, 2]
+    assert reports.pages == reports.snapshot
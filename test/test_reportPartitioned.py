@@ -0,0 +1,128 @@
+import os
+import re
+import sys
+import inspect
+import threading
+import time
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import pandas as pd
+import pytest
+import aanalytics2
+from aanalytics2 import config
+from aanalytics2.requestCreator import RequestCreator
+
+## itemId, value, visits, orders
+ITEMS = [("1", "about", 5.0, 1.0), ("2", "Account", 12.0, 4.0), ("3", "basket", 7.0, 9.0), ("4", "Blog", 30.0, 2.0),
+         ("5", "contact", 1.0, 0.0), ("6", "42 products", 18.0, 6.0), ("7", "_private", 3.0, 8.0),
+         ("8", "Zebra", 25.0, 3.0), ("9", "checkout", 9.0, 7.0)]
+
+
+def _matches(clause: str, value: str) -> bool:
+    ## evaluation of the clauses built by searchPartitions (case insensitive BEGINS-WITH)
+    value = value.lower()
+    excluded = re.findall(r"NOT BEGINS-WITH '(.*?)'", clause)
+    if len(excluded) > 0:
+        return not any(value.startswith(prefix) for prefix in excluded)
+    return value.startswith(re.findall(r"BEGINS-WITH '(.*?)'", clause)[0])
+
+
+class _SearchReports:
+    ## stand-in for connector.postData: the items matching the search clause, sorted as the API, in pages of "limit" rows
+    def __init__(self, items: list = None, missing: str = None) -> None:
+        self.items = items or ITEMS
+        self.missing = missing  ## value never returned in a partition
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def postData(self, endpoint: str, params: dict = None, data: dict = None, **kwargs) -> dict:
+        with self.lock:
+            self.requests.append(data)
+        clause = data.get("search", {}).get("clause")
+        items = [item for item in self.items if clause is None or
+                 (_matches(clause, item[1]) and item[1] != self.missing)]
+        settings = data["settings"]
+        if "dimensionSort" in settings:
+            items.sort(key=lambda item: item[1], reverse=settings["dimensionSort"] == "desc")
+        else:
+            metrics = data["metricContainer"]["metrics"]
+            sortIndex = next((index for index, metric in enumerate(metrics) if "sort" in metric), 0)
+            items.sort(key=lambda item: item[2 + sortIndex], reverse=metrics[sortIndex].get("sort", "desc") == "desc")
+        page, limit = settings["page"], settings["limit"]
+        totalPages = max(1, -(-len(items) // limit))
+        rows = [{"itemId": itemId, "value": value, "data": [visits, orders]}
+                for itemId, value, visits, orders in items[page * limit:(page + 1) * limit]]
+        totals = [sum(item[2] for item in self.items), sum(item[3] for item in self.items)]
+        return {"totalPages": totalPages, "firstPage": page == 0, "lastPage": page >= totalPages - 1,
+                "number": page, "numberOfElements": len(rows), "totalElements": len(items),
+                "columns": {"dimension": {"id": data["dimension"]}, "columnIds": ["0", "1"]},
+                "rows": rows, "summaryData": {"filteredTotals": totals, "totals": totals}}
+
+
+def _offlineAnalytics(postData) -> aanalytics2.Analytics:
+    ## Analytics instance never connected (placeholder configuration), the reports answered by postData
+    configObject = dict(config.config_object)
+    configObject.update(org_id="test", client_id="test", secret="test", token="test", date_limit=time.time() + 3600)
+    analytics = aanalytics2.Analytics(company_id="test", config_object=configObject, header=dict(config.header))
+    analytics.connector.postData = postData
+    return analytics
+
+
+def _request() -> dict:
+    request = RequestCreator()
+    request.setRSID("rsid")
+    request.setDimension("variables/page")
+    request.addMetric("metrics/visits")
+    request.addMetric("metrics/orders")
+    request.addGlobalFilter("2024-01-01T00:00:00.000/2024-02-01T00:00:00.000")
+    return request.to_dict()
+
+
+def _sortOnOrders(request: dict) -> dict:
+    for metric in request["metricContainer"]["metrics"]:
+        metric.pop("sort", None)
+    request["metricContainer"]["metrics"][1]["sort"] = "asc"
+    return request
+
+
+def _dimensionSort(request: dict) -> dict:
+    request["settings"]["dimensionSort"] = "desc"
+    return request
+
+
+@pytest.mark.parametrize("sortRequest", [lambda request: request, _sortOnOrders, _dimensionSort],
+                         ids=["first metric", "metric sort", "dimensionSort"])
+def test_getReportPartitioned_matches_getReport2(sortRequest):
+    reports = _SearchReports()
+    analytics = _offlineAnalytics(reports.postData)
+    report = analytics.getReportPartitioned(sortRequest(_request()), prefixes=["a", "b", "c"], limit=2,
+                                            maxRequestsPerSecond=100, resolveColumns=False)
+    clauses = {request.get("search", {}).get("clause") for request in reports.requests}
+    assert clauses == {None, "( BEGINS-WITH 'a' )", "( BEGINS-WITH 'b' )", "( BEGINS-WITH 'c' )",
+                       "( NOT BEGINS-WITH 'a' ) AND ( NOT BEGINS-WITH 'b' ) AND ( NOT BEGINS-WITH 'c' )"}
+    ## one request of 1 row without partition, 2 items in a, b and c (1 page), 3 other items (2 pages)
+    assert [request["settings"]["limit"] for request in reports.requests if "search" not in request] == [1]
+    assert len(reports.requests) == 1 + 1 + 1 + 1 + 2
+    expected = analytics.getReport2(sortRequest(_request()), resolveColumns=False)
+    pd.testing.assert_frame_equal(report.dataframe, expected.dataframe)
+    assert report.summaryData == expected.summaryData
+    assert report.row_numbers == len(ITEMS)
+
+
+def test_getReportPartitioned_returnClass_and_completeness():
+    reports = _SearchReports()
+    analytics = _offlineAnalytics(reports.postData)
+    rows = analytics.getReportPartitioned(_request(), prefixes=["a", "b"], returnClass=False)
+    assert [row["value"] for row in rows][:3] == ["Blog", "Zebra", "42 products"]
+    ## an item missing from the partitions
+    analytics = _offlineAnalytics(_SearchReports(missing="Zebra").postData)
+    with pytest.raises(RuntimeError, match="8 unique items\\) for 9 items expected"):
+        analytics.getReportPartitioned(_request(), prefixes=["a", "b"])
+    report = analytics.getReportPartitioned(_request(), prefixes=["a", "b"], checkCompleteness=False,
+                                            resolveColumns=False)
+    assert "Zebra" not in report.dataframe["variables/page"].tolist() and report.row_numbers == 8
+    with pytest.raises(ValueError):
+        analytics.getReportPartitioned(dict(_request(), search={"clause": "( BEGINS-WITH 'a' )"}))
@@ -0,0 +1,254 @@
+import os
+import sys
+import inspect
+import time
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import pandas as pd
+import pytest
+import aanalytics2
+from aanalytics2 import config
+from aanalytics2.requestCreator import RequestCreator
+from aanalytics2.reportStore import requestFingerprint, periodStart, ReportStore, ReportCheckpoint, DATE_DIMENSIONS
+
+
+def _request(dateRange: str = "2024-01-01T00:00:00.000/2024-02-01T00:00:00.000", page: int = 0) -> dict:
+    return {
+        "rsid": "rsid",
+        "globalFilters": [{"type": "dateRange", "dateRange": dateRange}, {"type": "segment", "segmentId": "s300_1"}],
+        "metricContainer": {"metrics": [{"columnId": "0", "id": "metrics/visits"}]},
+        "dimension": "variables/daterangeday",
+        "settings": {"countRepeatInstances": True, "limit": 400, "page": page},
+    }
+
+
+def test_requestFingerprint():
+    request = _request()
+    fingerprint = requestFingerprint(request)
+    assert len(fingerprint) == 64
+    ## the key order and the page do not change the fingerprint, the request is not modified
+    reordered = {key: request[key] for key in reversed(list(request))}
+    assert requestFingerprint(reordered) == fingerprint
+    assert requestFingerprint(_request(page=3)) == fingerprint
+    assert request["settings"]["page"] == 0
+    ## the date range changes it, unless it is excluded
+    other = _request(dateRange="2024-02-01T00:00:00.000/2024-03-01T00:00:00.000")
+    assert requestFingerprint(other) != fingerprint
+    assert requestFingerprint(other, excludeDateRange=True) == requestFingerprint(request, excludeDateRange=True)
+    other["globalFilters"][1]["segmentId"] = "s300_2"
+    assert requestFingerprint(other, excludeDateRange=True) != requestFingerprint(request, excludeDateRange=True)
+    with pytest.raises(ValueError):
+        requestFingerprint()
+
+
+@pytest.mark.parametrize("dimension,shift,expected", [
+    ("variables/daterangehour", 0, "2024-03-13 17:00"),
+    ("variables/daterangeday", -1, "2024-03-12"),
+    ("variables/daterangeweek", 0, "2024-03-10"),  ## weeks start on Sunday
+    ("variables/daterangeweek", 1, "2024-03-17"),
+    ("variables/daterangemonth", -2, "2024-01-01"),
+    ("variables/daterangequarter", 0, "2024-01-01"),
+    ("variables/daterangeyear", 1, "2025-01-01"),
+])
+def test_periodStart(dimension, shift, expected):
+    assert periodStart("2024-03-13T17:45:00", DATE_DIMENSIONS[dimension], shift) == pd.Timestamp(expected)
+
+
+def test_reportStore(tmp_path):
+    store = ReportStore(tmp_path / "store")
+    key = requestFingerprint(_request(), excludeDateRange=True)
+    assert store.load(key) is None and store.keys() == []
+    record = {"metadata": {"closedUntil": "2024-01-30"}, "response": {"rows": [{"itemId": "1", "data": [1.0]}]}}
+    store.save(key, record)
+    assert store.load(key) == record and store.keys() == [key]
+    record["metadata"]["closedUntil"] = "2024-01-31"
+    store.save(key, record)
+    assert store.load(key)["metadata"]["closedUntil"] == "2024-01-31"
+    assert list(path.name for path in (tmp_path / "store").iterdir()) == [f"{key}.json"]
+    store.delete(key)
+    store.delete(key)
+    assert store.keys() == []
+    with pytest.raises(ValueError):
+        store.save(key)
+
+
+def test_reportCheckpoint_pages(tmp_path):
+    checkpoint = ReportCheckpoint(tmp_path / "checkpoints")
+    fingerprint = requestFingerprint(_request())
+    assert checkpoint.loadPage(fingerprint, 0) is None and checkpoint.pages(fingerprint) == []
+    for page in [1, 0, 10]:
+        checkpoint.savePage(fingerprint, page, {"rows": [{"itemId": str(page)}]})
+    assert checkpoint.pages(fingerprint) == [0, 1, 10]
+    assert checkpoint.loadPage(fingerprint, 10) == {"rows": [{"itemId": "10"}]}
+    checkpoint.clear(fingerprint)
+    checkpoint.clear(fingerprint)
+    assert checkpoint.pages(fingerprint) == [] and list((tmp_path / "checkpoints").iterdir()) == []
+
+
+class _PagedReports:
+    ## stand-in for connector.postData: 3 pages of 2 rows, page failPage answered with an error once
+    def __init__(self, failPage: int = None) -> None:
+        self.failPage = failPage
+        self.pages = []
+
+    def postData(self, endpoint: str, params: dict = None, data: dict = None, **kwargs) -> dict:
+        page = data["settings"]["page"]
+        self.pages.append(page)
+        if page == self.failPage:
+            self.failPage = None
+            return {"errorCode": "500", "errorDescription": "Internal error"}
+        rows = [{"itemId": str(page * 2 + index), "value": f"item {page * 2 + index}", "data": [float(page)]}
+                for index in range(2)]
+        return {"totalPages": 3, "firstPage": page == 0, "lastPage": page == 2, "number": page,
+                "numberOfElements": 2, "totalElements": 6,
+                "columns": {"dimension": {"id": "variables/page", "type": "string"}, "columnIds": ["0"]},
+                "rows": rows, "summaryData": {"filteredTotals": [4.0], "totals": [6.0]}}
+
+
+def _offlineAnalytics(postData) -> aanalytics2.Analytics:
+    ## Analytics instance never connected (placeholder configuration), the reports answered by postData
+    configObject = dict(config.config_object)
+    configObject.update(org_id="test", client_id="test", secret="test", token="test", date_limit=time.time() + 3600)
+    analytics = aanalytics2.Analytics(company_id="test", config_object=configObject, header=dict(config.header))
+    analytics.connector.postData = postData
+    return analytics
+
+
+def test_reportCheckpoint_resume(tmp_path):
+    request = RequestCreator()
+    request.setRSID("rsid")
+    request.setDimension("variables/page")
+    request.addMetric("metrics/visits")
+    request.addGlobalFilter("2024-01-01T00:00:00.000/2024-02-01T00:00:00.000")
+    checkpoint = ReportCheckpoint(tmp_path / "checkpoints")
+    reports = _PagedReports(failPage=2)
+    analytics = _offlineAnalytics(reports.postData)
+    with pytest.raises(RuntimeError):
+        analytics.getReport2(request, limit=2, returnClass=False, resolveColumns=False, checkpoint=checkpoint)
+    assert reports.pages == [0, 1, 2]
+    assert len([path for path in (tmp_path / "checkpoints").rglob("page_*.json")]) == 2
+    ## the saved pages are read, only the failed page is requested again
+    rows = analytics.getReport2(request, limit=2, returnClass=False, resolveColumns=False, checkpoint=checkpoint)
+    assert reports.pages == [0, 1, 2, 2]
+    assert [row["itemId"] for row in rows] == ["0", "1", "2", "3", "4", "5"]
+    ## the pages are deleted once the report is complete
+    assert list((tmp_path / "checkpoints").iterdir()) == []
+
+
+class _DailyReports:
+    ## stand-in for connector.postData: daily report of 1 metric, days without a value have no row
+    def __init__(self, values: dict) -> None:
+        self.values = dict(values)  ## {"2024-01-01": value}
+        self.requests = []
+
+    def postData(self, endpoint: str, params: dict = None, data: dict = None, **kwargs) -> dict:
+        self.requests.append(data)
+        dateRange = [gFilter["dateRange"] for gFilter in data["globalFilters"] if gFilter["type"] == "dateRange"][0]
+        start, end = [pd.Timestamp(date) for date in dateRange.split("/")]
+        days = sorted(pd.Timestamp(day) for day, value in self.values.items() if start <= pd.Timestamp(day) < end)
+        total = float(sum(self.values[day.strftime("%Y-%m-%d")] for day in days))
+        columns = {"columnIds": ["0"]}
+        if "dimension" not in data:
+            return {"totalPages": 1, "numberOfElements": 0, "columns": columns, "rows": [],
+                    "summaryData": {"filteredTotals": [total], "totals": [total]}}
+        if data["settings"].get("dimensionSort") == "desc":
+            days.reverse()
+        rows = [{"itemId": day.strftime("1%y%m%d"), "value": day.strftime("%b %d, %Y"),
+                 "data": [float(self.values[day.strftime("%Y-%m-%d")])]} for day in days]
+        rows = rows[:data["settings"].get("limit", len(rows))]
+        return {"totalPages": 1, "firstPage": True, "lastPage": True, "number": 0, "numberOfElements": len(rows),
+                "totalElements": len(rows), "columns": {**columns, "dimension": {"id": data["dimension"]}},
+                "rows": rows, "summaryData": {"filteredTotals": [total], "totals": [total]}}
+
+    def dateRanges(self) -> list:
+        ## date range and limit of each report request with a dimension
+        return [([gFilter["dateRange"][:10] + "/" + gFilter["dateRange"][24:34] for gFilter in request["globalFilters"]
+                  if gFilter["type"] == "dateRange"][0], request["settings"].get("limit"))
+                for request in self.requests if "dimension" in request]
+
+
+def _dailyRequest(start: str, end: str) -> dict:
+    request = RequestCreator()
+    request.setRSID("rsid")
+    request.setDimension("variables/daterangeday")
+    request.addMetric("metrics/visits")
+    request.addGlobalFilter(f"{start}T00:00:00.000/{end}T00:00:00.000")
+    return request.to_dict()
+
+
+def _incremental(analytics: aanalytics2.Analytics, request: dict, store: ReportStore, lookback: int = 3) -> dict:
+    rows = analytics.getReportIncremental(request, store=store, lookback=lookback, returnClass=False,
+                                          resolveColumns=False)
+    return {row["value"]: row["data"][0] for row in rows}
+
+
+def _days(start: str, end: str, value: float = 1.0) -> dict:
+    return {day.strftime("%Y-%m-%d"): value for day in pd.date_range(start, end, inclusive="left")}
+
+
+def test_getReportIncremental_merge_and_lookback(tmp_path):
+    reports = _DailyReports(_days("2024-01-01", "2024-01-11"))
+    analytics = _offlineAnalytics(reports.postData)
+    analytics._reportSuiteTimezones["rsid"] = "UTC"
+    store = ReportStore(tmp_path / "store")
+    request = _dailyRequest("2024-01-01", "2024-01-11")
+    assert len(_incremental(analytics, request, store)) == 10
+    assert [dateRange for dateRange, _ in reports.dateRanges()] == ["2024-01-01/2024-01-11"]
+    record = store.load(requestFingerprint(request, excludeDateRange=True))
+    assert record["metadata"]["closedUntil"] == "2024-01-11T00:00:00"
+    assert record["response"]["summaryData"]["totals"] == [10.0]
+    ## late data in the lookback window, a day of the window without data anymore, an old day changed
+    reports.values.update({"2024-01-02": 50.0, "2024-01-09": 9.0, "2024-01-10": 10.0})
+    del reports.values["2024-01-08"]
+    reports.requests = []
+    result = _incremental(analytics, request, store)
+    ## the last 3 days are requested again, the days before come from the store
+    assert reports.dateRanges() == [("2024-01-01/2024-01-08", 1), ("2024-01-08/2024-01-11", 20000)]
+    assert "Jan 08, 2024" not in result and len(result) == 9
+    assert result["Jan 02, 2024"] == 1.0
+    assert result["Jan 09, 2024"] == 9.0 and result["Jan 10, 2024"] == 10.0
+    assert list(result) == sorted(result, key=lambda value: pd.Timestamp(value))
+
+
+def test_getReportIncremental_empty_lookback_window(tmp_path):
+    reports = _DailyReports(_days("2024-01-01", "2024-01-11"))
+    analytics = _offlineAnalytics(reports.postData)
+    analytics._reportSuiteTimezones["rsid"] = "UTC"
+    store = ReportStore(tmp_path / "store")
+    request = _dailyRequest("2024-01-01", "2024-01-11")
+    _incremental(analytics, request, store)
+    ## no data anymore for the periods requested again: the stored rows of these periods are dropped
+    for day in ["2024-01-08", "2024-01-09", "2024-01-10"]:
+        del reports.values[day]
+    result = _incremental(analytics, request, store)
+    assert list(result) == [f"Jan {day:02d}, 2024" for day in range(1, 8)]
+    ## no data at all before the window: nothing is kept from the store
+    reports.values = _days("2024-01-08", "2024-01-11", 2.0)
+    result = _incremental(analytics, request, store)
+    assert result == {"Jan 08, 2024": 2.0, "Jan 09, 2024": 2.0, "Jan 10, 2024": 2.0}
+
+
+def test_getReportIncremental_moving_start(tmp_path):
+    values = _days("2024-01-01", "2024-01-11")
+    del values["2024-01-04"]
+    reports = _DailyReports(values)
+    analytics = _offlineAnalytics(reports.postData)
+    analytics._reportSuiteTimezones["rsid"] = "UTC"
+    store = ReportStore(tmp_path / "store")
+    _incremental(analytics, _dailyRequest("2024-01-01", "2024-01-11"), store)
+    ## the date range moves forward by 3 days, its first period has no data
+    reports.values.update(_days("2024-01-11", "2024-01-14", 3.0))
+    reports.values["2024-01-05"] = 5.0  ## not requested again, the stored value is kept
+    reports.requests = []
+    result = _incremental(analytics, _dailyRequest("2024-01-04", "2024-01-14"), store)
+    assert reports.dateRanges() == [("2024-01-01/2024-01-04", 1), ("2024-01-04/2024-01-08", 1),
+                                    ("2024-01-08/2024-01-14", 20000)]
+    assert list(result) == [f"Jan {day:02d}, 2024" for day in range(5, 14)]
+    assert result["Jan 05, 2024"] == 1.0 and result["Jan 13, 2024"] == 3.0
+    ## a date range starting before the stored one requests everything
+    reports.requests = []
+    result = _incremental(analytics, _dailyRequest("2024-01-01", "2024-01-14"), store)
+    assert reports.dateRanges() == [("2024-01-01/2024-01-14", 20000)] and len(result) == 12
@@ -0,0 +1,258 @@
+import os
+import re
+import sys
+import inspect
+import time
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import pytest
+import aanalytics2
+from aanalytics2 import config
+from aanalytics2.requestCreator import RequestCreator
+from aanalytics2.requestPlanner import (isMergeable, planMergedRequests, splitMergedResponse, splitMetricContainer,
+                                        joinSplitResponses, missingItems, itemsRequest, searchPartitions,
+                                        DEFAULT_SEARCH_PREFIXES, totalsRequest, planTotalsRequests)
+
+DATE_RANGE = "2024-01-01T00:00:00.000/2024-02-01T00:00:00.000"
+
+
+def _request(metrics: list, dimension: str = "variables/page", segment: str = None, filters: dict = None) -> dict:
+    ## filters: {metric index: segment id applied as metric filter}
+    request = RequestCreator()
+    request.setRSID("rsid")
+    request.setDimension(dimension)
+    request.addGlobalFilter(DATE_RANGE)
+    if segment is not None:
+        request.addGlobalFilter(segment)
+    for metric in metrics:
+        request.addMetric(metric)
+    for index, segmentId in (filters or {}).items():
+        request.addMetricFilter(metricId=metrics[index], filterId=segmentId, metricIndex=index)
+    return request.to_dict()
+
+
+def _response(request: dict, itemIds: list) -> dict:
+    ## response of the API: each value identifies its item, metric and filters
+    metrics = request["metricContainer"]["metrics"]
+    filters = {metricFilter["id"]: metricFilter.get("segmentId") for metricFilter in
+               request["metricContainer"].get("metricFilters", [])}
+    names = [metric["id"] + "".join(f":::{filters[filterId]}" for filterId in metric.get("filters", []))
+             for metric in metrics]
+    return {
+        "totalPages": 1, "numberOfElements": len(itemIds),
+        "columns": {"dimension": {"id": request.get("dimension")}, "columnIds": [m["columnId"] for m in metrics]},
+        "rows": [{"itemId": itemId, "value": f"value {itemId}", "data": [f"{itemId}|{name}" for name in names]}
+                 for itemId in itemIds],
+        "summaryData": {"totals": [f"total|{name}" for name in names], "filteredTotals": [0] * len(names)},
+    }
+
+
+def test_planMergedRequests_groups_compatible_requests():
+    requests = [
+        _request(["metrics/visits", "metrics/orders"]),
+        _request(["metrics/visits", "metrics/revenue"], filters={1: "s300_1"}),
+        _request(["metrics/visits"], segment="s300_2"),  ## other global filters
+        _request(["metrics/visits"], dimension="variables/evar1"),  ## other dimension
+    ]
+    plans = planMergedRequests(requests)
+    assert [len(plan.members) for plan in plans] == [2, 1, 1]
+    merged = plans[0].request["metricContainer"]
+    ## visits is requested once, the filter of the second request is renumbered
+    assert [metric["id"] for metric in merged["metrics"]] == ["metrics/visits", "metrics/orders", "metrics/revenue"]
+    assert merged["metricFilters"] == [{"id": "0", "type": "segment", "segmentId": "s300_1"}]
+    assert merged["metrics"][2]["filters"] == ["0"]
+    assert plans[0].members[1][2] == {"0": "0", "1": "2"}
+
+
+def test_planMergedRequests_max_metrics():
+    ## same sorting metric (visits), one new metric per request
+    requests = [_request(["metrics/visits", f"metrics/event{index}"]) for index in range(1, 5)]
+    plans = planMergedRequests(requests, maxMetrics=4)
+    assert [len(plan.members) for plan in plans] == [3, 1]
+    assert [plan.metricCount for plan in plans] == [4, 2]
+    ## requests sorted on another metric are never merged with them
+    plans = planMergedRequests(requests + [_request(["metrics/orders", "metrics/event1"])], maxMetrics=10)
+    assert [len(plan.members) for plan in plans] == [4, 1]
+
+
+
+def test_ignoreZeroes_requests_are_not_merged():
+    requests = [_request(["metrics/visits", "metrics/orders"]), _request(["metrics/visits", "metrics/revenue"])]
+    requests[1]["statistics"] = {"ignoreZeroes": True}
+    assert isMergeable(requests[0]) and not isMergeable(requests[1])
+    ## a member would otherwise receive rows that are zero for all its metrics
+    plans = planMergedRequests(requests)
+    assert len(plans) == 2 and all(len(plan.members) == 1 for plan in plans)
+
+
+def _offlineAnalytics(postData) -> aanalytics2.Analytics:
+    ## Analytics instance never connected (placeholder configuration), the reports answered by postData
+    configObject = dict(config.config_object)
+    configObject.update(org_id="test", client_id="test", secret="test", token="test", date_limit=time.time() + 3600)
+    analytics = aanalytics2.Analytics(company_id="test", config_object=configObject, header=dict(config.header))
+    analytics.connector.postData = postData
+    return analytics
+
+
+def test_getReports_merge_isolates_members():
+    requests = [_request(["metrics/visits", "metrics/orders"]), _request(["metrics/visits", "metrics/revenue"])]
+    calls = []
+
+    def postData(endpoint: str, params: dict = None, data: dict = None, **kwargs) -> dict:
+        calls.append(data)
+        return _response(data, ["1", "2"])
+
+    analytics = _offlineAnalytics(postData)
+    buildReport = analytics._buildReport
+
+    def failingBuild(dataRequest: dict, res: dict, **kwargs):
+        ## the report of the second member cannot be built
+        if dataRequest["metricContainer"]["metrics"][1]["id"] == "metrics/revenue":
+            raise ValueError("cannot build the report")
+        return buildReport(dataRequest, res, **kwargs)
+
+    analytics._buildReport = failingBuild
+    batch = analytics.getReports(requests, merge=True, resolveColumns=False)
+    results = dict((request["metricContainer"]["metrics"][1]["id"], result) for request, result in batch)
+    assert len(calls) == 1
+    assert isinstance(results["metrics/revenue"], ValueError)
+    assert results["metrics/orders"].dataframe["metrics/orders"].tolist() == ["1|metrics/orders", "2|metrics/orders"]
+    assert batch.summary["succeeded"] == 1 and batch.summary["failed"] == 1
+
+
+def test_splitMergedResponse_matches_single_requests():
+    requests = [
+        _request(["metrics/visits", "metrics/orders"]),
+        _request(["metrics/revenue", "metrics/visits"], filters={0: "s300_1"}),
+    ]
+    plan = planMergedRequests(requests)[0]
+    itemIds = ["1", "2", "3"]
+    merged = _response(plan.request, itemIds)
+    for original, dataRequest, columnMap in plan.members:
+        member = splitMergedResponse(merged, columnMap)
+        expected = _response(dataRequest, itemIds)
+        assert member["columns"]["columnIds"] == expected["columns"]["columnIds"]
+        assert member["rows"] == expected["rows"]
+        assert member["summaryData"] == expected["summaryData"]
+
+
+def test_splitMetricContainer_keeps_sort_metric_and_filters():
+    metrics = ["metrics/visits"] + [f"metrics/event{index}" for index in range(1, 8)]
+    request = _request(metrics, filters={3: "s300_1", 6: "s300_2"})
+    subRequests = splitMetricContainer(request, maxMetrics=3)
+    assert len(subRequests) == 4
+    for subRequest in subRequests:
+        subMetrics = subRequest["metricContainer"]["metrics"]
+        assert subMetrics[0]["id"] == "metrics/visits" and len(subMetrics) <= 3
+        used = {filterId for metric in subMetrics for filterId in metric.get("filters", [])}
+        assert {metricFilter["id"] for metricFilter in subRequest["metricContainer"]["metricFilters"]} == used
+    columnIds = [metric["columnId"] for subRequest in subRequests for metric in subRequest["metricContainer"]["metrics"][1:]]
+    assert columnIds == [metric["columnId"] for metric in request["metricContainer"]["metrics"][1:]]
+    assert splitMetricContainer(request, maxMetrics=50) == [request]
+    with pytest.raises(ValueError):
+        splitMetricContainer(request, maxMetrics=1)
+
+
+def test_joinSplitResponses_matches_single_request():
+    metrics = ["metrics/visits"] + [f"metrics/event{index}" for index in range(1, 6)]
+    request = _request(metrics, filters={2: "s300_1"})
+    itemIds = ["10", "11", "12", "13"]
+    subRequests = splitMetricContainer(request, maxMetrics=3)
+    responses = [_response(subRequest, itemIds) for subRequest in subRequests]
+    columnIds = [metric["columnId"] for metric in request["metricContainer"]["metrics"]]
+    joined = joinSplitResponses(responses, columnIds)
+    expected = _response(request, itemIds)
+    assert joined["columns"]["columnIds"] == expected["columns"]["columnIds"]
+    assert joined["rows"] == expected["rows"]
+    assert joined["summaryData"] == expected["summaryData"]
+
+
+def test_joinSplitResponses_missing_items():
+    request = _request(["metrics/visits", "metrics/orders", "metrics/revenue"])
+    subRequests = splitMetricContainer(request, maxMetrics=2)
+    ## the second sub-request returns another item in place of "12" (tie on the sorting metric)
+    responses = [_response(subRequests[0], ["10", "11", "12"]), _response(subRequests[1], ["10", "99", "11"])]
+    assert missingItems(responses) == [[], ["12"]]
+    joined = joinSplitResponses(responses, ["0", "1", "2"])
+    ## the items of the first response, in its order, None for the metrics not returned
+    assert [row["itemId"] for row in joined["rows"]] == ["10", "11", "12"]
+    assert joined["rows"][2]["data"] == ["12|metrics/visits", "12|metrics/orders", None]
+    assert joined["numberOfElements"] == 3
+    ## the missing items are requested by id, then joined
+    retry = itemsRequest(subRequests[1], ["12"])
+    assert retry["search"]["itemIds"] == ["12"] and retry["settings"]["limit"] == 1
+    assert "itemIds" not in subRequests[1].get("search", {})
+    responses[1]["rows"] += _response(retry, ["12"])["rows"]
+    joined = joinSplitResponses(responses, ["0", "1", "2"])
+    assert joined["rows"] == _response(request, ["10", "11", "12"])["rows"]
+
+
+def _matches(clause: str, value: str) -> bool:
+    ## evaluation of the clauses built by searchPartitions (case insensitive BEGINS-WITH)
+    value = value.lower()
+    excluded = re.findall(r"NOT BEGINS-WITH '(.*?)'", clause)
+    if len(excluded) > 0:
+        return not any(value.startswith(prefix) for prefix in excluded)
+    return value.startswith(re.findall(r"BEGINS-WITH '(.*?)'", clause)[0])
+
+
+def test_searchPartitions_are_disjoint_and_complete():
+    clauses = searchPartitions()
+    assert len(clauses) == len(DEFAULT_SEARCH_PREFIXES) + 1
+    assert clauses[0] == "( BEGINS-WITH 'a' )"
+    values = ["Home", "about us", "42 products", "Zebra", "_private", "", "été", "(none)", "Unspecified"]
+    for value in values:
+        assert sum(_matches(clause, value) for clause in clauses) == 1, value
+    clauses = searchPartitions(["Ab", "b"])
+    assert clauses == ["( BEGINS-WITH 'ab' )", "( BEGINS-WITH 'b' )",
+                       "( NOT BEGINS-WITH 'ab' ) AND ( NOT BEGINS-WITH 'b' )"]
+    for value in ["ABC", "a", "bar", "c"]:
+        assert sum(_matches(clause, value) for clause in clauses) == 1, value
+
+
+@pytest.mark.parametrize("prefixes", [["a", "ab"], ["a", "a"], ["a", ""], ["it's"]])
+def test_searchPartitions_invalid_prefixes(prefixes):
+    with pytest.raises(ValueError):
+        searchPartitions(prefixes)
+
+
+def test_totalsRequest():
+    request = _request(["metrics/visits", "metrics/orders"], segment="s300_2", filters={1: "s300_1"})
+    request["search"] = {"clause": "( BEGINS-WITH 'a' )"}
+    request["metricContainer"]["metrics"][0]["sort"] = "desc"
+    totals = totalsRequest(request)
+    assert "dimension" not in totals and "search" not in totals
+    assert totals["settings"]["limit"] == 1 and totals["settings"]["page"] == 0
+    ## the global segment becomes a metric filter of every metric, the date range stays global
+    assert totals["globalFilters"] == [{"type": "dateRange", "dateRange": DATE_RANGE}]
+    metricFilters = {metricFilter["id"]: metricFilter for metricFilter in totals["metricContainer"]["metricFilters"]}
+    assert metricFilters["TOTALS_SEGMENT_0"] == {"id": "TOTALS_SEGMENT_0", "type": "segment", "segmentId": "s300_2"}
+    metrics = totals["metricContainer"]["metrics"]
+    assert [metric["columnId"] for metric in metrics] == ["0", "1"]
+    assert metrics[0]["filters"] == ["TOTALS_SEGMENT_0"] and "sort" not in metrics[0]
+    assert metrics[1]["filters"][-1] == "TOTALS_SEGMENT_0" and len(metrics[1]["filters"]) == 2
+    ## the request is not modified
+    assert request["dimension"] == "variables/page" and len(request["globalFilters"]) == 2
+
+
+def test_planTotalsRequests_merges_segments_and_dimensions():
+    requests = [
+        _request(["metrics/visits", "metrics/orders"]),
+        _request(["metrics/visits"], segment="s300_1"),
+        _request(["metrics/visits"], dimension="variables/evar1", segment="s300_2"),
+        _request(["metrics/visits", "metrics/orders"]),  ## same totals as the first request
+    ]
+    requests[3]["globalFilters"][0]["dateRange"] = "2024-02-01T00:00:00.000/2024-03-01T00:00:00.000"
+    plans = planTotalsRequests(requests)
+    assert [len(plan.members) for plan in plans] == [3, 1]
+    ## visits, orders, visits on s300_1, visits on s300_2
+    assert plans[0].metricCount == 4
+    itemIds = ["0"]
+    merged = _response(plans[0].request, itemIds)
+    for original, dataRequest, columnMap in plans[0].members:
+        member = splitMergedResponse(merged, columnMap)
+        assert member["summaryData"] == _response(dataRequest, itemIds)["summaryData"]
+    assert [len(plan.members) for plan in planTotalsRequests(requests, maxMetrics=2)] == [1, 2, 1]
@@ -0,0 +1,103 @@
+import gc
+import os
+import sys
+import inspect
+import time
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import pandas as pd
+import pytest
+import aanalytics2
+from aanalytics2 import config
+from aanalytics2.requestCreator import RequestCreator
+
+pa = pytest.importorskip("pyarrow")
+
+
+class _PagedReports:
+    ## stand-in for connector.postData: nbRows rows, returned in pages of "limit" rows
+    def __init__(self, nbRows: int = 10) -> None:
+        self.nbRows = nbRows
+        self.pages = []
+
+    def postData(self, endpoint: str, params: dict = None, data: dict = None, **kwargs) -> dict:
+        page, limit = data["settings"]["page"], data["settings"]["limit"]
+        self.pages.append(page)
+        totalPages = -(-self.nbRows // limit)
+        rows = [{"itemId": str(index), "value": f"page {index % 3}", "data": [float(index), float(index * 10)]}
+                for index in range(page * limit, min(self.nbRows, (page + 1) * limit))]
+        return {"totalPages": totalPages, "firstPage": page == 0, "lastPage": page == totalPages - 1,
+                "number": page, "numberOfElements": len(rows), "totalElements": self.nbRows,
+                "columns": {"dimension": {"id": "variables/page"}, "columnIds": ["0", "1"]},
+                "rows": rows, "summaryData": {"filteredTotals": [0.0, 0.0], "totals": [0.0, 0.0]}}
+
+
+def _offlineAnalytics(postData) -> aanalytics2.Analytics:
+    ## Analytics instance never connected (placeholder configuration), the reports answered by postData
+    configObject = dict(config.config_object)
+    configObject.update(org_id="test", client_id="test", secret="test", token="test", date_limit=time.time() + 3600)
+    analytics = aanalytics2.Analytics(company_id="test", config_object=configObject, header=dict(config.header))
+    analytics.connector.postData = postData
+    return analytics
+
+
+def _request() -> RequestCreator:
+    request = RequestCreator()
+    request.setRSID("rsid")
+    request.setDimension("variables/page")
+    request.addMetric("metrics/visits")
+    request.addMetric("metrics/orders")
+    request.addGlobalFilter("2024-01-01T00:00:00.000/2024-02-01T00:00:00.000")
+    return request
+
+
+def _plain(df: pd.DataFrame) -> pd.DataFrame:
+    ## Arrow-backed columns converted back to the default dtypes, to compare the values
+    return pd.DataFrame({col: df[col].astype("float64") if col.startswith("metrics/") else df[col].astype(str).tolist()
+                         for col in df.columns})
+
+
+def test_spilled_report_matches_in_memory_report():
+    reports = _PagedReports()
+    analytics = _offlineAnalytics(reports.postData)
+    spilled = analytics.getReport2(_request(), limit=3, spillThreshold=4, resolveColumns=False)
+    assert reports.pages == [0, 1, 2, 3]
+    spillFile = spilled.spillFile
+    assert spillFile is not None and os.path.exists(spillFile)
+    ## the dataframe is read from the file: Arrow-backed columns
+    assert all(isinstance(dtype, pd.ArrowDtype) for dtype in spilled.dataframe.dtypes)
+    assert spilled.row_numbers == 10
+    ## the rows of the pages written at each spill: 6 rows, then the 4 remaining rows
+    reader = pa.ipc.open_file(spillFile)
+    assert [reader.get_batch(index).num_rows for index in range(reader.num_record_batches)] == [6, 4]
+    report = analytics.getReport2(_request(), limit=3, resolveColumns=False)
+    assert report.spillFile is None
+    assert list(spilled.dataframe.columns) == list(report.dataframe.columns)
+    pd.testing.assert_frame_equal(_plain(spilled.dataframe), _plain(report.dataframe))
+    ## the file is removed with the Workspace
+    del spilled, reader
+    gc.collect()
+    assert not os.path.exists(spillFile)
+
+
+def test_spillThreshold_not_reached():
+    reports = _PagedReports()
+    analytics = _offlineAnalytics(reports.postData)
+    report = analytics.getReport2(_request(), limit=3, spillThreshold=10, resolveColumns=False)
+    assert reports.pages == [0, 1, 2, 3]
+    assert report.spillFile is None and report.row_numbers == 10
+    assert report.dataframe["itemId"].tolist() == [str(index) for index in range(10)]
+    assert report.dataframe["metrics/orders"].tolist() == [float(index * 10) for index in range(10)]
+
+
+def test_spilled_report_n_results():
+    reports = _PagedReports()
+    analytics = _offlineAnalytics(reports.postData)
+    report = analytics.getReport2(_request(), limit=3, n_results=7, spillThreshold=2, resolveColumns=False)
+    assert report.spillFile is not None and reports.pages == [0, 1, 2]
+    ## the pages are fetched until n_results is reached, as without spilling
+    expected = analytics.getReport2(_request(), limit=3, n_results=7, resolveColumns=False)
+    pd.testing.assert_frame_equal(_plain(report.dataframe), _plain(expected.dataframe))
@@ -0,0 +1,110 @@
+import os
+import sys
+import inspect
+import time
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import aanalytics2
+from aanalytics2 import config
+
+DATE_RANGE = "2024-01-01T00:00:00.000/2024-02-01T00:00:00.000"
+
+
+def _staticRequest(rows: list, rowType: str = "segmentId") -> dict:
+    ## freeform table: one row per segment (or date range), visits and orders, orders filtered on segment s300_9
+    metricFilters = [{"id": f"STATIC_ROW_COMPONENT_{index}", "type": rowType.replace("Id", ""), rowType: row}
+                     for index, row in enumerate(rows)]
+    metricFilters.append({"id": "orderFilter", "type": "segment", "segmentId": "s300_9"})
+    metrics = []
+    for index in range(len(rows)):
+        metrics.append({"columnId": f"metrics/visits:::{2 * index}", "id": "metrics/visits",
+                        "filters": [f"STATIC_ROW_COMPONENT_{index}"]})
+        metrics.append({"columnId": f"metrics/orders:::{2 * index + 1}", "id": "metrics/orders",
+                        "filters": [f"STATIC_ROW_COMPONENT_{index}", "orderFilter"]})
+    return {"rsid": "rsid", "globalFilters": [{"type": "dateRange", "dateRange": DATE_RANGE}],
+            "metricContainer": {"metrics": metrics, "metricFilters": metricFilters},
+            "settings": {"countRepeatInstances": True, "page": 0}}
+
+
+def _staticResponse(dataRequest: dict) -> dict:
+    ## totals of the static table, the column index multiplied by 10, columns returned in reverse order
+    columnIds = [metric["columnId"] for metric in dataRequest["metricContainer"]["metrics"]][::-1]
+    return {"columns": {"columnIds": columnIds},
+            "summaryData": {"totals": [float(columnId.split(":::")[1]) * 10 for columnId in columnIds]}}
+
+
+class _Components:
+    ## stand-in for connector.getData: names of the segments, the requests are recorded
+    def __init__(self) -> None:
+        self.requests = []
+
+    def getData(self, endpoint: str, params: dict = None, **kwargs) -> dict:
+        self.requests.append((endpoint.split("/")[-1], dict(params or {})))
+        segmentIds = (params or {}).get("segmentFilter", "").split(",")
+        return {"content": [{"id": segmentId, "name": f"Segment {segmentId}"} for segmentId in segmentIds if segmentId],
+                "lastPage": True}
+
+
+def _offlineAnalytics(postData) -> aanalytics2.Analytics:
+    ## Analytics instance never connected (placeholder configuration), the reports answered by postData
+    configObject = dict(config.config_object)
+    configObject.update(org_id="test", client_id="test", secret="test", token="test", date_limit=time.time() + 3600)
+    analytics = aanalytics2.Analytics(company_id="test", config_object=configObject, header=dict(config.header))
+    analytics.connector.postData = postData
+    return analytics
+
+
+def test_decrypteStaticData_segment_rows():
+    ## the segment rows used to call a nonexistent self.Segment method
+    components = _Components()
+    analytics = _offlineAnalytics(None)
+    analytics.connector.getData = components.getData
+    dataRequest = _staticRequest(["s300_2", "s300_1", "s300_3"])
+    nb_columns, tableColumnIds, segmentApplied, filterRelations, dataRows = analytics._decrypteStaticData(
+        dataRequest=dataRequest, response=_staticResponse(dataRequest), resolveColumns=True)
+    assert nb_columns == 2
+    assert tableColumnIds["metrics/orders:::3"] == "STATIC_ROW_COMPONENT_1"
+    assert segmentApplied == {"orderFilter": "s300_9"}
+    ## only the orders are filtered on top of their row
+    assert filterRelations == {f"metrics/orders:::{2 * index + 1}": ["orderFilter"] for index in range(3)}
+    ## one row per segment, in the order of the request, the totals in the order of the columns
+    assert list(dataRows.keys()) == ["Segment s300_2", "Segment s300_1", "Segment s300_3"]
+    assert dataRows["Segment s300_1"] == ["s300_1", 30.0, 20.0]
+    ## the names of the 3 segments are requested in one call
+    assert len(components.requests) == 1
+    assert sorted(components.requests[0][1]["segmentFilter"].split(",")) == ["s300_1", "s300_2", "s300_3"]
+
+
+def test_decrypteStaticData_without_resolution():
+    components = _Components()
+    analytics = _offlineAnalytics(None)
+    analytics.connector.getData = components.getData
+    dataRequest = _staticRequest(["s300_2", "s300_1"])
+    dataRows = analytics._decrypteStaticData(dataRequest=dataRequest, response=_staticResponse(dataRequest))[4]
+    assert dataRows == {"s300_2": ["s300_2", 10.0, 0.0], "s300_1": ["s300_1", 30.0, 20.0]}
+    assert components.requests == []
+    ## date ranges as rows
+    ranges = ["2024-01-01T00:00:00.000/2024-01-15T00:00:00.000", "2024-01-15T00:00:00.000/2024-02-01T00:00:00.000"]
+    dataRequest = _staticRequest(ranges, rowType="dateRange")
+    dataRows = analytics._decrypteStaticData(dataRequest=dataRequest, response=_staticResponse(dataRequest),
+                                             resolveColumns=True)[4]
+    assert dataRows == {ranges[0]: [ranges[0], 10.0, 0.0], ranges[1]: [ranges[1], 30.0, 20.0]}
+
+
+def test_getReport2_static_table():
+    components = _Components()
+    dataRequest = _staticRequest(["s300_2", "s300_1"])
+    analytics = _offlineAnalytics(lambda endpoint, params=None, data=None, **kwargs: _staticResponse(data))
+    analytics.connector.getData = components.getData
+    report = analytics.getReport2(dataRequest)
+    assert report.reportType == "static"
+    df = report.dataframe
+    ## the metrics in the order of the response columns, the segment of the orders does not label the visits
+    assert list(df.columns) == ["SegmentName", "SegmentId", "metrics/orders:::s300_9", "metrics/visits"]
+    assert df["SegmentName"].tolist() == ["Segment s300_2", "Segment s300_1"]
+    assert df["SegmentId"].tolist() == ["s300_2", "s300_1"]
+    assert df["metrics/visits"].tolist() == [0.0, 20.0]
+    assert df["metrics/orders:::s300_9"].tolist() == [10.0, 30.0]
@@ -0,0 +1,68 @@
+import os
+import sys
+import inspect
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import numpy as np
+import pandas as pd
+import pytest
+from aanalytics2.workspace import TargetWorkspace
+
+DIMENSION = "variables/evar1"
+
+
+def _mergeChain(experiences: list, dataframes: list) -> pd.DataFrame:
+    ## previous implementation of TargetWorkspace.breakdown: successive outer merges
+    combined = None
+    for exp, sub_df in zip(experiences, dataframes):
+        key_cols = ["itemId", DIMENSION]
+        metric_cols = [c for c in sub_df.columns if c not in key_cols]
+        sub_df = sub_df.rename(columns={col: f"{col.split(':::')[0]} ({exp})" for col in metric_cols})
+        if combined is None:
+            combined = sub_df
+        else:
+            combined = combined.merge(sub_df, on=key_cols, how="outer")
+    return combined.drop(columns=["itemId"])
+
+
+def _breakdown(itemIds: list, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "itemId": itemIds,
+        DIMENSION: [f"value {itemId}" for itemId in itemIds],
+        "metrics/visits": rng.integers(0, 1000, len(itemIds)).astype(float),
+        "metrics/orders:::s300_1": rng.integers(0, 100, len(itemIds)).astype(float),
+    })
+
+
+@pytest.mark.parametrize("nbExperiences", [1, 2, 4])
+def test_combine_matches_merge_chain(nbExperiences):
+    rng = np.random.default_rng(nbExperiences)
+    pool = [str(itemId) for itemId in rng.integers(1, 10 ** 9, 30)] + ["0", "10", "9", "100"]
+    experiences = ["Default Experience"] + [f"Experience {index}" for index in range(1, nbExperiences)]
+    dataframes = []
+    for index in range(nbExperiences):
+        ## each experience returns a different subset of the items, in the order of its metric
+        itemIds = list(rng.choice(pool, size=20, replace=False))
+        dataframes.append(_breakdown(itemIds, index))
+    expected = _mergeChain(experiences, dataframes)
+    result = TargetWorkspace._combineBreakdowns(experiences, dataframes)
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True))
+
+
+def test_combine_duplicated_keys():
+    ## a breakdown with the same item twice: combined like the merges instead of raising
+    experiences = ["Default Experience", "Experience B"]
+    dataframes = [_breakdown(["1", "2", "2"], 0), _breakdown(["2", "3"], 1)]
+    result = TargetWorkspace._combineBreakdowns(experiences, dataframes)
+    pd.testing.assert_frame_equal(result, _mergeChain(experiences, dataframes))
+    assert list(result.columns) == [DIMENSION, "metrics/visits (Default Experience)",
+                                    "metrics/orders (Default Experience)", "metrics/visits (Experience B)",
+                                    "metrics/orders (Experience B)"]
+
+
+def test_combine_no_experience():
+    assert TargetWorkspace._combineBreakdowns([], []).empty
@@ -0,0 +1,116 @@
+import math
+import os
+import sys
+import inspect
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import numpy as np
+import pandas as pd
+import pytest
+from aanalytics2.workspace import TargetWorkspace
+
+
+def _targetWorkspace(method: str, evaluation: str) -> TargetWorkspace:
+    ## instance without API calls, only the attributes used by _compute_confidence
+    workspace = TargetWorkspace.__new__(TargetWorkspace)
+    workspace.metrics = ["visitors", "orders", "revenue"]
+    workspace.baseMetric = "visitors"
+    workspace.conversionMetrics = ["orders", "revenue"]
+    workspace.controlGroup = "Default Experience"
+    workspace._experience_col = "Target Experience"
+    workspace.confidenceLevel = 0.95
+    workspace.method = method
+    workspace.evaluation = evaluation
+    return workspace
+
+
+def _scalarConfidence(workspace: TargetWorkspace, df: pd.DataFrame, metric: str) -> list:
+    ## row by row reference computation
+    control = df[df["Target Experience"] == workspace.controlGroup].iloc[0]
+    n_control, x_control = float(control["visitors"]), float(control[metric])
+    results = []
+    for _, row in df.iterrows():
+        n_variant, x_variant = float(row["visitors"]), float(row[metric])
+        total = n_control + n_variant
+        if row["Target Experience"] == workspace.controlGroup or total == 0 or n_variant == 0:
+            results.append(float("nan"))
+            continue
+        p_pool = (x_control + x_variant) / total
+        if p_pool in (0, 1):
+            results.append(float("nan"))
+            continue
+        if workspace.method == "t-test":
+            p_control, p_variant = x_control / n_control, x_variant / n_variant
+            v1 = p_control * (1 - p_control) / n_control
+            v2 = p_variant * (1 - p_variant) / n_variant
+            if v1 + v2 == 0:
+                results.append(float("nan"))
+                continue
+            t_stat = (p_variant - p_control) / math.sqrt(v1 + v2)
+            df_welch = (v1 + v2) ** 2 / (v1 ** 2 / max(n_control - 1, 1) + v2 ** 2 / max(n_variant - 1, 1))
+            p_value = workspace._t_pvalue(t_stat, df_welch, workspace.evaluation)
+        else:
+            se = math.sqrt(p_pool * (1 - p_pool) * (1 / n_control + 1 / n_variant))
+            z = (x_variant / n_variant - x_control / n_control) / se
+            if workspace.evaluation == "2sides":
+                p_value = math.erfc(abs(z) / math.sqrt(2))
+            elif workspace.evaluation == "rightOneSided":
+                p_value = 0.5 * math.erfc(z / math.sqrt(2))
+            else:
+                p_value = 0.5 * math.erfc(-z / math.sqrt(2))
+        results.append(round(1 - p_value, 4))
+    return results
+
+
+@pytest.mark.parametrize("method", ["z-test", "t-test"])
+@pytest.mark.parametrize("evaluation", ["2sides", "leftOneSided", "rightOneSided"])
+def test_vectorized_confidence_matches_scalar(method, evaluation):
+    rng = np.random.default_rng(42)
+    nb_rows = 60
+    visitors = rng.integers(1, 50000, nb_rows).astype(float)
+    visitors[5] = 0
+    orders = np.floor(visitors * rng.uniform(0, 0.2, nb_rows))
+    orders[7] = 0
+    revenue = np.floor(visitors * rng.uniform(0, 0.9, nb_rows))
+    df = pd.DataFrame({
+        "itemId": [str(i) for i in range(nb_rows)],
+        "Target Experience": ["Default Experience"] + [f"Experience {i}" for i in range(1, nb_rows)],
+        "visitors": visitors, "orders": orders, "revenue": revenue,
+    })
+    df.loc[0, "visitors"] = 40000.0
+    workspace = _targetWorkspace(method, evaluation)
+    result = workspace._compute_confidence(df.copy())
+    for metric in workspace.conversionMetrics:
+        expected = np.array(_scalarConfidence(workspace, df, metric), dtype=float)
+        np.testing.assert_allclose(result[f"{metric}_confidence"].to_numpy(dtype=float), expected,
+                                   atol=1e-6, equal_nan=True)
+
+
+def test_vectorized_betai_matches_scalar():
+    workspace = _targetWorkspace("t-test", "2sides")
+    rng = np.random.default_rng(1)
+    a = rng.uniform(0.5, 5000, 200)
+    b = np.full(200, 0.5)
+    x = rng.uniform(0, 1, 200)
+    expected = [workspace._betai(ai, bi, xi) for ai, bi, xi in zip(a, b, x)]
+    np.testing.assert_allclose(workspace._betai_vec(a, b, x), expected, atol=1e-9)
+
+
+def test_vectorized_functions_return_floats():
+    workspace = _targetWorkspace("t-test", "2sides")
+    df = np.array([3.0, 10.5, 3.0, 250.0])
+    np.testing.assert_allclose(workspace._lgamma_vec(df), [math.lgamma(value) for value in df])
+    assert workspace._lgamma_vec(df).dtype == np.float64
+    assert workspace._erfc_vec(np.array([0.1, 2.0])).dtype == np.float64
+    assert workspace._t_pvalue_vec(np.array([1.5, -0.2]), df[:2], "2sides").dtype == np.float64
+
+
+def test_vectorized_erfc_matches_math_erfc():
+    workspace = _targetWorkspace("z-test", "2sides")
+    values = np.linspace(-6, 6, 2001)
+    expected = [math.erfc(value) for value in values]
+    np.testing.assert_allclose(workspace._erfc_vec(values), expected, rtol=1.2e-7)
+    assert workspace._erfc_vec(values.reshape(1, -1)).shape == (1, 2001)
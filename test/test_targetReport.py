@@ -0,0 +1,110 @@
+import os
+import sys
+import inspect
+import threading
+import time
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import pytest
+import aanalytics2
+from aanalytics2 import config
+from aanalytics2.workspace import TargetWorkspace
+
+TIMEFRAME = "2024-01-01/2024-02-01"
+
+
+class _TargetReports:
+    ## stand-in for connector.postData: activities, experiences of the activity and the experience report (2 pages)
+    def __init__(self, analytics: aanalytics2.Analytics, barrier: threading.Barrier) -> None:
+        self.analytics = analytics
+        self.barrier = barrier
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def postData(self, endpoint: str, params: dict = None, data: dict = None, **kwargs) -> dict:
+        with self.lock:
+            self.requests.append(data)
+            self.analytics.connector.apiCalls += 1  ## as counted by the connector
+        dimension, page = data["dimension"], data["settings"].get("page", 0)
+        if dimension == "variables/targetraw.activity":
+            ## the activity lookup waits for the resolution of the metric names, in another thread
+            self.barrier.wait()
+            rows = [{"itemId": "111", "value": "Other activity", "data": [5.0]},
+                    {"itemId": "222", "value": "My activity", "data": [10.0]}]
+            totalPages = 1
+        elif dimension == "variables/targetraw.activityexperience":
+            rows = [{"itemId": "1", "value": "My activity > Default experience", "data": [1000.0, 100.0]},
+                    {"itemId": "2", "value": "My activity > Experience B", "data": [1000.0, 150.0]}]
+            totalPages = 1
+        else:
+            rows = [[{"itemId": "1", "value": "Default experience", "data": [1000.0, 100.0]}],
+                    [{"itemId": "2", "value": "Experience B", "data": [1000.0, 150.0]}]][page]
+            totalPages = 2
+        return {"totalPages": totalPages, "firstPage": page == 0, "lastPage": page == totalPages - 1,
+                "number": page, "numberOfElements": len(rows), "totalElements": 2,
+                "columns": {"dimension": {"id": dimension},
+                            "columnIds": [metric["columnId"] for metric in data["metricContainer"]["metrics"]]},
+                "rows": rows, "summaryData": {"filteredTotals": [2000.0, 250.0], "totals": [2000.0, 250.0]}}
+
+
+def _componentLists(endpoint: str, params: dict = None, **kwargs) -> object:
+    ## stand-in for connector.getData: names of the components used to label the columns
+    if endpoint.endswith("/segments"):
+        return {"content": [{"id": "s300_1", "name": "My segment"}], "lastPage": True}
+    if endpoint.endswith("/metrics"):
+        return [{"id": "metrics/visits", "name": "Visits"}, {"id": "metrics/orders", "name": "Orders"}]
+    if endpoint.endswith("/calculatedmetrics"):
+        return {"content": [], "lastPage": True}
+    return {}
+
+
+def _offlineAnalytics() -> aanalytics2.Analytics:
+    ## Analytics instance never connected (placeholder configuration)
+    configObject = dict(config.config_object)
+    configObject.update(org_id="test", client_id="test", secret="test", token="test", date_limit=time.time() + 3600)
+    return aanalytics2.Analytics(company_id="test", config_object=configObject, header=dict(config.header))
+
+
+def test_getTargetReport_concurrent_lookups():
+    analytics = _offlineAnalytics()
+    barrier = threading.Barrier(2, timeout=5)
+    reports = _TargetReports(analytics, barrier)
+    analytics.connector.postData = reports.postData
+    analytics.connector.getData = _componentLists
+
+    def metricIdFromName(name: str, rsid: str = None) -> str:
+        analytics.connector.apiCalls += 1
+        barrier.wait()
+        return {"Orders": "metrics/orders"}.get(name)
+
+    analytics.catalog.metricIdFromName = metricIdFromName
+    analytics.catalog.segmentIdFromName = lambda name: {"My segment": "s300_1"}.get(name)
+    report = analytics.getTargetReport("My activity", TIMEFRAME, "rsid", metrics=["metrics/visits", "Orders"],
+                                       segments=["My segment"])
+    assert isinstance(report, TargetWorkspace)
+    ## metric names, activity, experiences of the activity, 2 pages of the experience report
+    assert report.apiCalls == 5 and len(reports.requests) == 4
+    activityRequest = reports.requests[0]
+    assert activityRequest["metricContainer"]["metrics"][0]["id"] == "metrics/occurrences"
+    assert {"type": "segment", "segmentId": "s300_1"} in activityRequest["globalFilters"]
+    for request in reports.requests[1:]:
+        assert [metric["id"] for metric in request["metricContainer"]["metrics"]] == ["metrics/visits", "metrics/orders"]
+        assert request["metricContainer"]["metricFilters"][0]["dimension"] == "variables/targetraw.activity"
+        assert request["metricContainer"]["metricFilters"][0]["itemId"] == "222"
+    assert report.dataframe["Target Experience"].tolist() == ["Default experience", "Experience B"]
+    assert report.dataframe["Orders"].tolist() == [100.0, 150.0]
+    assert report.dataframe["Orders_is_significant"].tolist() == [False, True]
+
+
+def test_getTargetReport_not_found():
+    analytics = _offlineAnalytics()
+    reports = _TargetReports(analytics, threading.Barrier(1))
+    analytics.connector.postData = reports.postData
+    analytics.catalog.metricIdFromName = lambda name, rsid=None: None
+    with pytest.raises(ValueError, match="activity Missing activity not found"):
+        analytics.getTargetReport("Missing activity", TIMEFRAME, "rsid", metrics=["metrics/visits"])
+    with pytest.raises(ValueError, match="metric Unknown not found"):
+        analytics.getTargetReport("My activity", TIMEFRAME, "rsid", metrics=["metrics/visits", "Unknown"])
@@ -0,0 +1,159 @@
+import os
+import sys
+import inspect
+import time
+## changing current_dir to ensure you are running test on your version of the aanalytics2 module.
+current_dir = os.path.dirname(os.path.abspath(
+    inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+import numpy as np
+import pandas as pd
+import aanalytics2
+from aanalytics2 import config
+from aanalytics2.requestCreator import RequestCreator
+
+
+class _Reports:
+    ## stand-in for connector.postData: one page, the metric values given per column, the dimension values repeated
+    def __init__(self, values: list, distinctValues: int = 4) -> None:
+        self.values = values
+        self.distinctValues = distinctValues
+        self.calls = 0
+
+    def postData(self, endpoint: str, params: dict = None, data: dict = None, **kwargs) -> dict:
+        self.calls += 1
+        nbRows = len(self.values[0])
+        rows = [{"itemId": str(1000 + index), "value": f"value {index % self.distinctValues}",
+                 "data": [column[index] for column in self.values]} for index in range(nbRows)]
+        metrics = data["metricContainer"]["metrics"]
+        return {"totalPages": 1, "firstPage": True, "lastPage": True, "number": 0, "numberOfElements": nbRows,
+                "totalElements": nbRows,
+                "columns": {"dimension": {"id": data["dimension"]}, "columnIds": [m["columnId"] for m in metrics]},
+                "rows": rows, "summaryData": {"filteredTotals": [0.0] * len(metrics), "totals": [0.0] * len(metrics)}}
+
+
+def _offlineAnalytics(postData) -> aanalytics2.Analytics:
+    ## Analytics instance never connected (placeholder configuration), the reports answered by postData
+    configObject = dict(config.config_object)
+    configObject.update(org_id="test", client_id="test", secret="test", token="test", date_limit=time.time() + 3600)
+    analytics = aanalytics2.Analytics(company_id="test", config_object=configObject, header=dict(config.header))
+    analytics.connector.postData = postData
+    return analytics
+
+
+def _request(metrics: list) -> RequestCreator:
+    request = RequestCreator()
+    request.setRSID("rsid")
+    request.setDimension("variables/page")
+    for metric in metrics:
+        request.addMetric(metric)
+    request.addGlobalFilter("2024-01-01T00:00:00.000/2024-02-01T00:00:00.000")
+    return request
+
+
+def _compactValues(nbRows: int = 200) -> list:
+    return [
+        [float(index) for index in range(nbRows)],  ## integers below 32768
+        [float(index * 1000) for index in range(nbRows)],  ## integers above 32767
+        [index + 0.5 for index in range(nbRows)],  ## exact in float32
+        [index + 0.1 for index in range(nbRows)],  ## rounded in float32
+        [None if index % 10 == 0 else index + 0.5 for index in range(nbRows)],  ## missing values
+    ]
+
+
+METRICS = ["metrics/visits", "metrics/pageviews", "metrics/revenue", "metrics/event1", "metrics/event2"]
+
+
+def test_compactDataframe_dtypes_and_values():
+    analytics = _offlineAnalytics(_Reports(_compactValues()).postData)
+    report = analytics.getReport2(_request(METRICS), resolveColumns=False)
+    expected = report.dataframe.copy()
+    memoryUsage = report.compactDataframe()
+    df = report.dataframe
+    assert memoryUsage == report.memoryUsage and memoryUsage["after"] < memoryUsage["before"]
+    assert [str(dtype) for dtype in df[METRICS].dtypes] == ["int16", "int32", "float32", "float64", "float32"]
+    ## the dimension values repeat: categorical, the itemIds are unique: Arrow strings
+    assert isinstance(df["variables/page"].dtype, pd.CategoricalDtype)
+    assert not isinstance(df["itemId"].dtype, pd.CategoricalDtype) and pd.api.types.is_string_dtype(df["itemId"])
+    ## no value is changed
+    for col in METRICS:
+        np.testing.assert_array_equal(df[col].to_numpy(dtype="float64"), expected[col].to_numpy(dtype="float64"))
+    assert df["variables/page"].astype(str).tolist() == expected["variables/page"].tolist()
+    assert df["itemId"].astype(str).tolist() == expected["itemId"].tolist()
+    ## compacting again keeps the same dtypes
+    report.compactDataframe()
+    assert [str(dtype) for dtype in report.dataframe[METRICS].dtypes] == ["int16", "int32", "float32", "float64", "float32"]
+
+
+def test_compactDataframe_negative_and_unique_values():
+    values = [[float(-index) for index in range(10)], [float(index * 100000) for index in range(10)]]
+    analytics = _offlineAnalytics(_Reports(values, distinctValues=10).postData)
+    report = analytics.getReport2(_request(METRICS[:2]), resolveColumns=False)
+    report.compactDataframe()
+    assert [str(dtype) for dtype in report.dataframe[METRICS[:2]].dtypes] == ["int8", "int32"]
+    ## unique dimension values are not categorical
+    assert not isinstance(report.dataframe["variables/page"].dtype, pd.CategoricalDtype)
+
+
+def test_getReport2_compact():
+    analytics = _offlineAnalytics(_Reports(_compactValues()).postData)
+    report = analytics.getReport2(_request(METRICS), resolveColumns=False, compact=True)
+    assert report.memoryUsage is not None and report.memoryUsage["after"] < report.memoryUsage["before"]
+    assert isinstance(report.dataframe["variables/page"].dtype, pd.CategoricalDtype)
+    assert str(report.dataframe["metrics/visits"].dtype) == "int16"
+    assert analytics.getReport2(_request(METRICS), resolveColumns=False).memoryUsage is None
+
+
+class _ComponentLists:
+    ## stand-in for connector.getData: names of the segments and metrics, the endpoints requested are recorded
+    def __init__(self) -> None:
+        self.endpoints = []
+
+    def getData(self, endpoint: str, params: dict = None, **kwargs) -> object:
+        self.endpoints.append(endpoint.split("/")[-1])
+        if endpoint.endswith("/segments"):
+            return {"content": [{"id": "s300_1", "name": "My segment"}], "lastPage": True}
+        if endpoint.endswith("/metrics"):
+            return [{"id": "metrics/visits", "name": "Visits"}, {"id": "metrics/pageviews", "name": "Page Views"}]
+        return {"content": [], "lastPage": True}
+
+
+def test_lazy_dataframe_columns_and_globalFilters():
+    reports = _Reports([[1.0, 2.0, 3.0], [10.0, 20.0, 30.0]])
+    analytics = _offlineAnalytics(reports.postData)
+    components = _ComponentLists()
+    analytics.connector.getData = components.getData
+    request = _request(METRICS[:2])
+    request.addGlobalFilter("s300_1")
+    report = analytics.getReport2(request, resolveColumns=True)
+    ## only the segment names are loaded (one batch), nothing else is resolved nor built yet
+    assert components.endpoints == ["segments"] and report._dataframe is None and report._globalFilters is None
+    assert report.row_numbers == 3 and report.summaryData is not None
+    assert report.startDate == "2024-01-01T00:00:00.000"
+    ## the column names are resolved without building the dataframe
+    assert report.columns == ["itemId", "variables/page", "Visits", "Page Views"]
+    assert report._dataframe is None
+    assert components.endpoints.count("segments") == 1 and components.endpoints.count("metrics") == 1
+    ## the segment names are not requested again
+    assert report.globalFilters[1] == {"type": "segment", "segmentId": "s300_1", "segmentName": "My segment"}
+    assert components.endpoints.count("segments") == 1
+    df = report.dataframe
+    assert list(df.columns) == report.columns and report._responseData is None
+    assert df["Page Views"].tolist() == [10.0, 20.0, 30.0]
+    assert report.dataframe is df
+    assert components.endpoints.count("metrics") == 1
+
+
+def test_lazy_properties_setters():
+    reports = _Reports([[1.0, 2.0]])
+    analytics = _offlineAnalytics(reports.postData)
+    report = analytics.getReport2(_request(METRICS[:1]), resolveColumns=False)
+    ## the values set are kept as they are, nothing is resolved
+    report.globalFilters = [{"type": "dateRange", "dateRange": "2024-01-01/2024-01-02"}]
+    assert report.globalFilters == [{"type": "dateRange", "dateRange": "2024-01-01/2024-01-02"}]
+    report.columns = ["a", "b", "c"]
+    assert report.columns == ["a", "b", "c"]
+    df = pd.DataFrame({"x": [1]})
+    report.dataframe = df
+    assert report.dataframe is df and report._responseData is None